@@ -0,0 +1,65 @@
+# Compares sequential and concurrent execute_task runs against stub nmap/gobuster/ffuf
+# binaries that sleep for a fixed time, so the speedup reflects scheduling only.
+#
+#   python benchmarks/bench_concurrency.py --tasks 48 --sleep 0.25 --workers 1 4 8 16
+import argparse
+import os
+import stat
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from security_pipeline import ScopeConfig, SecurityTask, ConcurrencyConfig, PipelineState, execute_task
+
+STUB = """#!/bin/sh
+sleep {sleep}
+echo "80/tcp   open  http"
+echo "/admin (Status: 200)"
+"""
+
+def install_stubs(directory: str, sleep: float):
+    for tool in ('nmap', 'gobuster', 'ffuf'):
+        path = os.path.join(directory, tool)
+        with open(path, 'w') as f:
+            f.write(STUB.format(sleep=sleep))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    os.environ['PATH'] = directory + os.pathsep + os.environ['PATH']
+
+def make_tasks(count: int):
+    tools = ['nmap', 'gobuster', 'ffuf']
+    return [SecurityTask(task_type=tools[i % 3], target=f"host{i % 16}.example.com",
+                         parameters={'-p': '80', 'wordlist': 'common.txt'})
+            for i in range(count)]
+
+def run_once(count: int, workers: int, per_target: int) -> float:
+    state = PipelineState(scope=ScopeConfig(allowed_domains=['example.com']), tasks=make_tasks(count),
+                          concurrency=ConcurrencyConfig(max_workers=workers, per_target_limit=per_target))
+    start = time.perf_counter()
+    execute_task(state)
+    elapsed = time.perf_counter() - start
+    assert all(task.status == 'completed' for task in state.tasks), "stub tools should never fail"
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=48)
+    parser.add_argument('--sleep', type=float, default=0.25)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--per-target', type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as stub_dir:
+        install_stubs(stub_dir, args.sleep)
+        baseline = None
+        print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'efficiency':>11}")
+        for workers in args.workers:
+            elapsed = run_once(args.tasks, workers, args.per_target)
+            if baseline is None:
+                baseline = elapsed
+            speedup = baseline / elapsed
+            print(f"{workers:>8} {elapsed:>9.2f} {speedup:>8.2f} {speedup / workers:>10.0%}")
+
+if __name__ == '__main__':
+    main()
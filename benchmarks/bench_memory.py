@@ -0,0 +1,83 @@
+# Peak memory of a run over N synthetic tasks, with and without compact task storage. Each configuration runs in
+# its own interpreter so peaks don't mix; tools are replaced by an in-process stub so 50k tasks finish in minutes.
+#
+#   python benchmarks/bench_memory.py --tasks 10000 50000
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import resource
+except ImportError:  # Windows: fall back to the Python heap peak
+    resource = None
+    import tracemalloc
+
+def peak_mb() -> float:
+    if resource is None:
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+def stub_tool(task, machine=False, metrics=None) -> str:
+    # A few KB of unique output per task, like a real nmap or gobuster run
+    seq = int(task.parameters['seq'])
+    if task.task_type == 'nmap':
+        ports = ''.join(f"{port}/tcp   open  http\n" for port in range(1000 + seq % 50, 1020 + seq % 50))
+        return f"Starting Nmap for task {seq}\n{ports}Nmap done: 1 IP address (1 host up)\n" + '#' * 2000
+    return ''.join(f"/path{seq}_{k}               (Status: 200) [Size: {k * 37}]\n" for k in range(30))
+
+def child(count: int, compact: bool) -> dict:
+    import security_pipeline
+    from security_pipeline import (ScopeConfig, SecurityTask, PipelineState, ReportConfig, CompactConfig,
+                                   execute_task, save_report)
+    from report_writer import ReportWriter
+    if resource is None:
+        tracemalloc.start()
+    security_pipeline.run_security_tool = stub_tool
+    os.chdir(tempfile.mkdtemp())
+    tools = ['nmap', 'gobuster', 'ffuf']
+    tasks = [SecurityTask(task_type=tools[i % 3], target=f"host{i % 1000}.example.com", parameters={'seq': str(i)})
+             for i in range(count)]
+    report = ReportConfig()
+    state = PipelineState(scope=ScopeConfig(allowed_domains=['example.com']), tasks=tasks, report=report,
+                          reporter=ReportWriter(report.journal_path, report.raw_dir),
+                          compact=CompactConfig(enabled=compact))
+    del tasks
+    started = time.perf_counter()
+    execute_task(state)
+    run_seconds = time.perf_counter() - started
+    run_peak = peak_mb()
+    started = time.perf_counter()
+    state.model_dump()
+    dump_seconds = time.perf_counter() - started
+    save_report(state)
+    assert all(task.status == 'completed' for task in state.tasks), "stub tools should never fail"
+    return {'run_peak': run_peak, 'total_peak': peak_mb(), 'run_seconds': run_seconds, 'dump_seconds': dump_seconds}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--child', nargs=2, metavar=('TASKS', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child(int(args.child[0]), args.child[1] == 'compact')))
+        return
+
+    unit = 'heap MB' if resource is None else 'RSS MB'
+    print(f"{'tasks':>7} {'storage':>8} {'run peak ' + unit:>16} {'final peak ' + unit:>18} {'run s':>7} {'dump s':>7}")
+    for count in args.tasks:
+        for mode in ('models', 'compact'):
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', str(count), mode],
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{count:>7} {mode:>8} {result['run_peak']:>16.1f} {result['total_peak']:>18.1f} "
+                  f"{result['run_seconds']:>7.1f} {result['dump_seconds']:>7.2f}")
+
+if __name__ == '__main__':
+    main()
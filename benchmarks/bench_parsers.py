@@ -0,0 +1,40 @@
+# Parser throughput suite for pytest-benchmark. The fixtures in benchmarks/fixtures are captured tool
+# outputs; each benchmark repeats one until it is several MB, so regressions show up as MB/s drops.
+#
+#   pytest benchmarks/bench_parsers.py --benchmark-autosave
+#   pytest benchmarks/bench_parsers.py --benchmark-compare --benchmark-compare-fail=mean:15%
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tool_parsers import parse_output
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+TARGET_BYTES = 8 * 1024 * 1024
+
+CASES = [
+    ('nmap', 'nmap_normal.txt', False),
+    ('nmap', 'nmap.xml', True),
+    ('gobuster', 'gobuster.txt', False),
+    ('ffuf', 'ffuf.txt', False),
+    ('ffuf', 'ffuf.jsonl', True),
+    ('sqlmap', 'sqlmap.txt', False),
+]
+
+def scaled_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name)) as f:
+        sample = f.read()
+    return sample * max(1, TARGET_BYTES // len(sample))
+
+@pytest.mark.parametrize('structured', [False, True], ids=['legacy', 'structured'])
+@pytest.mark.parametrize('task_type,fixture,machine', CASES, ids=[case[1] for case in CASES])
+def test_parser_throughput(benchmark, task_type, fixture, machine, structured):
+    output = scaled_fixture(fixture)
+    benchmark.extra_info['megabytes'] = round(len(output) / 1e6, 2)
+    result = benchmark.pedantic(parse_output, args=(task_type, output),
+                                kwargs={'structured': structured, 'machine': machine}, rounds=3, iterations=1)
+    assert result, "fixture should produce findings"
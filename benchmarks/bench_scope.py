@@ -0,0 +1,74 @@
+# Compares the original linear ScopeConfig.is_in_scope scan with the compiled ScopeIndex.
+#
+#   python benchmarks/bench_scope.py --networks 20000 --domains 20000 --targets 200000
+import argparse
+import ipaddress
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from security_pipeline import ScopeConfig
+
+def linear_in_scope(domains, networks, target: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(target)
+        return any(ip in net for net in networks)
+    except ValueError:
+        target = target.lower()
+        return any(target == d or target.endswith('.' + d) for d in domains)
+
+def make_scope(rng, network_count: int, domain_count: int):
+    ips = [f"{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}.0/24" for _ in range(network_count // 2)]
+    ips += [f"2001:db8:{rng.randrange(65536):x}:{rng.randrange(65536):x}::/64" for _ in range(network_count - len(ips))]
+    domains = [f"client{i}.example{rng.randrange(50)}.com" for i in range(domain_count)]
+    return domains, ips
+
+def make_targets(rng, count: int, domain_count: int):
+    targets = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            targets.append(f"{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}")
+        elif kind == 1:
+            targets.append(f"2001:db8:{rng.randrange(65536):x}:{rng.randrange(65536):x}::1")
+        else:
+            targets.append(f"www.client{rng.randrange(domain_count * 2)}.example{rng.randrange(50)}.com")
+    return targets
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--networks', type=int, default=20000)
+    parser.add_argument('--domains', type=int, default=20000)
+    parser.add_argument('--targets', type=int, default=200000)
+    parser.add_argument('--linear-sample', type=int, default=500,
+                        help="targets timed with the linear scan (it is far too slow for the full set)")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    domains, ips = make_scope(rng, args.networks, args.domains)
+    targets = make_targets(rng, args.targets, args.domains)
+
+    start = time.perf_counter()
+    scope = ScopeConfig(allowed_domains=domains, allowed_ips=ips)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    in_scope = scope.filter_in_scope(targets)
+    indexed = time.perf_counter() - start
+
+    sample = targets[:args.linear_sample]
+    start = time.perf_counter()
+    linear_hits = [t for t in sample if linear_in_scope(scope.allowed_domains, scope.allowed_ips, t)]
+    linear = (time.perf_counter() - start) / len(sample) * len(targets)
+
+    assert linear_hits == scope.filter_in_scope(sample), "index must agree with the linear scan"
+    print(f"scope: {args.networks} networks, {args.domains} domains; {len(targets)} targets, {len(in_scope)} in scope")
+    print(f"index build:          {build:8.3f}s")
+    print(f"filter_in_scope:      {indexed:8.3f}s  ({len(targets) / indexed:,.0f} targets/s)")
+    print(f"linear (extrapolated): {linear:7.1f}s  ({linear / indexed:,.0f}x slower)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+class CheckpointStore:
+    # SQLite snapshot of a pipeline run: one row per task, rewritten on every task transition
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS tasks (idx INTEGER PRIMARY KEY, task TEXT NOT NULL)")
+        self._db.commit()
+
+    def reset(self):
+        with self._lock:
+            self._db.execute("DELETE FROM meta")
+            self._db.execute("DELETE FROM tasks")
+            self._db.commit()
+
+    def save_meta(self, key: str, value: Any):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value, default=str)))
+            self._db.commit()
+
+    def save_task(self, index: int, task: Dict[str, Any]):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO tasks VALUES (?, ?)", (index, json.dumps(task, default=str)))
+            self._db.commit()
+
+    def save_tasks(self, tasks: List[Dict[str, Any]]):
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO tasks VALUES (?, ?)",
+                                 [(index, json.dumps(task, default=str)) for index, task in enumerate(tasks)])
+            self._db.commit()
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            meta = {key: json.loads(value) for key, value in self._db.execute("SELECT key, value FROM meta")}
+            tasks = [json.loads(task) for _, task in self._db.execute("SELECT idx, task FROM tasks ORDER BY idx")]
+        if not meta and not tasks:
+            return None
+        return {'meta': meta, 'tasks': tasks}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,97 @@
+import sys
+from typing import Any, Dict, Optional, Tuple
+from pydantic_core import core_schema
+from pipeline_metrics import TaskMetrics
+from report_writer import read_blob
+
+METRIC_FIELDS = ('queue_wait', 'wall_time', 'cpu_user', 'cpu_system', 'max_rss', 'output_bytes', 'parse_time',
+                 'report_time', 'attempts')
+
+class TaskRecord:
+    # Read-only stand-in for a settled SecurityTask: slots instead of a model, raw output left in the blob store
+    __slots__ = ('task_type', 'target', 'parameters', 'status', 'error', 'retries', 'cache_hit', 'parsed',
+                 'result_ref', 'output_path', 'depends_on', '_metrics')
+    shards = ()
+    addresses = ()
+    force_refresh = False
+    rate = None
+
+    def __init__(self, task_type: str, target: str, parameters: Dict[str, str], status: str, error: Optional[str],
+                 retries: int, cache_hit: bool, parsed: Any, result_ref: Optional[str], output_path: Optional[str],
+                 depends_on: Optional[int], metrics: Tuple[Any, ...]):
+        self.task_type = task_type
+        self.target = target
+        self.parameters = parameters
+        self.status = status
+        self.error = error
+        self.retries = retries
+        self.cache_hit = cache_hit
+        self.parsed = parsed
+        self.result_ref = result_ref
+        self.output_path = output_path
+        self.depends_on = depends_on
+        self._metrics = metrics
+
+    @property
+    def result(self) -> Optional[str]:
+        return read_blob(self.result_ref) if self.result_ref else None
+
+    @property
+    def metrics(self) -> TaskMetrics:
+        return TaskMetrics(**dict(zip(METRIC_FIELDS, self._metrics)))
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        # SecurityTask fields, e.g. SecurityTask(**record.to_dict()); parsed goes back to plain lists
+        data = {'task_type': self.task_type, 'target': self.target, 'parameters': dict(self.parameters),
+                'status': self.status, 'error': self.error, 'retries': self.retries, 'cache_hit': self.cache_hit,
+                'parsed': expand_value(self.parsed), 'output_path': self.output_path, 'depends_on': self.depends_on,
+                'metrics': dict(zip(METRIC_FIELDS, self._metrics)), 'result_ref': self.result_ref}
+        if include_result:
+            data['result'] = self.result
+        return data
+
+    def __repr__(self) -> str:
+        return f"TaskRecord({self.task_type!r}, {self.target!r}, status={self.status!r})"
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler):
+        # Lets PipelineState.tasks hold records next to models; they dump as plain dicts
+        return core_schema.is_instance_schema(
+            cls, serialization=core_schema.plain_serializer_function_ser_schema(lambda record: record.to_dict()))
+
+def expand_value(value: Any) -> Any:
+    if isinstance(value, tuple):
+        return [expand_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: expand_value(item) for key, item in value.items()}
+    return value
+
+class TaskCompactor:
+    # Shares one copy of every port number, path string and parameter dict across all records of a run
+    def __init__(self):
+        self._values: Dict[Any, Any] = {}
+        self._parameters: Dict[Tuple[Tuple[str, str], ...], Dict[str, str]] = {}
+
+    def value(self, value: Any) -> Any:
+        # Lists become tuples of shared scalars; results stay JSON-serializable and iterable like before
+        if isinstance(value, list):
+            return tuple(self.value(item) for item in value)
+        if isinstance(value, dict):
+            return {sys.intern(key): self.value(item) for key, item in value.items()}
+        if isinstance(value, str):
+            return sys.intern(value)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return self._values.setdefault(value, value)
+        return value
+
+    def parameters(self, parameters: Dict[str, str]) -> Dict[str, str]:
+        key = tuple(sorted(parameters.items()))
+        if key not in self._parameters:
+            self._parameters[key] = {sys.intern(name): sys.intern(value) for name, value in key}
+        return self._parameters[key]
+
+    def record(self, task, result_ref: Optional[str]) -> TaskRecord:
+        metrics = tuple(getattr(task.metrics, field) for field in METRIC_FIELDS)
+        return TaskRecord(sys.intern(task.task_type), sys.intern(task.target), self.parameters(task.parameters),
+                          sys.intern(task.status), task.error, task.retries, task.cache_hit, self.value(task.parsed),
+                          result_ref, task.output_path, task.depends_on, metrics)
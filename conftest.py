@@ -0,0 +1,6 @@
+import pytest
+
+@pytest.fixture(autouse=True)
+def _run_in_tmp_path(tmp_path, monkeypatch):
+    # Pipelines built with the default ReportConfig/cache paths write audit_report.*, reports/ and cache/ to the cwd
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,100 @@
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# host -> (addresses, ttl in seconds or None when the resolver can't tell)
+Resolver = Callable[[str], Tuple[List[str], Optional[float]]]
+
+def system_resolver(host: str) -> Tuple[List[str], Optional[float]]:
+    try:
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except OSError:
+        return [], None
+    return sorted({info[4][0] for info in infos}), None
+
+def dnspython_resolver(host: str) -> Tuple[List[str], Optional[float]]:
+    # A and AAAA answers with their real TTLs; needs the optional dnspython package
+    import dns.resolver
+    addresses: List[str] = []
+    ttls: List[float] = []
+    for record_type in ('A', 'AAAA'):
+        try:
+            answer = dns.resolver.resolve(host, record_type)
+        except Exception:
+            continue
+        addresses.extend(record.to_text() for record in answer)
+        ttls.append(answer.rrset.ttl)
+    return sorted(set(addresses)), min(ttls) if ttls else None
+
+def default_resolver() -> Resolver:
+    try:
+        import dns.resolver  # noqa: F401
+    except ImportError:
+        return system_resolver
+    return dnspython_resolver
+
+class DNSCache:
+    # Thread-safe A/AAAA cache: honours answer TTLs (clamped), caches failures briefly, resolves batches concurrently
+    def __init__(self, resolver: Optional[Resolver] = None, default_ttl: float = 300, min_ttl: float = 5,
+                 max_ttl: float = 86400, negative_ttl: float = 30, max_workers: int = 32):
+        self.resolver = resolver or default_resolver()
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.max_workers = max_workers
+        self._entries: Dict[str, Tuple[float, List[str]]] = {}
+        self._pending: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str) -> List[str]:
+        try:
+            return [str(ipaddress.ip_address(host))]
+        except ValueError:
+            pass
+        key = host.lower().rstrip('.')
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    return entry[1]
+                waiting = self._pending.get(key)
+                if waiting is None:
+                    # This thread does the lookup; others asking for the same host wait for it
+                    done = self._pending[key] = threading.Event()
+                    break
+            waiting.wait()
+        try:
+            addresses, ttl = self.resolver(key)
+        except Exception as e:
+            logging.warning(f"Resolving {key} failed: {e}")
+            addresses, ttl = [], None
+        if addresses:
+            ttl = min(self.max_ttl, max(self.min_ttl, self.default_ttl if ttl is None else ttl))
+        else:
+            ttl = self.negative_ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, addresses)
+            del self._pending[key]
+        done.set()
+        return addresses
+
+    def resolve_all(self, hosts: Iterable[str]) -> Dict[str, List[str]]:
+        # Deduplicated, concurrent pre-pass; cached hosts cost nothing
+        unique = list(dict.fromkeys(host.lower().rstrip('.') for host in hosts))
+        if len(unique) <= 1:
+            return {host: self.resolve(host) for host in unique}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique))) as pool:
+            return dict(zip(unique, pool.map(self.resolve, unique)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,200 @@
+import bisect
+import heapq
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+
+SECONDS_BUCKETS = [0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600]
+BYTES_BUCKETS = [1024 * 4 ** i for i in range(11)]  # 1 KiB .. 1 GiB
+
+class TaskMetrics(BaseModel):
+    # Accumulated over every attempt of a task; CPU and max RSS are None where wait4 isn't available
+    queue_wait: float = 0.0
+    wall_time: float = 0.0
+    cpu_user: Optional[float] = None
+    cpu_system: Optional[float] = None
+    max_rss: Optional[int] = None  # bytes
+    output_bytes: int = 0
+    parse_time: float = 0.0
+    report_time: float = 0.0
+    attempts: int = 0
+
+    def absorb(self, other: 'TaskMetrics'):
+        # Folds a shard's metrics into its parent task
+        for field in ('queue_wait', 'wall_time', 'output_bytes', 'parse_time', 'report_time', 'attempts'):
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        for field in ('cpu_user', 'cpu_system'):
+            if getattr(other, field) is not None:
+                setattr(self, field, (getattr(self, field) or 0.0) + getattr(other, field))
+        if other.max_rss is not None:
+            self.max_rss = max(self.max_rss or 0, other.max_rss)
+
+class Histogram:
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {'count': self.count, 'sum': round(self.sum, 6), 'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+                'max': round(self.max, 6), 'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts))}
+
+# metric name -> (TaskMetrics field, buckets, help text)
+TASK_HISTOGRAMS = {
+    'task_queue_wait_seconds': ('queue_wait', SECONDS_BUCKETS, 'Time tasks spent queued before starting'),
+    'task_wall_seconds': ('wall_time', SECONDS_BUCKETS, 'Tool subprocess wall-clock time'),
+    'task_cpu_seconds': (None, SECONDS_BUCKETS, 'Tool subprocess user+system CPU time'),
+    'task_max_rss_bytes': ('max_rss', BYTES_BUCKETS, 'Tool subprocess peak resident set size'),
+    'task_output_bytes': ('output_bytes', BYTES_BUCKETS, 'Raw tool output size'),
+    'task_parse_seconds': ('parse_time', SECONDS_BUCKETS, 'Time spent parsing tool output'),
+    'report_write_seconds': (None, SECONDS_BUCKETS, 'Time spent writing a task to the report journal'),
+}
+
+class MetricsRegistry:
+    # Per-tool histograms and counters, per-stage timings and the slowest tasks of a pipeline's lifetime
+    def __init__(self, slowest: int = 10):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._stages: Dict[str, Histogram] = {}
+        self._slowest: List[Tuple[float, str, str]] = []
+        self._slowest_size = slowest
+
+    def _observe(self, name: str, tool: str, value: float):
+        key = (name, tool)
+        if key not in self._histograms:
+            self._histograms[key] = Histogram(TASK_HISTOGRAMS[name][1])
+        self._histograms[key].observe(value)
+
+    def _count(self, name: str, value: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def record_task(self, task_type: str, target: str, status: str, retries: int, metrics: TaskMetrics, cache_hit: bool = False):
+        with self._lock:
+            self._count('tasks_total', tool=task_type, status=status)
+            self._count('task_retries_total', retries, tool=task_type)
+            if cache_hit:
+                # Nothing ran, so only the wait is meaningful
+                self._count('cache_hits_total', tool=task_type)
+                self._observe('task_queue_wait_seconds', task_type, metrics.queue_wait)
+                return
+            for name, (field, _, _) in TASK_HISTOGRAMS.items():
+                value = getattr(metrics, field) if field else None
+                if name == 'task_cpu_seconds' and metrics.cpu_user is not None:
+                    value = metrics.cpu_user + (metrics.cpu_system or 0.0)
+                if value is not None:
+                    self._observe(name, task_type, value)
+            entry = (metrics.wall_time, task_type, target)
+            if len(self._slowest) < self._slowest_size:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+
+    def record_intake(self, task_type: str, saved: int):
+        # Tool runs avoided by deduplicating or merging requested tasks
+        with self._lock:
+            self._count('invocations_saved_total', saved, tool=task_type)
+
+    def record_report_write(self, task_type: str, seconds: float):
+        with self._lock:
+            self._observe('report_write_seconds', task_type, seconds)
+
+    def record_stage(self, stage: str, seconds: float):
+        with self._lock:
+            self._stages.setdefault(stage, Histogram(SECONDS_BUCKETS)).observe(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            tools: Dict[str, Dict[str, Any]] = {}
+            for (name, tool), histogram in sorted(self._histograms.items()):
+                tools.setdefault(tool, {})[name] = histogram.snapshot()
+            for (name, labels), value in sorted(self._counters.items()):
+                labels = dict(labels)
+                tool = tools.setdefault(labels.pop('tool'), {})
+                if labels:
+                    tool.setdefault(name, {})[labels['status']] = value
+                else:
+                    tool[name] = value
+            return {
+                'tools': tools,
+                'stages': {stage: histogram.snapshot() for stage, histogram in sorted(self._stages.items())},
+                'slowest_tasks': [{'task_type': tool, 'target': target, 'wall_time': round(wall, 6)}
+                                  for wall, tool, target in sorted(self._slowest, reverse=True)],
+            }
+
+    def to_prometheus(self, prefix: str = 'security_pipeline') -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, (_, _, help_text) in TASK_HISTOGRAMS.items():
+                series = [(tool, h) for (metric, tool), h in sorted(self._histograms.items()) if metric == name]
+                if series:
+                    _histogram_lines(lines, f"{prefix}_{name}", help_text, [({'tool': tool}, h) for tool, h in series])
+            if self._stages:
+                _histogram_lines(lines, f"{prefix}_stage_seconds", 'Pipeline stage duration',
+                                 [({'stage': stage}, h) for stage, h in sorted(self._stages.items())])
+            written = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in written:
+                    lines.append(f"# TYPE {prefix}_{name} counter")
+                    written.add(name)
+                lines.append(f"{prefix}_{name}{_labels(dict(labels))} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str) -> str:
+        # Atomic replace so a textfile collector never reads a half-written file
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+        return path
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (key + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"' for key, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+def _histogram_lines(lines: List[str], name: str, help_text: str, series: List[Tuple[Dict[str, str], Histogram]]):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in series:
+        cumulative = 0
+        for bound, count in zip([str(b) for b in histogram.buckets] + ['+Inf'], histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum:g}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+def serve_metrics(registry: MetricsRegistry, port: int = 9464, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    # Serves GET /metrics from a daemon thread; call shutdown() on the returned server to stop it
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
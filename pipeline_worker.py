@@ -0,0 +1,103 @@
+import logging
+import os
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+from security_pipeline import ScopeConfig, SecurityTask, SecurityPipeline, PipelineState
+
+class PipelineWorker:
+    # Runs one SecurityPipeline on a background thread; tasks can be submitted at any time and
+    # progress is published as events that a UI polls with events()
+    def __init__(self, scope: ScopeConfig, **pipeline_options):
+        self.pipeline = SecurityPipeline(scope, [], on_transition=self._on_transition, **pipeline_options)
+        streaming = self.pipeline.state.streaming
+        if streaming.enabled and streaming.on_finding is None:
+            streaming.on_finding = self._on_finding
+        self._intake: List[SecurityTask] = []
+        self._intake_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._events: 'queue.Queue[Dict[str, Any]]' = queue.Queue()
+        self._busy = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='pipeline-worker', daemon=True)
+        self._thread.start()
+
+    @property
+    def state(self) -> PipelineState:
+        return self.pipeline.state
+
+    @property
+    def busy(self) -> bool:
+        with self._intake_lock:
+            return self._busy.is_set() or bool(self._intake)
+
+    def submit(self, tasks: List[SecurityTask]):
+        with self._intake_lock:
+            self._intake.extend(tasks)
+        for task in tasks:
+            self._events.put({'kind': 'queued', 'task_type': task.task_type, 'target': task.target})
+        self._wake.set()
+
+    def events(self, limit: int = 1000) -> List[Dict[str, Any]]:
+        # Drains up to `limit` events published since the last call
+        drained = []
+        while len(drained) < limit:
+            try:
+                drained.append(self._events.get_nowait())
+            except queue.Empty:
+                break
+        return drained
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            with self._intake_lock:
+                self._wake.clear()
+                batch, self._intake = self._intake, []
+                if batch:
+                    self._busy.set()
+            if not batch:
+                continue
+            try:
+                # Tasks submitted during this run wait in the intake and are picked up by the next pass
+                self.pipeline.state.tasks.extend(batch)
+                self._events.put({'kind': 'run', 'state': 'started', 'tasks': len(batch)})
+                self.pipeline.run()
+                self._events.put({'kind': 'run', 'state': 'finished'})
+            except Exception as e:
+                logging.exception("Background pipeline run failed")
+                self._events.put({'kind': 'run', 'state': 'error', 'error': str(e)})
+            finally:
+                self._busy.clear()
+
+    def _on_transition(self, index: int, task: SecurityTask):
+        self._events.put({'kind': 'task', 'index': index, 'task_type': task.task_type, 'target': task.target,
+                          'status': task.status, 'retries': task.retries, 'error': task.error,
+                          'cache_hit': task.cache_hit})
+        if task.status == 'completed' and task.parsed:
+            self._events.put({'kind': 'findings', 'task_type': task.task_type, 'target': task.target,
+                              'findings': task.parsed})
+
+    def _on_finding(self, task: SecurityTask, item: Any):
+        self._events.put({'kind': 'finding', 'task_type': task.task_type, 'target': task.target, 'item': item})
+
+def tail_file(path: str, lines: int = 200, block_size: int = 8192) -> List[str]:
+    # Last `lines` lines of a file, read backwards in blocks so large logs are never loaded whole
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0 and data.count(b'\n') <= lines:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    return data.decode(errors='replace').splitlines()[-lines:]
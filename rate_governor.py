@@ -0,0 +1,94 @@
+import io
+import logging
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from pydantic import BaseModel
+
+THROTTLE_CODES = {'429', '503'}
+
+class RateLimitConfig(BaseModel):
+    enabled: bool = False
+    initial_rate: float = 50.0  # requests/second per target, split across the target's concurrency slots
+    min_rate: float = 2.0
+    max_rate: float = 500.0
+    increase: float = 10.0  # added after a healthy run
+    decrease: float = 0.5  # multiplied in after throttling or a timeout
+    throttle_ratio: float = 0.05  # share of 429/503 responses that counts as being throttled
+    throttle_min: int = 3  # ...and at least this many of them
+    nmap_rate_scale: float = 20.0  # nmap --max-rate counts packets, not HTTP requests
+
+class RateGovernor:
+    # Per-target request budget with additive increase / multiplicative decrease driven by tool feedback
+    def __init__(self, config: RateLimitConfig):
+        self.config = config
+        self._rates: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def rate(self, target: str) -> float:
+        with self._lock:
+            return self._rates.get(target.lower(), self.config.initial_rate)
+
+    def allocate(self, target: str, task_type: str, slots: int) -> float:
+        # Each task gets an equal share, so the target never sees more than its budget even with every slot busy
+        share = self.rate(target) / max(1, slots)
+        return share * self.config.nmap_rate_scale if task_type == 'nmap' else share
+
+    def observe(self, target: str, responses: int = 0, throttled: int = 0, timed_out: bool = False):
+        config = self.config
+        key = target.lower()
+        with self._lock:
+            rate = self._rates.get(key, config.initial_rate)
+            if timed_out or (throttled >= config.throttle_min and throttled >= responses * config.throttle_ratio):
+                new_rate = max(config.min_rate, rate * config.decrease)
+                reason = 'timeout' if timed_out else f"{throttled}/{responses} throttled responses"
+                logging.warning(f"Lowering rate for {target} to {new_rate:.1f}/s ({reason})")
+            else:
+                new_rate = min(config.max_rate, rate + config.increase)
+            self._rates[key] = new_rate
+
+    def rates(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._rates)
+
+_STATUS = re.compile(r'(?:Status:\s*|"status":\s*)(\d{3})')
+_SQLMAP_CODES = re.compile(r'^\s*(\d{3}) \([^)]*\) - (\d+) times')
+
+def response_counts(lines: Iterable[str]) -> Tuple[int, int]:
+    # (responses, throttled) from gobuster/ffuf status fields and sqlmap's "HTTP error codes" summary
+    responses = throttled = 0
+    for line in lines:
+        for code in _STATUS.findall(line):
+            responses += 1
+            throttled += code in THROTTLE_CODES
+        match = _SQLMAP_CODES.match(line)
+        if match:
+            count = int(match.group(2))
+            responses += count
+            throttled += count if match.group(1) in THROTTLE_CODES else 0
+    return responses, throttled
+
+def output_response_counts(output: Optional[str], output_path: Optional[str]) -> Tuple[int, int]:
+    if output is not None:
+        return response_counts(io.StringIO(output))
+    if output_path:
+        with open(output_path, errors='replace') as f:
+            return response_counts(f)
+    return 0, 0
+
+FFUF_MATCH_CODES = '200-299,301,302,307,401,403,405,500,429,503'  # ffuf's defaults plus 429,503
+
+def rate_flags(task_type: str, rate: float) -> List[str]:
+    if task_type == 'ffuf':
+        # ffuf's default matchers hide 429/503, so the governor would never see throttling; match them too
+        # (the ffuf parser drops them from findings)
+        return ['-rate', str(max(1, int(rate))), '-mc', FFUF_MATCH_CODES]
+    if task_type == 'gobuster':
+        # gobuster has no rate flag: N threads each waiting `delay` between requests gives roughly N / delay req/s
+        threads = max(1, min(10, round(rate / 5)))
+        return ['-t', str(threads), '--delay', f"{max(1, int(1000 * threads / rate))}ms"]
+    if task_type == 'nmap':
+        return ['--max-rate', str(max(1, int(rate)))]
+    if task_type == 'sqlmap':
+        return ['--delay', f"{1 / rate:.3f}"]
+    return []
@@ -0,0 +1,142 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+class BlobStore:
+    # Content-addressed raw output store: identical outputs are written once
+    def __init__(self, root: str, compress: bool = False):
+        self.root = root
+        self.compress = compress
+
+    def put(self, data: str) -> str:
+        digest = hashlib.sha256(data.encode()).hexdigest()
+        path = os.path.join(self.root, digest[:2], digest + ('.txt.gz' if self.compress else '.txt'))
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with (gzip.open(tmp_path, 'wt') if self.compress else open(tmp_path, 'w')) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return path
+
+def read_blob(path: str) -> str:
+    with (gzip.open(path, 'rt') if path.endswith('.gz') else open(path)) as f:
+        return f.read()
+
+class ReportWriter:
+    # Append-only JSON Lines journal with one record per task transition; raw output is stored by reference
+    def __init__(self, path: str = 'audit_report.jsonl', raw_dir: str = os.path.join('reports', 'raw'),
+                 compress: bool = False, append: bool = False):
+        self.path = os.path.abspath(path + '.gz' if compress and not path.endswith('.gz') else path)
+        self.compress = compress
+        self.blobs = BlobStore(os.path.abspath(raw_dir), compress=compress)
+        self._lock = threading.Lock()
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Without append, the previous journal is truncated by the first record, not here: building a pipeline
+        # (or a writer that never writes) leaves it alone
+        self._truncate = not append
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            mode = 'w' if self._truncate else 'a'
+            self._file = gzip.open(self.path, mode + 't') if self.compress else open(self.path, mode)
+            self._truncate = False
+        return self._file
+
+    def _append(self, record: Dict[str, Any]):
+        line = json.dumps(record, separators=(',', ':'), default=str) + '\n'
+        with self._lock:
+            f = self._open()
+            f.write(line)
+            f.flush()
+
+    def _task_payload(self, task) -> Dict[str, Any]:
+        payload = task.model_dump(exclude={'result', 'shards'})
+        payload['result_ref'] = self.blobs.put(task.result) if task.result else task.output_path
+        payload['shards'] = [self._task_payload(shard) for shard in task.shards]
+        return payload
+
+    def record_scope(self, domains: List[str], ips: List[str]):
+        self._append({'event': 'scope', 'domains': domains, 'ips': ips})
+
+    def record_task(self, index: int, task) -> Optional[str]:
+        # Returns the raw output's reference (blob or spool path)
+        payload = self._task_payload(task)
+        self._append({'event': 'task', 'index': index, 'task': payload})
+        return payload['result_ref']
+
+    def record_metrics(self, metrics: Dict[str, Any]):
+        self._append({'event': 'metrics', 'metrics': metrics})
+
+    def record_delta(self, delta: Dict[str, Any]):
+        self._append({'event': 'delta', 'delta': delta})
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def read_journal(path: str) -> Iterator[Dict[str, Any]]:
+    with (gzip.open(path, 'rt') if path.endswith('.gz') else open(path)) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def findings_key(task_type: str, parameters: Dict[str, str]) -> str:
+    # Follow-up scans of non-default web ports get their own entry next to the tool's default one
+    url = parameters.get('url')
+    return f"{task_type} {url}" if url else task_type
+
+def build_report(journal_path: str, inline_results: bool = False) -> Dict[str, Any]:
+    # Replays the journal into the audit_report.json shape; the last record for each task wins
+    tasks: Dict[int, Dict[str, Any]] = {}
+    scope = {'domains': [], 'ips': []}
+    metrics: Dict[str, Any] = {}
+    delta: Optional[Dict[str, Any]] = None
+    for record in read_journal(journal_path):
+        if record['event'] == 'scope':
+            scope = {'domains': record['domains'], 'ips': record['ips']}
+        elif record['event'] == 'task':
+            tasks[record['index']] = record['task']
+        elif record['event'] == 'metrics':
+            metrics = record['metrics']
+        elif record['event'] == 'delta':
+            delta = record['delta']
+
+    ordered = [tasks[index] for index in sorted(tasks)]
+    findings: Dict[str, Any] = {}
+    for task in ordered:
+        if task.get('parsed') is not None and task['status'] in ('completed', 'failed', 'skipped'):
+            findings.setdefault(task['target'], {})[findings_key(task['task_type'], task['parameters'])] = task['parsed']
+        if inline_results:
+            _inline(task)
+    if delta is not None:
+        # Delta runs list only what changed against the baseline; full findings stay in the run history
+        for task in ordered:
+            task.pop('parsed', None)
+        return {'tasks': ordered, 'delta': delta, 'scope': scope, 'metrics': metrics}
+    return {'tasks': ordered, 'findings': findings, 'scope': scope, 'metrics': metrics}
+
+def _inline(task: Dict[str, Any]):
+    ref = task.get('result_ref')
+    task['result'] = read_blob(ref) if ref and os.path.exists(ref) else None
+    for shard in task.get('shards', []):
+        _inline(shard)
+
+def finalize_report(journal_path: str, report_path: str = 'audit_report.json',
+                    inline_results: bool = False, compact: bool = False) -> str:
+    report = build_report(journal_path, inline_results=inline_results)
+    tmp_path = report_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        if compact:
+            json.dump(report, f, separators=(',', ':'), default=str)
+        else:
+            json.dump(report, f, indent=2, default=str)
+    os.replace(tmp_path, report_path)
+    return report_path
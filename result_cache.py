@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+def cache_key(task_type: str, target: str, parameters: Dict[str, str], tool_version: str, variant: str = '') -> str:
+    # Targets are case-insensitive and parameter order is irrelevant, so normalise both before hashing
+    payload = json.dumps({
+        'task_type': task_type,
+        'target': target.strip().lower(),
+        'parameters': {k.strip(): str(v).strip() for k, v in sorted(parameters.items())},
+        'tool_version': tool_version,
+        'variant': variant,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResultCache:
+    # SQLite-backed tool result cache with a TTL and least-recently-used eviction
+    def __init__(self, path: str = os.path.join('cache', 'results.sqlite'), ttl: float = 3600, max_entries: int = 10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                task_type TEXT NOT NULL,
+                target TEXT NOT NULL,
+                output TEXT,
+                output_path TEXT,
+                findings TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT output, output_path, findings, created_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            output, output_path, findings, created_at = row
+            if now - created_at > self.ttl:
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return {'output': output, 'output_path': output_path, 'findings': json.loads(findings), 'created_at': created_at}
+
+    def put(self, key: str, task_type: str, target: str, output: Optional[str], output_path: Optional[str], findings: Any):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, task_type, target, output, output_path, json.dumps(findings), now, now))
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl,))
+        excess = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used ASC LIMIT ?)", (excess,))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM results")
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
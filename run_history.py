@@ -0,0 +1,170 @@
+import hashlib
+import http.client
+import ipaddress
+import json
+import os
+import re
+import socket
+import sqlite3
+import ssl
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+Findings = Dict[str, Dict[str, Any]]
+
+class RunHistory:
+    # SQLite record of past runs: target fingerprints as scans finish, and each run's findings once it is saved
+    def __init__(self, path: str = os.path.join('cache', 'history.sqlite')):
+        self.path = path
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                report_path TEXT
+            )""")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                run_id INTEGER NOT NULL,
+                scan TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                PRIMARY KEY (run_id, scan)
+            )""")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS findings (
+                run_id INTEGER NOT NULL,
+                target TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (run_id, target, key)
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS fingerprints_scan ON fingerprints (scan, run_id)")
+        self._db.commit()
+
+    def start_run(self) -> int:
+        with self._lock:
+            cursor = self._db.execute("INSERT INTO runs (started_at) VALUES (?)", (time.time(),))
+            self._db.commit()
+            return cursor.lastrowid
+
+    def finish_run(self, run_id: int, findings: Findings, report_path: Optional[str] = None):
+        # Rewrites the run's findings, so saving a run twice (e.g. after more tasks were added) is fine
+        rows = [(run_id, target, key, json.dumps(value, sort_keys=True, default=str))
+                for target, by_key in findings.items() for key, value in by_key.items()]
+        with self._lock:
+            self._db.execute("DELETE FROM findings WHERE run_id = ?", (run_id,))
+            self._db.executemany("INSERT INTO findings VALUES (?, ?, ?, ?)", rows)
+            self._db.execute("UPDATE runs SET finished_at = ?, report_path = ? WHERE id = ?", (time.time(), report_path, run_id))
+            self._db.commit()
+
+    def record_fingerprint(self, run_id: int, scan: str, fingerprint: str):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?)", (run_id, scan, fingerprint))
+            self._db.commit()
+
+    def last_fingerprint(self, scan: str, before: int) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint FROM fingerprints WHERE scan = ? AND run_id < ? ORDER BY run_id DESC LIMIT 1",
+                (scan, before)).fetchone()
+        return row[0] if row else None
+
+    def baseline(self, before: int) -> Optional[int]:
+        # The most recent finished run before `before`
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM runs WHERE id < ? AND finished_at IS NOT NULL ORDER BY id DESC LIMIT 1", (before,)).fetchone()
+        return row[0] if row else None
+
+    def findings(self, run_id: int) -> Findings:
+        with self._lock:
+            rows = self._db.execute("SELECT target, key, value FROM findings WHERE run_id = ?", (run_id,)).fetchall()
+        findings: Findings = {}
+        for target, key, value in rows:
+            findings.setdefault(target, {})[key] = json.loads(value)
+        return findings
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def system_resolver(host: str) -> List[str]:
+    try:
+        return [str(ipaddress.ip_address(host))]
+    except ValueError:
+        pass
+    try:
+        return sorted({info[4][0] for info in socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)})
+    except OSError:
+        return []
+
+TITLE = re.compile(rb'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    # Connects to a fixed address but still sends the hostname as SNI
+    def __init__(self, address: str, port: int, hostname: str, **kwargs):
+        super().__init__(address, port, **kwargs)
+        self.hostname = hostname
+
+    def connect(self):
+        http.client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(self.sock, server_hostname=self.hostname)
+
+def http_probe(url: str, address: Optional[str] = None, timeout: float = 5) -> Dict[str, Any]:
+    # What a web endpoint answers at its root: status, Server header and a hash of the page title.
+    # With an address, connects there instead of resolving the hostname (the Host header and SNI keep the name)
+    parts = urlsplit(url)
+    host = address or parts.hostname
+    if parts.scheme == 'https':
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE  # self-signed certificates are the norm on scanned hosts
+        connection = _PinnedHTTPSConnection(host, parts.port or 443, parts.hostname, timeout=timeout, context=context)
+    else:
+        connection = http.client.HTTPConnection(host, parts.port or 80, timeout=timeout)
+    try:
+        connection.request('GET', parts.path or '/', headers={'Host': parts.netloc, 'User-Agent': 'security-pipeline'})
+        response = connection.getresponse()
+        body = response.read(65536)
+    except (OSError, http.client.HTTPException, ValueError):
+        return {'status': None, 'server': None, 'title': None}
+    finally:
+        connection.close()
+    title = TITLE.search(body)
+    return {'status': response.status, 'server': response.getheader('Server'),
+            'title': hashlib.sha256(title.group(1).strip()).hexdigest() if title else None}
+
+def scan_key(target: str, parameters: Dict[str, str]) -> str:
+    return f"{target.lower()}|{json.dumps(parameters, sort_keys=True)}"
+
+def fingerprint(ips: Iterable[str], parsed: Any, http: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    # Stable hash of what a discovery scan saw: resolved addresses, the open ports and their services, and how each
+    # web endpoint (URL -> http_probe result) answered
+    items = parsed if isinstance(parsed, (list, tuple)) else [parsed]
+    payload = {'ips': sorted(ips), 'ports': sorted(json.dumps(item, sort_keys=True) for item in items)}
+    if http:
+        payload['http'] = http
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def _items(value: Any) -> Dict[str, Any]:
+    values = value if isinstance(value, (list, tuple)) else [value]
+    return {json.dumps(item, sort_keys=True, default=str): item for item in values}
+
+def diff_findings(previous: Findings, current: Findings) -> Dict[str, Findings]:
+    # Item-level difference per target and finding key; non-list findings (e.g. sqlmap's summary) compare whole
+    delta: Dict[str, Findings] = {'new': {}, 'removed': {}}
+    for side, before, after in (('new', previous, current), ('removed', current, previous)):
+        for target, by_key in after.items():
+            for key, value in by_key.items():
+                old = _items(before.get(target, {}).get(key, []))
+                changed = [item for marker, item in _items(value).items() if marker not in old]
+                if changed:
+                    delta[side].setdefault(target, {})[key] = changed
+    return delta
@@ -0,0 +1,90 @@
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from security_pipeline import (SecurityTask, ParserConfig, StreamingConfig, PARSERS, run_security_tool,
+                               stream_security_tool, parse_tool_output, error_kind)
+from pipeline_metrics import TaskMetrics
+from task_queue import TaskQueue, SQLiteTaskQueue, RemoteTaskQueue
+
+def execute_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Runs one queued task and returns the result document the coordinator expects; never raises
+    task = SecurityTask(**payload['task'])
+    parsing = ParserConfig(**payload.get('parsing', {}))
+    metrics = TaskMetrics()
+    try:
+        if payload.get('streaming') and task.task_type in PARSERS:
+            streaming = StreamingConfig(enabled=True, timeout=payload.get('timeout', 300))
+            output, _, parsed = stream_security_tool(task, streaming, parsing, metrics)
+        else:
+            output = run_security_tool(task, parsing.machine_readable, metrics)
+            parse_started = time.perf_counter()
+            parsed = parse_tool_output(task.task_type, output, parsing.structured, parsing.machine_readable)
+            metrics.parse_time += time.perf_counter() - parse_started
+        return {'output': output, 'parsed': parsed, 'metrics': metrics.model_dump()}
+    except Exception as e:
+        result = {'error': str(e), 'kind': error_kind(e), 'metrics': metrics.model_dump()}
+        if hasattr(e, 'timeout'):
+            result['timeout'] = e.timeout
+        return result
+
+def run_worker(queue: TaskQueue, worker_id: Optional[str] = None, lease_seconds: float = 60,
+               poll_interval: float = 1.0, stop: Optional[threading.Event] = None, max_jobs: Optional[int] = None) -> int:
+    # Leases and runs jobs until stopped (or max_jobs have run); returns the number of jobs run
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    stop = stop or threading.Event()
+    jobs = 0
+    while not stop.is_set() and (max_jobs is None or jobs < max_jobs):
+        leased = queue.lease(worker_id, lease_seconds)
+        if leased is None:
+            stop.wait(poll_interval)
+            continue
+        job_id, payload = leased
+        logging.info(f"Worker {worker_id} running job {job_id}: {payload['task']['task_type']} on {payload['task']['target']}")
+        # Renew the lease at a third of its length so only a dead or hung worker loses it
+        finished = threading.Event()
+        def heartbeat():
+            while not finished.wait(lease_seconds / 3):
+                if not queue.renew(job_id, worker_id, lease_seconds):
+                    return
+        beat = threading.Thread(target=heartbeat, daemon=True)
+        beat.start()
+        try:
+            result = execute_job(payload)
+        finally:
+            finished.set()
+            beat.join()
+        if not queue.complete(job_id, worker_id, result):
+            logging.warning(f"Worker {worker_id} lost the lease on job {job_id}; result discarded")
+        jobs += 1
+    return jobs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued security pipeline tasks")
+    backend = parser.add_mutually_exclusive_group(required=True)
+    backend.add_argument('--sqlite', help="path to a SQLiteTaskQueue database")
+    backend.add_argument('--connect', help="HOST:PORT of a QueueServer")
+    parser.add_argument('--token', default=os.environ.get('PIPELINE_QUEUE_TOKEN'))
+    parser.add_argument('--worker-id')
+    parser.add_argument('--lease', type=float, default=60)
+    parser.add_argument('--poll', type=float, default=1.0)
+    parser.add_argument('--max-jobs', type=int)
+    args = parser.parse_args(argv)
+    if args.sqlite:
+        queue = SQLiteTaskQueue(args.sqlite)
+    else:
+        host, _, port = args.connect.rpartition(':')
+        queue = RemoteTaskQueue(host, int(port), token=args.token)
+    try:
+        run_worker(queue, args.worker_id, args.lease, args.poll, max_jobs=args.max_jobs)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        queue.close()
+
+if __name__ == '__main__':
+    main()
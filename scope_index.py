@@ -0,0 +1,65 @@
+import ipaddress
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Tuple, Union
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+_TERMINAL = ''  # trie key marking "an allowed domain ends here"; real labels are never looked up as ''
+
+class IntervalIndex:
+    # Sorted, merged [start, end] address ranges searched with bisect
+    def __init__(self, networks: Iterable[IPNetwork]):
+        ranges = sorted((int(net.network_address), int(net.broadcast_address)) for net in networks)
+        merged: List[Tuple[int, int]] = []
+        for start, end in ranges:
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __contains__(self, address: int) -> bool:
+        i = bisect_right(self.starts, address) - 1
+        return i >= 0 and address <= self.ends[i]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+class DomainTrie:
+    # Reversed-label trie: "api.example.com" is stored as com -> example -> api
+    def __init__(self, domains: Iterable[str]):
+        self.root: Dict[str, dict] = {}
+        for domain in domains:
+            node = self.root
+            for label in reversed(domain.split('.')):
+                node = node.setdefault('.' + label, {})
+            node[_TERMINAL] = {}
+
+    def matches(self, hostname: str) -> bool:
+        # True if hostname equals an allowed domain or is a subdomain of one
+        node = self.root
+        for label in reversed(hostname.split('.')):
+            node = node.get('.' + label)
+            if node is None:
+                return False
+            if _TERMINAL in node:
+                return True
+        return False
+
+class ScopeIndex:
+    def __init__(self, domains: Iterable[str], networks: Iterable[IPNetwork]):
+        networks = list(networks)
+        self.ipv4 = IntervalIndex(net for net in networks if net.version == 4)
+        self.ipv6 = IntervalIndex(net for net in networks if net.version == 6)
+        self.domains = DomainTrie(domains)
+
+    def contains_ip(self, ip: Union[ipaddress.IPv4Address, ipaddress.IPv6Address]) -> bool:
+        return int(ip) in (self.ipv4 if ip.version == 4 else self.ipv6)
+
+    def contains(self, target: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(target)
+        except ValueError:
+            return self.domains.matches(target.lower())
+        return self.contains_ip(ip)
@@ -1,16 +1,38 @@
 import streamlit as st
-from security_pipeline import ScopeConfig, SecurityTask, SecurityPipeline
+from security_pipeline import ScopeConfig, SecurityTask, StagingConfig, IntakeConfig
+from result_cache import ResultCache
+from rate_governor import RateLimitConfig
+from dns_cache import DNSCache
+from sqlmap_api import SqlmapServerPool
+from pipeline_worker import PipelineWorker, tail_file
 import os
 import json
+import time
 
 st.title("Real-Time Cybersecurity Pipeline")
 
 st.header("Configure Scope")
 domains = st.text_area("Allowed Domains (one per line)", "google.com")
 ips = st.text_area("Allowed IPs/CIDRs (one per line)", "142.251.42.0/24")
+check_ips = st.checkbox("Require hostnames to resolve into the allowed IPs")
+follow_ups = st.checkbox("Run gobuster/ffuf only against web ports found by nmap", value=True)
+rate_limited = st.checkbox("Adapt request rates to each target (back off on 429/503 and timeouts)", value=True)
+coalesce = st.checkbox("Run duplicate tasks once and merge overlapping nmap port ranges", value=True)
+sqlmap_servers = st.checkbox("Run sqlmap through persistent sqlmapapi servers", value=True)
 
 if 'tasks' not in st.session_state:
     st.session_state.tasks = []
+if 'cache' not in st.session_state:
+    st.session_state.cache = ResultCache(os.path.join(os.getcwd(), 'cache', 'results.sqlite'))
+if 'dns' not in st.session_state:
+    st.session_state.dns = DNSCache()
+if 'sqlmap_api' not in st.session_state:
+    st.session_state.sqlmap_api = SqlmapServerPool()
+if 'worker' not in st.session_state:
+    st.session_state.worker = None
+    st.session_state.worker_scope = None
+    st.session_state.submitted = set()
+    st.session_state.feed = []
 
 st.header("Add Tasks")
 with st.form(key='task_form'):
@@ -26,45 +48,88 @@ with st.form(key='task_form'):
     elif task_type == "sqlmap":
         level = st.text_input("Level (1-5)", "1")
         parameters["level"] = level
+    force_refresh = st.checkbox("Force refresh (ignore cached results)")
     submit = st.form_submit_button(label="Add Task")
     if submit and target:
-        task = SecurityTask(task_type=task_type, target=target, parameters=parameters)
+        task = SecurityTask(task_type=task_type, target=target, parameters=parameters, force_refresh=force_refresh)
         st.session_state.tasks.append(task)
         st.success(f"Added {task_type} task for {target}")
 
 st.header("Tasks")
 if st.session_state.tasks:
     for task in st.session_state.tasks:
-        st.write(f"- {task.task_type} on {task.target} (Status: {task.status})")
+        cached = " (cached)" if task.cache_hit else ""
+        st.write(f"- {task.task_type} on {task.target} (Status: {task.status}){cached}")
 else:
     st.write("No tasks added yet.")
 
 if st.button("Run Pipeline"):
+    pending = [task for task in st.session_state.tasks if id(task) not in st.session_state.submitted]
     if not st.session_state.tasks:
         st.warning("Please add at least one task before running the pipeline.")
+    elif not pending:
+        st.info("All tasks have already been queued.")
     else:
-        scope = ScopeConfig(allowed_domains=domains.splitlines(), allowed_ips=ips.splitlines())
-        pipeline = SecurityPipeline(scope, st.session_state.tasks)
-        with st.spinner("Running pipeline..."):
-            state = pipeline.run()
-        st.success("Pipeline completed!")
+        worker = st.session_state.worker
+        scope_key = (domains, ips, check_ips, follow_ups, rate_limited, sqlmap_servers, coalesce)
+        if worker is None or (scope_key != st.session_state.worker_scope and not worker.busy):
+            if worker is not None:
+                worker.stop(timeout=1)
+            scope = ScopeConfig(allowed_domains=domains.splitlines(), allowed_ips=ips.splitlines(), check_resolved_ips=check_ips)
+            worker = PipelineWorker(scope, cache=st.session_state.cache, staging=StagingConfig(enabled=follow_ups),
+                                    intake=IntakeConfig(enabled=coalesce),
+                                    rate_limit=RateLimitConfig(enabled=rate_limited), dns=st.session_state.dns,
+                                    sqlmap_api=st.session_state.sqlmap_api if sqlmap_servers else None)
+            st.session_state.worker = worker
+            st.session_state.worker_scope = scope_key
+        elif scope_key != st.session_state.worker_scope:
+            st.warning("Scope and staging changes take effect once the current run has finished.")
+        worker.submit(pending)
+        st.session_state.submitted.update(id(task) for task in pending)
+        st.success(f"Queued {len(pending)} task(s)")
 
-        st.header("Findings")
-        if state.findings:
-            for target, data in state.findings.items():
-                st.subheader(target)
-                st.json(data)
-        else:
-            st.write("No findings yet.")
+worker = st.session_state.worker
+if worker is not None:
+    for event in worker.events():
+        if event['kind'] in ('finding', 'findings'):
+            st.session_state.feed.append(event)
+        elif event['kind'] == 'run' and event['state'] == 'error':
+            st.error(f"Pipeline run failed: {event['error']}")
+    st.session_state.feed = st.session_state.feed[-500:]
 
-        st.header("Execution Logs")
-        log_file = os.path.join(os.getcwd(), 'Logs', 'security_pipeline.log')
-        if os.path.exists(log_file):
-            with open(log_file, 'r') as f:
-                st.text_area("Logs", f.read(), height=300)
+    st.header("Progress")
+    tasks = list(worker.state.tasks)
+    finished = sum(task.status in ('completed', 'failed', 'skipped') for task in tasks)
+    st.progress(finished / len(tasks) if tasks else 0.0)
+    st.write(f"{finished} of {len(tasks)} tasks finished" + (" - running..." if worker.busy else ""))
 
-        st.header("Audit Report")
-        report_file = os.path.join(os.getcwd(), 'audit_report.json')
-        if os.path.exists(report_file):
+    st.header("Findings")
+    if st.session_state.feed:
+        for event in reversed(st.session_state.feed[-50:]):
+            found = event.get('findings', event.get('item'))
+            st.write(f"- {event['task_type']} on {event['target']}: {found}")
+        with st.expander("All findings by target"):
+            st.json(worker.state.findings)
+    else:
+        st.write("No findings yet.")
+
+    with st.expander("Performance metrics"):
+        st.json(worker.state.metrics.snapshot())
+
+    st.header("Execution Logs")
+    log_lines = st.slider("Log lines", 50, 1000, 200, step=50)
+    log_file = os.path.join(os.getcwd(), 'Logs', 'security_pipeline.log')
+    st.text_area("Logs", "\n".join(tail_file(log_file, log_lines)), height=300)
+
+    st.header("Audit Report")
+    report_file = os.path.join(os.getcwd(), 'audit_report.json')
+    if os.path.exists(report_file):
+        st.write(f"Report: {report_file} ({os.path.getsize(report_file) / 1024:.1f} KiB)")
+        if st.checkbox("Load full audit report"):
             with open(report_file, 'r') as f:
-                st.json(json.load(f))
\ No newline at end of file
+                st.json(json.load(f))
+
+    if worker.busy:
+        # Poll the background run: rerun the script every second until it goes idle
+        time.sleep(1)
+        (getattr(st, 'rerun', None) or st.experimental_rerun)()
@@ -156,11 +156,37 @@
 import subprocess
 import logging
 import os
+import hashlib
+import heapq
+import itertools
 import json
-from typing import List, Dict, Optional, Any
-from pydantic import BaseModel, ConfigDict  # Updated to Pydantic v2
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import List, Dict, Optional, Any, Callable, Deque, Iterable, Set, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr  # Updated to Pydantic v2
 import ipaddress
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from langgraph.graph import StateGraph, END
+from scope_index import ScopeIndex
+from result_cache import ResultCache, cache_key
+from report_writer import ReportWriter, finalize_report, findings_key
+from checkpoint import CheckpointStore
+from pipeline_metrics import MetricsRegistry, TaskMetrics
+from task_queue import TaskQueue
+from rate_governor import RateLimitConfig, RateGovernor, output_response_counts, rate_flags
+from run_history import RunHistory, diff_findings, fingerprint, http_probe, scan_key, system_resolver
+from dns_cache import DNSCache
+from compact_store import TaskCompactor, TaskRecord
+from sqlmap_api import SqlmapAPIError, SqlmapServerPool, api_findings
+from tool_parsers import PARSERS, get_parser, parse_output, merge_results
 
 # Set up logging
 log_dir = os.path.join(os.getcwd(), 'Logs')
@@ -176,19 +202,36 @@ logging.basicConfig(
 class ScopeConfig(BaseModel):
     allowed_domains: List[str]
     allowed_ips: List[str] = []
+    check_resolved_ips: bool = True  # with a DNS cache, hostnames must also resolve into allowed_ips (if any)
+    _index: ScopeIndex = PrivateAttr()
 
     def __init__(self, **data):
         super().__init__(**data)
         self.allowed_domains = [d.lower() for d in self.allowed_domains]
         self.allowed_ips = [ipaddress.ip_network(ip, strict=False) for ip in self.allowed_ips]
+        self.rebuild_index()
+
+    def rebuild_index(self):
+        # Call after mutating allowed_domains/allowed_ips in place
+        self._index = ScopeIndex(self.allowed_domains, self.allowed_ips)
 
     def is_in_scope(self, target: str) -> bool:
-        try:
-            ip = ipaddress.ip_address(target)
-            return any(ip in net for net in self.allowed_ips)
-        except ValueError:
-            target = target.lower()
-            return any(target == d or target.endswith('.' + d) for d in self.allowed_domains)
+        return self._index.contains(target)
+
+    def filter_in_scope(self, targets: Iterable[str]) -> List[str]:
+        contains = self._index.contains
+        return [target for target in targets if contains(target)]
+
+    def addresses_in_scope(self, addresses: Iterable[str]) -> List[str]:
+        if not (self.check_resolved_ips and self.allowed_ips):
+            return list(addresses)
+        return [address for address in addresses if self._index.contains_ip(ipaddress.ip_address(address))]
+
+class ToolNotFoundError(RuntimeError):
+    pass
+
+class ToolExecutionError(RuntimeError):
+    pass
 
 class SecurityTask(BaseModel):
     task_type: str
@@ -196,96 +239,1172 @@ class SecurityTask(BaseModel):
     parameters: Dict[str, str]
     status: str = 'pending'
     result: Optional[str] = None
+    output_path: Optional[str] = None
     error: Optional[str] = None
     retries: int = 0
+    force_refresh: bool = False
+    cache_hit: bool = False
+    parsed: Optional[Any] = None
+    shards: List['SecurityTask'] = []
+    depends_on: Optional[int] = None  # index of the discovery task whose results generated this one
+    metrics: TaskMetrics = Field(default_factory=TaskMetrics)
+    rate: Optional[float] = None  # per-task rate budget from the governor, passed to the tool as flags
+    addresses: List[str] = []  # in-scope IPs the target resolved to; the first is pinned for the tool
 
-def run_security_tool(task: SecurityTask) -> str:
-    logging.info(f"Starting {task.task_type} on {task.target}")
+def pin_url(url: str, address: str) -> str:
+    parts = urlsplit(url)
+    host = f"[{address}]" if ':' in address else address
+    return urlunsplit(parts._replace(netloc=host + (f":{parts.port}" if parts.port else '')))
+
+def pins_address(task: SecurityTask) -> bool:
+    # Whether build_command points the tool at task.addresses[0]; the rest resolve the hostname themselves
+    if task.task_type == 'nmap':
+        return True
+    return task.task_type in ('gobuster', 'ffuf') and task.parameters.get('url', 'http://').startswith('http://')
+
+def build_command(task: SecurityTask, machine: bool = False) -> List[str]:
     wordlist_path = r"C:\wordlists\common.txt"
     sqlmap_path = r"C:\Tools\sqlmap\sqlmap.py"
     
+    url = task.parameters.get('url', f"http://{task.target}")
+    pinned = task.addresses[0] if task.addresses else None
+    headers = []
+    if pinned and url.startswith('http://'):
+        # Plain HTTP can be pinned with a Host header; HTTPS keeps the hostname so SNI and certificates still match
+        headers = ['-H', f"Host: {urlsplit(url).netloc}"]
+        url = pin_url(url, pinned)
+    
     cmd_map = {
-        'nmap': ['nmap', '-Pn', task.target, '-p', task.parameters.get('-p', '1-65535')],
-        'gobuster': ['gobuster', 'dir', '-u', f"http://{task.target}", '-w', task.parameters.get('wordlist', wordlist_path), '-b', '400'],
-        'ffuf': ['ffuf', '-u', f"http://{task.target}/FUZZ", '-w', task.parameters.get('wordlist', wordlist_path)],
-        'sqlmap': ['python', sqlmap_path, '-u', task.target, '--batch', f"--level={task.parameters.get('level', '1')}"]
+        'nmap': ['nmap', '-Pn', pinned or task.target, '-p', task.parameters.get('-p', '1-65535')],
+        'gobuster': ['gobuster', 'dir', '-u', url, '-w', task.parameters.get('wordlist', wordlist_path), '-b', '400'] + headers,
+        'ffuf': ['ffuf', '-u', f"{url}/FUZZ", '-w', task.parameters.get('wordlist', wordlist_path)] + headers,
+        'sqlmap': ['python', sqlmap_path, '-u', task.parameters.get('url', task.target), '--batch', f"--level={task.parameters.get('level', '1')}"]
     }
     
     if task.task_type not in cmd_map:
         raise ValueError(f"Unknown task type: {task.task_type}")
-    
     cmd = cmd_map[task.task_type]
+    if task.rate:
+        cmd = cmd + rate_flags(task.task_type, task.rate)
+    if machine and task.task_type in PARSERS:
+        cmd = cmd + PARSERS[task.task_type].machine_args
+    return cmd
+
+def run_command(cmd: List[str], timeout: float = 300, metrics: Optional[TaskMetrics] = None) -> subprocess.CompletedProcess:
+    # subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=timeout), except the child is reaped
+    # through _reap so its CPU time and peak RSS land in metrics
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    stderr: List[str] = []
+    stderr_reader = threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)
+    stderr_reader.start()
+    timed_out = threading.Event()
+    watchdog = threading.Timer(timeout, lambda: (timed_out.set(), proc.kill()))
+    watchdog.start()
+    try:
+        stdout = proc.stdout.read()
+        returncode = _reap(proc, metrics)
+    finally:
+        watchdog.cancel()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        stderr_reader.join(timeout=1)
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout, output=stdout, stderr=''.join(stderr))
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, output=stdout, stderr=''.join(stderr))
+    return subprocess.CompletedProcess(cmd, returncode, stdout, ''.join(stderr))
+
+def run_security_tool(task: SecurityTask, machine: bool = False, metrics: Optional[TaskMetrics] = None) -> str:
+    logging.info(f"Starting {task.task_type} on {task.target}")
+    cmd = build_command(task, machine)
+    started = time.perf_counter()
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=300)
+        result = run_command(cmd, timeout=300, metrics=metrics)
         logging.info(f"Completed {task.task_type} on {task.target}")
+        if metrics is not None:
+            metrics.output_bytes += len(result.stdout.encode())
         return result.stdout
     except subprocess.TimeoutExpired as e:
         logging.error(f"{task.task_type} on {task.target} timed out")
         raise
     except subprocess.CalledProcessError as e:
         logging.error(f"{task.task_type} failed: {e.stderr}")
+        raise ToolExecutionError(f"{task.task_type} exited with status {e.returncode}: {e.stderr}") from e
+    except FileNotFoundError:
+        logging.error(f"Tool {task.task_type} not found.")
+        raise ToolNotFoundError(f"Tool {task.task_type} not found")
+    finally:
+        if metrics is not None:
+            metrics.wall_time += time.perf_counter() - started
+
+VERSION_ARGS = {'nmap': ['--version'], 'gobuster': ['version'], 'ffuf': ['-V'], 'sqlmap': ['--version']}
+
+@lru_cache(maxsize=None)
+def tool_version(task_type: str) -> str:
+    # First line of the tool's version banner; part of the cache key so upgrades invalidate old results
+    if task_type not in VERSION_ARGS:
+        return 'unknown'
+    cmd = build_command(SecurityTask(task_type=task_type, target='', parameters={}))
+    executable = cmd[:2] if task_type == 'sqlmap' else cmd[:1]
+    try:
+        result = subprocess.run(executable + VERSION_ARGS[task_type], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+    lines = (result.stdout or result.stderr or '').strip().splitlines()
+    return lines[0].strip() if lines else 'unknown'
+
+def run_sqlmap_api(task: SecurityTask, pool: SqlmapServerPool, structured: bool = False, timeout: float = 300,
+                   metrics: Optional[TaskMetrics] = None) -> Tuple[str, Any]:
+    # Findings come from the API's JSON data; the scan log stands in for console output in the raw report
+    logging.info(f"Starting sqlmap (API) on {task.target}")
+    options = {'url': task.parameters.get('url', task.target), 'batch': True, 'level': int(task.parameters.get('level', '1'))}
+    if task.rate:
+        options['delay'] = round(1 / task.rate, 3)
+    started = time.perf_counter()
+    try:
+        data, log = pool.scan(options, timeout)
+    except SqlmapAPIError:
         raise
+    except subprocess.TimeoutExpired:
+        logging.error(f"sqlmap on {task.target} timed out")
+        raise
+    except RuntimeError as e:
+        raise ToolExecutionError(str(e)) from e
+    finally:
+        if metrics is not None:
+            metrics.wall_time += time.perf_counter() - started
+    output = '\n'.join(log)
+    if metrics is not None:
+        metrics.output_bytes += len(output.encode())
+    logging.info(f"Completed sqlmap (API) on {task.target}")
+    return output, api_findings(data['data'], structured)
+
+def parse_tool_output(task_type: str, output: str, structured: bool = False, machine: bool = False) -> Any:
+    # Legacy shapes by default (port ints, paths, status strings, {'vulnerable': bool}); structured=True keeps full records
+    return parse_output(task_type, output, structured=structured, machine=machine)
+
+def merge_findings(task_type: str, parts: List[Any], structured: bool = False) -> Any:
+    return merge_results(task_type, parts, structured)
+
+class ParserConfig(BaseModel):
+    structured: bool = False
+    machine_readable: bool = False
+
+class StreamingConfig(BaseModel):
+    enabled: bool = False
+    spool_dir: Optional[str] = None
+    on_finding: Optional[Callable[[SecurityTask, Any], None]] = None
+    timeout: int = 300
+
+def _spool_path(spool_dir: str, task: SecurityTask) -> str:
+    os.makedirs(spool_dir, exist_ok=True)
+    safe_target = re.sub(r'[^A-Za-z0-9._-]', '_', task.target)
+    return os.path.join(spool_dir, f"{task.task_type}-{safe_target}-{uuid.uuid4().hex[:8]}.log")
+
+def _reap(proc: subprocess.Popen, metrics: Optional[TaskMetrics]) -> int:
+    # wait4 gives this child's own CPU time and peak RSS, unlike getrusage(RUSAGE_CHILDREN) under concurrency
+    if metrics is None or not hasattr(os, 'wait4'):
+        return proc.wait()
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    metrics.cpu_user = (metrics.cpu_user or 0.0) + usage.ru_utime
+    metrics.cpu_system = (metrics.cpu_system or 0.0) + usage.ru_stime
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    metrics.max_rss = max(metrics.max_rss or 0, max_rss)
+    return proc.returncode
+
+def stream_security_tool(task: SecurityTask, config: StreamingConfig,
+                         parsing: ParserConfig = ParserConfig(),
+                         metrics: Optional[TaskMetrics] = None) -> Tuple[Optional[str], Optional[str], Any]:
+    # Returns (output, spool_path, findings); output is only kept in memory when not spooling
+    logging.info(f"Starting {task.task_type} on {task.target} (streaming)")
+    cmd = build_command(task, parsing.machine_readable)
+    parser = get_parser(task.task_type, parsing.machine_readable)
+    parser_cls = type(parser)
+    started = time.perf_counter()
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1)
     except FileNotFoundError:
         logging.error(f"Tool {task.task_type} not found.")
-        raise RuntimeError(f"Tool {task.task_type} not found")
-
-def parse_tool_output(task_type: str, output: str) -> Any:
-    if task_type == 'nmap':
-        return [int(line.split('/')[0].strip()) for line in output.splitlines() if '/tcp' in line and 'open' in line]
-    elif task_type == 'gobuster':
-        return [line.split()[0].strip() for line in output.splitlines() if line.strip().startswith('/')]
-    elif task_type == 'ffuf':
-        return [line.split('[Status:')[1].split(',')[0].strip() for line in output.splitlines() if '[Status:' in line]
-    elif task_type == 'sqlmap':
-        return {'vulnerable': 'is vulnerable' in output.lower()}
-    return output
+        raise ToolNotFoundError(f"Tool {task.task_type} not found")
+
+    # Drain stderr on the side so a chatty tool can't block on a full pipe
+    stderr_tail: Deque[str] = deque(maxlen=50)
+    stderr_reader = threading.Thread(target=lambda: stderr_tail.extend(proc.stderr), daemon=True)
+    stderr_reader.start()
+    timed_out = threading.Event()
+    watchdog = threading.Timer(config.timeout, lambda: (timed_out.set(), proc.kill()))
+    watchdog.start()
+
+    spool_path = _spool_path(config.spool_dir, task) if config.spool_dir else None
+    chunks: List[str] = []
+    records: List[Dict[str, Any]] = []
+    output_bytes = 0
+    parse_time = 0.0
+    try:
+        with (open(spool_path, 'w') if spool_path else nullcontext()) as spool:
+            for line in proc.stdout:
+                if spool:
+                    spool.write(line)
+                else:
+                    chunks.append(line)
+                output_bytes += len(line.encode())
+                parse_started = time.perf_counter()
+                completed = parser.feed(line)
+                parse_time += time.perf_counter() - parse_started
+                for record in completed:
+                    records.append(record)
+                    item = record if parsing.structured else parser_cls.legacy_item(record)
+                    if item is None:
+                        continue
+                    logging.info(f"{task.task_type} on {task.target} found {item}")
+                    if config.on_finding:
+                        config.on_finding(task, item)
+            records.extend(parser.close())
+        returncode = _reap(proc, metrics)
+    finally:
+        watchdog.cancel()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        stderr_reader.join(timeout=1)
+        if metrics is not None:
+            metrics.wall_time += time.perf_counter() - started
+            metrics.output_bytes += output_bytes
+            metrics.parse_time += parse_time
+
+    if timed_out.is_set():
+        logging.error(f"{task.task_type} on {task.target} timed out")
+        raise subprocess.TimeoutExpired(cmd, config.timeout)
+    if returncode != 0:
+        stderr = ''.join(stderr_tail)
+        logging.error(f"{task.task_type} failed: {stderr}")
+        raise ToolExecutionError(f"{task.task_type} exited with status {returncode}: {stderr}")
+    logging.info(f"Completed {task.task_type} on {task.target}")
+    output = None if spool_path else ''.join(chunks)
+    findings = parser_cls.structure(records) if parsing.structured else parser_cls.summarize(records)
+    return output, spool_path, findings
+
+class ConcurrencyConfig(BaseModel):
+    max_workers: int = 1
+    per_tool_limits: Dict[str, int] = {}
+    per_target_limit: Optional[int] = None
+
+    def tool_limit(self, task_type: str) -> int:
+        return max(1, self.per_tool_limits.get(task_type, self.max_workers))
+
+    def target_limit(self) -> int:
+        return max(1, self.per_target_limit or self.max_workers)
+
+class ShardingConfig(BaseModel):
+    enabled: bool = False
+    port_chunk_size: int = 4096
+    wordlist_chunk_lines: int = 5000
+    shard_dir: str = os.path.join('cache', 'shards')
+
+def parse_port_spec(spec: str) -> Optional[List[Tuple[int, int]]]:
+    # "22,80-90,443" -> merged [(22, 22), (80, 90), (443, 443)]; None for specs we can't safely split (e.g. "T:80,U:53")
+    ranges = []
+    for part in spec.replace(' ', '').split(','):
+        if not part:
+            continue
+        low, _, high = part.partition('-')
+        if not low.isdigit() or (high and not high.isdigit()):
+            return None
+        ranges.append((int(low), int(high or low)))
+    return merge_port_ranges(ranges) or None
+
+def merge_port_ranges(ranges: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for low, high in sorted(ranges):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+def split_port_ranges(ranges: List[Tuple[int, int]], chunk_size: int) -> List[str]:
+    chunks, current, count = [], [], 0
+    for low, high in ranges:
+        while low <= high:
+            take = min(high - low + 1, chunk_size - count)
+            current.append((low, low + take - 1))
+            count += take
+            low += take
+            if count == chunk_size:
+                chunks.append(current)
+                current, count = [], 0
+    if current:
+        chunks.append(current)
+    return [format_port_spec(chunk) for chunk in chunks]
+
+def format_port_spec(ranges: List[Tuple[int, int]]) -> str:
+    return ','.join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+def split_wordlist(path: str, chunk_lines: int, shard_dir: str) -> List[str]:
+    # Writes chunk files next to each other under shard_dir; reuses them if the wordlist hasn't changed
+    stat = os.stat(path)
+    digest = hashlib.sha256(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{chunk_lines}".encode()).hexdigest()[:16]
+    base = os.path.join(shard_dir, digest)
+    done_marker = os.path.join(base, 'complete')
+    if os.path.exists(done_marker):
+        with open(done_marker) as f:
+            return f.read().split('\n')
+    os.makedirs(base, exist_ok=True)
+    chunks: List[str] = []
+    out = None
+    with open(path, errors='replace') as wordlist:
+        for i, line in enumerate(wordlist):
+            if i % chunk_lines == 0:
+                if out:
+                    out.close()
+                chunks.append(os.path.join(base, f"{len(chunks):05d}.txt"))
+                out = open(chunks[-1], 'w')
+            out.write(line)
+    if out:
+        out.close()
+    with open(done_marker, 'w') as f:
+        f.write('\n'.join(chunks))
+    return chunks
+
+def shard_task(task: SecurityTask, config: ShardingConfig) -> List[SecurityTask]:
+    # Returns the shard tasks for a large scan, or [] if the task is small enough to run whole
+    if task.task_type == 'nmap':
+        ranges = parse_port_spec(task.parameters.get('-p', '1-65535'))
+        if not ranges or sum(high - low + 1 for low, high in ranges) <= config.port_chunk_size:
+            return []
+        specs = split_port_ranges(ranges, config.port_chunk_size)
+        return [SecurityTask(task_type=task.task_type, target=task.target,
+                             parameters={**task.parameters, '-p': spec}, force_refresh=task.force_refresh)
+                for spec in specs]
+    if task.task_type in ('gobuster', 'ffuf'):
+        wordlist = task.parameters.get('wordlist')
+        if not wordlist or not os.path.isfile(wordlist):
+            return []
+        chunks = split_wordlist(wordlist, config.wordlist_chunk_lines, config.shard_dir)
+        if len(chunks) < 2:
+            return []
+        return [SecurityTask(task_type=task.task_type, target=task.target,
+                             parameters={**task.parameters, 'wordlist': chunk}, force_refresh=task.force_refresh)
+                for chunk in chunks]
+    return []
+
+class RetryPolicy(BaseModel):
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter: uniform over [0, base * 2^(attempt-1)], capped at max_delay
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+def is_retryable(error: Exception) -> bool:
+    # Timeouts and non-zero exits may be transient; missing tools and bad task definitions never are
+    if isinstance(error, (ToolNotFoundError, ValueError)):
+        return False
+    return isinstance(error, (subprocess.TimeoutExpired, ToolExecutionError, OSError))
+
+class StagingConfig(BaseModel):
+    # Discovery stage: open HTTP(S) ports found by nmap generate these follow-up tasks (tool -> parameters)
+    enabled: bool = False
+    follow_ups: Dict[str, Dict[str, str]] = {'gobuster': {}, 'ffuf': {}}
+
+HTTP_PORTS = {80: 'http', 443: 'https', 8000: 'http', 8008: 'http', 8080: 'http', 8443: 'https', 8888: 'http', 9443: 'https'}
+
+def http_endpoints(parsed: Any) -> List[Tuple[str, int]]:
+    # (scheme, port) for every open web port in nmap findings; legacy port lists fall back to well-known ports
+    endpoints = []
+    for item in parsed or []:
+        if isinstance(item, int):
+            port, service = item, ''
+        elif item.get('proto') == 'tcp' and 'open' in item.get('state', ''):
+            port, service = item['port'], item.get('service', '')
+        else:
+            continue
+        if (service and 'http' not in service) or (not service and port not in HTTP_PORTS):
+            continue
+        secure = 'https' in service or 'ssl' in service or (isinstance(item, dict) and item.get('tunnel') == 'ssl')
+        scheme = 'https' if secure or HTTP_PORTS.get(port) == 'https' else 'http'
+        if (scheme, port) not in endpoints:
+            endpoints.append((scheme, port))
+    return endpoints
+
+def task_endpoint(task: SecurityTask) -> Tuple[str, int]:
+    parts = urlsplit(task.parameters.get('url', f"http://{task.target}"))
+    return parts.scheme, parts.port or (443 if parts.scheme == 'https' else 80)
+
+def plan_follow_ups(task: SecurityTask, index: int, config: StagingConfig,
+                    existing: Iterable[SecurityTask]) -> List[SecurityTask]:
+    # One task per follow-up tool and open web port, minus any already queued for the same endpoint
+    target = task.target.lower()
+    taken = {(other.task_type, task_endpoint(other)) for other in existing if other.target.lower() == target}
+    follow_ups = []
+    for scheme, port in http_endpoints(task.parsed):
+        for tool, parameters in config.follow_ups.items():
+            if (tool, (scheme, port)) in taken:
+                continue
+            parameters = dict(parameters)
+            if (scheme, port) != ('http', 80):
+                default = 443 if scheme == 'https' else 80
+                parameters['url'] = f"{scheme}://{task.target}" + ('' if port == default else f":{port}")
+            follow_ups.append(SecurityTask(task_type=tool, target=task.target, parameters=parameters,
+                                           force_refresh=task.force_refresh, depends_on=index))
+            taken.add((tool, (scheme, port)))
+    return follow_ups
+
+class IntakeConfig(BaseModel):
+    # Planning pass before execution: normalize targets, run identical tasks once, merge overlapping nmap port sets
+    enabled: bool = False
+    merge_ports: bool = True
+
+def normalize_task(task: SecurityTask):
+    # "HTTP://Example.com./" -> target "example.com"; web tools keep the URL unless it is the default http://target
+    target = task.target.strip()
+    parameters = dict(task.parameters)
+    if '://' in target:
+        if task.task_type in ('gobuster', 'ffuf', 'sqlmap'):
+            parameters.setdefault('url', target)
+        target = urlsplit(target).hostname or target
+    target = target.lower().rstrip('.')
+    url = parameters.get('url')
+    if url and '://' in url:
+        parts = urlsplit(url)
+        netloc = parts.netloc.lower()
+        if parts.hostname and parts.hostname.endswith('.'):
+            netloc = netloc.replace(parts.hostname, parts.hostname.rstrip('.'), 1)
+        parts = parts._replace(scheme=parts.scheme.lower(), netloc=netloc)
+        if task.task_type in ('gobuster', 'ffuf'):
+            parts = parts._replace(path=parts.path.rstrip('/'))
+        url = urlunsplit(parts)
+        if task.task_type in ('gobuster', 'ffuf') and url in (f"http://{target}", f"http://{target}:80"):
+            del parameters['url']
+        else:
+            parameters['url'] = url
+    if task.task_type == 'nmap' and '-p' in parameters:
+        ranges = parse_port_spec(parameters['-p'])
+        if ranges:
+            parameters['-p'] = format_port_spec(ranges)
+    task.target = target
+    task.parameters = parameters
+
+def _task_key(task: SecurityTask, exclude: Iterable[str] = ()) -> str:
+    parameters = {key: value for key, value in task.parameters.items() if key not in exclude}
+    return f"{task.task_type}|{task.target}|{json.dumps(parameters, sort_keys=True)}"
+
+def plan_intake(tasks: List[SecurityTask], config: IntakeConfig) -> List[Tuple[SecurityTask, List[SecurityTask]]]:
+    # (coalesced task, requesting tasks) for every group of normalized tasks that can share a run
+    groups: Dict[str, List[SecurityTask]] = {}
+    for task in tasks:
+        groups.setdefault(_task_key(task), []).append(task)
+    merged: List[List[SecurityTask]] = list(groups.values())
+    if config.merge_ports:
+        # Union nmap groups on the same target and options whose port sets overlap
+        by_scan: Dict[str, List[int]] = {}
+        for number, group in enumerate(merged):
+            if group[0].task_type == 'nmap' and parse_port_spec(group[0].parameters.get('-p', '1-65535')):
+                by_scan.setdefault(_task_key(group[0], exclude=('-p',)), []).append(number)
+        root = list(range(len(merged)))
+        def find(number: int) -> int:
+            while root[number] != number:
+                root[number] = number = root[root[number]]
+            return number
+        for numbers in by_scan.values():
+            intervals = sorted((low, high, number) for number in numbers
+                               for low, high in parse_port_spec(merged[number][0].parameters.get('-p', '1-65535')))
+            end, owner = -1, None
+            for low, high, number in intervals:
+                if owner is not None and low <= end:
+                    root[find(number)] = find(owner)
+                if high > end:
+                    end, owner = high, number
+        components: Dict[int, List[SecurityTask]] = {}
+        for number, group in enumerate(merged):
+            components.setdefault(find(number), []).extend(group)
+        merged = list(components.values())
+    order = {id(task): position for position, task in enumerate(tasks)}
+    plan = []
+    for members in merged:
+        if len(members) < 2:
+            continue
+        members.sort(key=lambda task: order[id(task)])
+        lead = members[0]
+        parameters = dict(lead.parameters)
+        if lead.task_type == 'nmap' and len({member.parameters.get('-p') for member in members}) > 1:
+            parameters['-p'] = format_port_spec(merge_port_ranges(
+                r for member in members for r in parse_port_spec(member.parameters.get('-p', '1-65535'))))
+        carrier = SecurityTask(task_type=lead.task_type, target=lead.target, parameters=parameters,
+                               force_refresh=any(member.force_refresh for member in members))
+        plan.append((carrier, members))
+    return plan
+
+def split_findings(carrier: SecurityTask, member: SecurityTask) -> Any:
+    # A merged nmap run's findings, cut down to the ports the requesting task asked for
+    if carrier.task_type != 'nmap' or carrier.parameters.get('-p') == member.parameters.get('-p') or carrier.parsed is None:
+        return carrier.parsed
+    ranges = parse_port_spec(member.parameters.get('-p', '1-65535'))
+    def wanted(item: Any) -> bool:
+        port = item if isinstance(item, int) else item.get('port')
+        return any(low <= port <= high for low, high in ranges)
+    return [item for item in carrier.parsed if wanted(item)]
+
+def error_kind(error: Exception) -> str:
+    # How a worker reports a failure so the coordinator can rebuild an error with the same retry semantics
+    if isinstance(error, subprocess.TimeoutExpired):
+        return 'timeout'
+    if isinstance(error, ToolNotFoundError):
+        return 'not_found'
+    if isinstance(error, ValueError):
+        return 'invalid'
+    if isinstance(error, (ToolExecutionError, OSError)):
+        return 'execution'
+    return 'other'
+
+def remote_error(result: Dict[str, Any]) -> Exception:
+    kind, message = result.get('kind'), result['error']
+    if kind == 'timeout':
+        return subprocess.TimeoutExpired(message, result.get('timeout', 0))
+    if kind == 'not_found':
+        return ToolNotFoundError(message)
+    if kind == 'invalid':
+        return ValueError(message)
+    if kind == 'execution':
+        return ToolExecutionError(message)
+    return RuntimeError(message)
+
+class DeltaConfig(BaseModel):
+    # Skip expensive tools on targets whose discovery scans match the previous run, carrying their findings over
+    enabled: bool = False
+    expensive_tools: List[str] = ['gobuster', 'ffuf', 'sqlmap']
+    resolver: Optional[Callable[[str], List[str]]] = None  # host -> IPs; defaults to system DNS
+    probe_http: bool = True  # also fingerprint each web endpoint nmap found: status, Server header, title hash
+    http_probe: Optional[Callable[[str], Dict[str, Any]]] = None  # URL -> those three; defaults to a plain GET
+
+class ReportConfig(BaseModel):
+    journal_path: str = 'audit_report.jsonl'
+    report_path: str = 'audit_report.json'
+    raw_dir: str = os.path.join('reports', 'raw')
+    compress: bool = False
+    compact: bool = False
+    finalize: bool = True
+    inline_results: bool = False
+    metrics_path: Optional[str] = None  # Prometheus text file rewritten after every run
+
+class CompactConfig(BaseModel):
+    # Settled tasks become slot records sharing ports, paths and parameters; raw output is read back from the
+    # report's blob store on demand. Needs the report journal, which is where the raw output is stored
+    enabled: bool = False
 
 class PipelineState(BaseModel):
     scope: ScopeConfig
-    tasks: List[SecurityTask]
+    tasks: List[Union[SecurityTask, TaskRecord]]
     findings: Dict[str, Any] = {}
+    concurrency: ConcurrencyConfig = ConcurrencyConfig()
+    streaming: StreamingConfig = StreamingConfig()
+    cache: Optional[ResultCache] = None
+    retry: RetryPolicy = RetryPolicy()
+    sharding: ShardingConfig = ShardingConfig()
+    report: ReportConfig = ReportConfig()
+    reporter: Optional[ReportWriter] = None
+    checkpoint: Optional[CheckpointStore] = None
+    parsing: ParserConfig = ParserConfig()
+    staging: StagingConfig = StagingConfig()
+    intake: IntakeConfig = IntakeConfig()
+    compact: CompactConfig = CompactConfig()
+    compactor: Optional[TaskCompactor] = None
+    metrics: MetricsRegistry = Field(default_factory=MetricsRegistry)
+    task_queue: Optional[TaskQueue] = None
+    rate_limit: RateLimitConfig = RateLimitConfig()
+    governor: Optional[RateGovernor] = None
+    history: Optional[RunHistory] = None
+    delta: DeltaConfig = DeltaConfig()
+    run_id: Optional[int] = None
+    dns: Optional[DNSCache] = None
+    sqlmap_api: Optional[SqlmapServerPool] = None
+    on_transition: Optional[Callable[[int, SecurityTask], None]] = None
 
     model_config = ConfigDict(arbitrary_types_allowed=True)  # Updated Config for Pydantic v2
 
+def _run_and_parse(task: SecurityTask, state: PipelineState):
+    key = None
+    task.cache_hit = False
+    if state.cache is not None:
+        variant = f"structured={state.parsing.structured},machine={state.parsing.machine_readable}"
+        key = cache_key(task.task_type, task.target, task.parameters, tool_version(task.task_type), variant)
+        cached = None if task.force_refresh else state.cache.get(key)
+        if cached is not None:
+            logging.info(f"Cache hit for {task.task_type} on {task.target}")
+            task.cache_hit = True
+            task.output_path = cached['output_path']
+            return cached['output'], cached['findings']
+
+    streaming, parsing, governor = state.streaming, state.parsing, state.governor
+    task.metrics.attempts += 1
+    try:
+        api_output = None
+        if state.sqlmap_api is not None and task.task_type == 'sqlmap' and state.task_queue is None:
+            try:
+                api_output = run_sqlmap_api(task, state.sqlmap_api, parsing.structured, streaming.timeout, task.metrics)
+            except SqlmapAPIError as e:
+                logging.warning(f"sqlmap API unavailable, falling back to the subprocess: {e}")
+        if api_output is not None:
+            output, parsed = api_output
+        elif state.task_queue is not None:
+            output, parsed = _dispatch(task, state)
+        elif streaming.enabled and task.task_type in PARSERS:
+            output, task.output_path, parsed = stream_security_tool(task, streaming, parsing, task.metrics)
+        else:
+            output = run_security_tool(task, parsing.machine_readable, task.metrics)
+            parse_started = time.perf_counter()
+            parsed = parse_tool_output(task.task_type, output, parsing.structured, parsing.machine_readable)
+            task.metrics.parse_time += time.perf_counter() - parse_started
+    except subprocess.TimeoutExpired:
+        if governor is not None:
+            governor.observe(task.target, timed_out=True)
+        raise
+    if governor is not None:
+        governor.observe(task.target, *output_response_counts(output, task.output_path))
+    if key is not None:
+        state.cache.put(key, task.task_type, task.target, output, task.output_path, parsed)
+    return output, parsed
+
+def _fingerprint(task: SecurityTask, state: PipelineState) -> str:
+    # Runs on the pool: the target's addresses plus one GET per web endpoint nmap found, sent to the task's
+    # pinned address and spaced out at the target's governed rate
+    delta = state.delta
+    resolver = delta.resolver or (state.dns.resolve if state.dns is not None else system_resolver)
+    probe = delta.http_probe or http_probe
+    http = {}
+    for scheme, port in http_endpoints(task.parsed) if delta.probe_http else []:
+        if http and state.governor is not None:
+            time.sleep(1 / state.governor.rate(task.target))
+        default = 443 if scheme == 'https' else 80
+        url = f"{scheme}://{task.target}" + ('' if port == default else f":{port}")
+        http[url] = probe(url, task.addresses[0] if task.addresses else None)
+    return fingerprint(resolver(task.target), task.parsed, http)
+
+def _dispatch(task: SecurityTask, state: PipelineState) -> Tuple[Optional[str], Any]:
+    # Hands the task to a remote worker and blocks this pool thread until its result is back
+    queue = state.task_queue
+    job_id = queue.put({
+        'task': task.model_dump(include={'task_type', 'target', 'parameters', 'rate', 'addresses'}),
+        'parsing': state.parsing.model_dump(),
+        'streaming': state.streaming.enabled,
+        'timeout': state.streaming.timeout,
+    })
+    logging.info(f"Queued {task.task_type} on {task.target} as job {job_id}")
+    # Each lease may run up to the tool timeout before it expires and the job is handed on, so a job still
+    # unfinished max_leases of those after a worker first picked it up has no live worker left. Time spent
+    # pending behind other jobs doesn't count; a backlog is not a failure
+    limit = state.streaming.timeout * queue.max_leases
+    deadline = None
+    delay = 0.05
+    while (done := queue.result(job_id)) is None:
+        if deadline is None and queue.status(job_id) == 'leased':
+            deadline = time.monotonic() + limit
+        if deadline is not None and time.monotonic() > deadline:
+            # Withdraw the job first so a retry can't end up scanning the target twice
+            queue.cancel(job_id)
+            raise subprocess.TimeoutExpired([task.task_type, task.target], limit)
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    result = done['result']
+    task.metrics.queue_wait += done['wait']
+    task.metrics.absorb(TaskMetrics(**result.get('metrics', {})))
+    if 'error' in result:
+        raise remote_error(result)
+    logging.info(f"Job {job_id} ({task.task_type} on {task.target}) completed by {done['worker']}")
+    return result['output'], result['parsed']
+
+def _record_failure(task: SecurityTask, error: Exception, policy: RetryPolicy) -> Optional[float]:
+    # Returns the backoff delay if the task should be retried, otherwise marks it failed
+    task.retries += 1
+    task.error = str(error)
+    if not is_retryable(error):
+        task.status = 'failed'
+        logging.error(f"{task.task_type} on {task.target} failed permanently: {error}")
+        return None
+    if task.retries < policy.max_attempts:
+        task.status = 'pending'
+        delay = policy.backoff(task.retries)
+        logging.info(f"Retrying {task.task_type} on {task.target} ({task.retries}/{policy.max_attempts}) in {delay:.1f}s")
+        return delay
+    task.status = 'failed'
+    return None
+
+def _expand(task: SecurityTask, state: PipelineState) -> List[SecurityTask]:
+    # The units that actually run for a task: the task itself, or its not-yet-completed shards
+    if state.sharding.enabled and not task.shards:
+        task.shards = shard_task(task, state.sharding)
+    if not task.shards:
+        return [task]
+    units = []
+    for shard in task.shards:
+        if shard.status != 'completed':
+            shard.status, shard.retries, shard.error = 'pending', 0, None
+            units.append(shard)
+    task.status = 'running'
+    return units
+
+def _finish_sharded(task: SecurityTask, structured: bool = False):
+    completed = [shard for shard in task.shards if shard.status == 'completed']
+    failed = [shard for shard in task.shards if shard.status == 'failed']
+    # Failed shards still contribute nothing, but completed ones keep their progress
+    task.parsed = merge_findings(task.task_type, [shard.parsed for shard in completed], structured) if completed else None
+    task.retries = sum(shard.retries for shard in task.shards)
+    task.cache_hit = all(shard.cache_hit for shard in task.shards)
+    report_time = task.metrics.report_time
+    task.metrics = TaskMetrics(report_time=report_time)
+    for shard in task.shards:
+        task.metrics.absorb(shard.metrics)
+    if failed:
+        task.status = 'failed'
+        task.error = f"{len(failed)} of {len(task.shards)} shards failed: {failed[0].error}"
+    else:
+        task.status = 'completed'
+        task.error = None
+
+def _share_run(carrier: SecurityTask, member: SecurityTask, settled: bool):
+    member.status, member.error, member.retries, member.cache_hit = carrier.status, carrier.error, carrier.retries, carrier.cache_hit
+    if settled:
+        member.result, member.output_path = carrier.result, carrier.output_path
+        member.parsed = split_findings(carrier, member)
+        member.metrics = carrier.metrics.model_copy()
+
+def _journal(state: PipelineState, index: int, task: SecurityTask) -> Optional[str]:
+    if state.reporter is not None:
+        started = time.perf_counter()
+        ref = state.reporter.record_task(index, task)
+        elapsed = time.perf_counter() - started
+        # Lands in the checkpoint and the metrics registry; the journal record itself is already written
+        task.metrics.report_time += elapsed
+        state.metrics.record_report_write(task.task_type, elapsed)
+        return ref
+    return None
+
+def _checkpoint_payload(task: SecurityTask) -> Dict[str, Any]:
+    # Raw output is already in the report journal, so checkpoints only carry status and parsed results
+    if isinstance(task, TaskRecord):
+        return task.to_dict()
+    return task.model_dump(exclude={'result': True, 'shards': {'__all__': {'result'}}})
+
+def _checkpoint(state: PipelineState, index: int, task: SecurityTask):
+    if state.checkpoint is not None:
+        state.checkpoint.save_task(index, _checkpoint_payload(task))
+
+def _notify(state: PipelineState, index: int, task: SecurityTask):
+    if state.on_transition is not None:
+        state.on_transition(index, task)
+
+def _requeue_interrupted(task: SecurityTask):
+    # Tasks caught mid-run by a crash go back to pending without using up a retry
+    for shard in task.shards:
+        if shard.status == 'running':
+            shard.status = 'pending'
+    if task.status == 'running':
+        task.status = 'pending'
+
 def execute_task(state: PipelineState) -> PipelineState:
-    for task in state.tasks:
+    stage_started = time.perf_counter()
+    queue = []
+    index_of: Dict[int, int] = {}
+    parent_of: Dict[int, SecurityTask] = {}
+    queued_at: Dict[int, float] = {}
+
+    if state.compact.enabled and state.reporter is not None and state.compactor is None:
+        state.compactor = TaskCompactor()
+
+    # Intake: identical tasks and nmap scans with overlapping ports share one run, whose results go back to each of them
+    carrier_of: Dict[int, SecurityTask] = {}  # id(first requesting task) -> the task that actually runs
+    members_of: Dict[int, List[SecurityTask]] = {}  # id(that task) -> requesting tasks, first one leading
+    waiting: Set[int] = set()
+    if state.intake.enabled:
+        pending = [task for task in state.tasks if task.status == 'pending']
+        for task in pending:
+            normalize_task(task)
+        pending = [task for task in pending if state.scope.is_in_scope(task.target)]
+        for carrier, members in plan_intake(pending, state.intake):
+            lead = members[0]
+            if (state.sharding.enabled and lead.shards and [shard.parameters for shard in lead.shards]
+                    == [shard.parameters for shard in shard_task(carrier, state.sharding)]):
+                # Resumed: the lead's checkpoint holds this same coalesced run's shards, finished ones included
+                carrier.shards = lead.shards
+            carrier_of[id(members[0])] = carrier
+            members_of[id(carrier)] = members
+            waiting.update(id(member) for member in members[1:])
+            state.metrics.record_intake(carrier.task_type, len(members) - 1)
+        if members_of:
+            saved = sum(len(members) - 1 for members in members_of.values())
+            logging.info(f"Intake: {len(pending)} tasks need {len(pending) - saved} tool invocations ({saved} saved)")
+
+    # Resolve every pending in-scope target once, concurrently, before anything runs
+    dns = state.dns
+    if dns is not None:
+        resolve_started = time.perf_counter()
+        dns.resolve_all({task.target for task in state.tasks
+                         if task.status == 'pending' and state.scope.is_in_scope(task.target)})
+        state.metrics.record_stage('resolve', time.perf_counter() - resolve_started)
+
+    def address_error(task: SecurityTask) -> Optional[str]:
+        addresses = dns.resolve(task.target)
+        if not addresses:
+            return f"Could not resolve {task.target}"
+        allowed = state.scope.addresses_in_scope(addresses)
+        if not allowed:
+            return f"{task.target} resolves outside the allowed IP ranges ({', '.join(addresses)})"
+        if len(allowed) < len(addresses) and not pins_address(task):
+            # sqlmap and HTTPS web tools pick their own address, so every answer has to be in scope
+            outside = [address for address in addresses if address not in allowed]
+            return (f"{task.target} also resolves outside the allowed IP ranges ({', '.join(outside)}) "
+                    f"and {task.task_type} can't be pinned to an in-scope address")
+        return None
+
+    def enqueue(index: int, task: SecurityTask):
+        source = carrier_of.get(id(task), task)
+        units = _expand(source, state)
+        now = time.monotonic()
+        addresses = state.scope.addresses_in_scope(dns.resolve(task.target)) if dns is not None else []
+        source.addresses = addresses
+        for unit in units:
+            if unit is not source:
+                parent_of[id(unit)] = source
+            queued_at[id(unit)] = now
+            unit.addresses = addresses
+        if source.shards:
+            # A coalesced run's shards are checkpointed on its lead task, where a resume looks for them
+            task.shards = source.shards
+            _checkpoint(state, index, task)
+        queue.extend(units)
+
+    def retire(index: int, task: SecurityTask, ref: Optional[str]):
+        # Compact mode: once journaled, a settled task is replaced by a record that reads its raw output back from the blob
+        if state.compactor is None:
+            return
+        for shard in task.shards:
+            parent_of.pop(id(shard), None)
+        index_of.pop(id(task), None)
+        state.tasks[index] = state.compactor.record(task, ref if task.result else None)
+
+    def settle(index: int, task: SecurityTask, status: str, error: str):
+        task.status = status
+        task.error = error
+        ref = _journal(state, index, task)
+        _checkpoint(state, index, task)
+        _notify(state, index, task)
+        if id(task) in carrier_of:
+            # Settled before running (skipped, or failed a pre-run check): the rest of its group shares the outcome
+            for member in members_of[id(carrier_of[id(task)])][1:]:
+                member.parsed = task.parsed
+                settle(index_of[id(member)], member, status, error)
+        retire(index, task, ref)
+
+    # Staging: web tools on a target wait for its nmap scans and only run against ports those scans found open.
+    # Delta mode: expensive tools also wait, and are skipped if every scan of the target matches the last run
+    staging, delta, history = state.staging, state.delta, state.history
+    if history is not None and state.run_id is None:
+        state.run_id = history.start_run()
+    discovering: Dict[str, int] = {}  # target -> nmap scans still to finish in this pass
+    scanned: Dict[str, Set[Tuple[str, int]]] = {}  # target -> web endpoints found by completed nmap scans
+    unchanged: Dict[str, List[bool]] = {}  # target -> whether each completed scan matched its previous fingerprint
+    held: Dict[str, List[SecurityTask]] = {}
+    baseline: Dict[str, Any] = {}
+    probing: Dict[Any, Tuple[int, SecurityTask]] = {}  # fingerprint futures of finished nmap scans (delta mode)
+
+    def compare(task: SecurityTask, current: str, record: bool) -> bool:
+        key = scan_key(task.target, task.parameters)
+        previous = history.last_fingerprint(key, before=state.run_id)
+        if record:
+            history.record_fingerprint(state.run_id, key, current)
+        return previous == current
+
+    if staging.enabled or history is not None:
+        resumed = []
+        for task in state.tasks:
+            target = task.target.lower()
+            if task.task_type == 'nmap' and task.status == 'completed':
+                scanned.setdefault(target, set()).update(http_endpoints(task.parsed))
+                resumed.append(task)
+            elif task.task_type == 'nmap' and task.status == 'pending' and state.scope.is_in_scope(task.target):
+                discovering[target] = discovering.get(target, 0) + 1
+        if delta.enabled:
+            for task in resumed:
+                if dns is not None and not task.addresses:
+                    task.addresses = state.scope.addresses_in_scope(dns.resolve(task.target))
+            with ThreadPoolExecutor(max_workers=max(1, state.concurrency.max_workers)) as probes:
+                for task, current in zip(resumed, probes.map(_fingerprint, resumed, itertools.repeat(state))):
+                    unchanged.setdefault(task.target.lower(), []).append(compare(task, current, record=False))
+            run_id = history.baseline(state.run_id)
+            baseline.update(history.findings(run_id) if run_id else {})
+
+    def gated(task: SecurityTask) -> bool:
+        if task.depends_on is not None:
+            return False
+        return ((staging.enabled and task.task_type in staging.follow_ups)
+                or (delta.enabled and task.task_type in delta.expensive_tools))
+
+    def ran_key(task: SecurityTask) -> str:
+        return f"{task.task_type}|{scan_key(task.target, task.parameters)}"
+
+    def carry(index: int, task: SecurityTask, stable: bool) -> bool:
+        # Skip an expensive tool on a stable target, keeping the previous run's findings for it. Only tasks that
+        # ran before with these exact parameters and left findings qualify; new or changed tasks always run
+        if not (stable and delta.enabled and task.task_type in delta.expensive_tools):
+            return False
+        previous = baseline.get(task.target, {})
+        key = findings_key(task.task_type, task.parameters)
+        if key not in previous or history.last_fingerprint(ran_key(task), before=state.run_id) is None:
+            return False
+        task.parsed = previous[key]
+        settle(index, task, 'skipped', 'Target unchanged since the previous run')
+        history.record_fingerprint(state.run_id, ran_key(task), 'carried')
+        return True
+
+    def release(index: int, task: SecurityTask):
+        target = task.target.lower()
+        if carry(index, task, all(unchanged.get(target, [False]))):
+            return
+        if staging.enabled and task.task_type in staging.follow_ups and target in scanned and task_endpoint(task) not in scanned[target]:
+            scheme, port = task_endpoint(task)
+            settle(index, task, 'skipped', f"nmap found no open {scheme} port {port}")
+        else:
+            enqueue(index, task)
+
+    def discovered(index: int, task: SecurityTask):
+        # Delta mode fingerprints the scan on the pool first; the scheduler calls fingerprinted() when that's done
+        if task.status == 'completed':
+            scanned.setdefault(task.target.lower(), set()).update(http_endpoints(task.parsed))
+            if delta.enabled:
+                probing[pool.submit(_fingerprint, task, state)] = (index, task)
+                return
+        fingerprinted(index, task, False)
+
+    def fingerprinted(index: int, task: SecurityTask, stable: bool):
+        # Queue this scan's follow-ups right away; held tasks wait until every scan of the target has finished
+        target = task.target.lower()
+        if task.status == 'completed':
+            unchanged.setdefault(target, []).append(stable)
+            for follow_up in plan_follow_ups(task, index, staging, state.tasks) if staging.enabled else []:
+                state.tasks.append(follow_up)
+                index_of[id(follow_up)] = len(state.tasks) - 1
+                _checkpoint(state, index_of[id(follow_up)], follow_up)
+                if not carry(index_of[id(follow_up)], follow_up, stable):
+                    logging.info(f"Queued {follow_up.task_type} follow-up on {follow_up.parameters.get('url', follow_up.target)}")
+                    enqueue(index_of[id(follow_up)], follow_up)
+        discovering[target] -= 1
+        if discovering[target] == 0:
+            for waiting in held.pop(target, []):
+                release(index_of[id(waiting)], waiting)
+
+    index_of.update((id(task), index) for index, task in enumerate(state.tasks))
+    for index, task in enumerate(state.tasks):
         if task.status != 'pending':
             continue
         if not state.scope.is_in_scope(task.target):
-            task.status = 'failed'
-            task.error = 'Target out of scope'
+            settle(index, task, 'failed', 'Target out of scope')
+            continue
+        error = address_error(task) if dns is not None else None
+        if error:
+            settle(index, task, 'failed', error)
+            continue
+        if id(task) in waiting:
             continue
-        task.status = 'running'
-        try:
-            task.result = run_security_tool(task)
-            task.status = 'completed'
+        if gated(task) and discovering.get(task.target.lower()):
+            held.setdefault(task.target.lower(), []).append(task)
+        elif gated(task):
+            release(index, task)
+        else:
+            enqueue(index, task)
+
+    limits = state.concurrency
+    if state.rate_limit.enabled and state.governor is None:
+        state.governor = RateGovernor(state.rate_limit)
+    by_tool: Dict[str, int] = {}
+    by_target: Dict[str, int] = {}
+    running = {}
+    delayed: List[Tuple[float, int, SecurityTask]] = []  # heap of (ready_at, seq, task) waiting out a backoff
+    seq = itertools.count()
+
+    def can_start(task: SecurityTask) -> bool:
+        return (by_tool.get(task.task_type, 0) < limits.tool_limit(task.task_type)
+                and by_target.get(task.target, 0) < limits.target_limit())
+
+    def transition(task: SecurityTask, settled: bool = False):
+        # Checkpoint the owning task on every status change; journal it once it is completed or permanently failed
+        parent = parent_of.get(id(task))
+        owner = parent or task
+        if settled and parent is not None:
+            settled = all(shard.status in ('completed', 'failed') for shard in parent.shards)
+            if settled:
+                _finish_sharded(parent, state.parsing.structured)
+        members = members_of.get(id(owner))
+        if members is not None:
+            for member in members:
+                _share_run(owner, member, settled)
+                transition(member, settled)
+            return
+        index = index_of[id(owner)]
+        ref = _journal(state, index, owner) if settled else None
+        _checkpoint(state, index, owner)
+        _notify(state, index, owner)
+        if settled and owner.task_type == 'nmap' and owner.target.lower() in discovering:
+            discovered(index, owner)
+        if settled and history is not None and owner.status == 'completed' and owner.task_type in delta.expensive_tools:
+            # Lets a later delta run tell a repeat of this exact task from a new or changed one
+            history.record_fingerprint(state.run_id, ran_key(owner), 'completed')
+        if settled:
+            retire(index, owner, ref)
+
+    with ThreadPoolExecutor(max_workers=max(1, limits.max_workers)) as pool:
+        while queue or running or delayed or probing:
+            now = time.monotonic()
+            while delayed and delayed[0][0] <= now:
+                ready_at, _, task = heapq.heappop(delayed)
+                queued_at[id(task)] = ready_at  # backoff time is not queue wait
+                queue.append(task)
+            # Start every queued task whose tool and target still have free slots, in submission order
+            for task in list(queue):
+                if len(running) >= limits.max_workers:
+                    break
+                if not can_start(task):
+                    continue
+                queue.remove(task)
+                task.status = 'running'
+                if state.governor is not None:
+                    task.rate = state.governor.allocate(task.target, task.task_type, limits.target_limit())
+                task.metrics.queue_wait += max(0.0, time.monotonic() - queued_at.pop(id(task), time.monotonic()))
+                by_tool[task.task_type] = by_tool.get(task.task_type, 0) + 1
+                by_target[task.target] = by_target.get(task.target, 0) + 1
+                running[pool.submit(_run_and_parse, task, state)] = task
+                transition(task)
+            next_ready = max(0.0, delayed[0][0] - time.monotonic()) if delayed else None
+            if not running and not probing:
+                time.sleep(next_ready or 0)
+                continue
+            done, _ = wait([*running, *probing], timeout=next_ready, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in probing:
+                    index, task = probing.pop(future)
+                    try:
+                        stable = compare(task, future.result(), record=True)
+                    except Exception as e:
+                        logging.warning(f"Could not fingerprint {task.target}: {e}")
+                        stable = False
+                    fingerprinted(index, task, stable)
+                    continue
+                task = running.pop(future)
+                by_tool[task.task_type] -= 1
+                by_target[task.target] -= 1
+                try:
+                    task.result, task.parsed = future.result()
+                    task.status = 'completed'
+                    task.error = None
+                except Exception as e:
+                    delay = _record_failure(task, e, state.retry)
+                    if delay is not None:
+                        heapq.heappush(delayed, (time.monotonic() + delay, next(seq), task))
+                        transition(task)
+                        continue
+                state.metrics.record_task(task.task_type, task.target, task.status, task.retries, task.metrics,
+                                          cache_hit=task.cache_hit)
+                transition(task, settled=True)
+
+    # Merge in task order so concurrent runs produce the same findings as sequential ones
+    for task in state.tasks:
+        if task.parsed is not None and task.status in ('completed', 'failed', 'skipped'):
             findings = state.findings.setdefault(task.target, {})
-            findings[task.task_type] = parse_tool_output(task.task_type, task.result)
-        except Exception as e:
-            task.retries += 1
-            if task.retries < 3:
-                task.status = 'pending'
-                logging.info(f"Retrying {task.task_type} on {task.target} ({task.retries}/3)")
-            else:
-                task.status = 'failed'
-                task.error = str(e)
+            findings[findings_key(task.task_type, task.parameters)] = task.parsed
+    if state.checkpoint is not None:
+        state.checkpoint.save_meta('findings', state.findings)
+    state.metrics.record_stage('execute', time.perf_counter() - stage_started)
     return state
 
 def save_report(state: PipelineState) -> PipelineState:
-    report = {
-        "tasks": [task.model_dump() for task in state.tasks],  # Updated to model_dump
-        "findings": state.findings,
-        "scope": {"domains": state.scope.allowed_domains, "ips": [str(ip) for ip in state.scope.allowed_ips]}
-    }
-    report_path = os.path.join(os.getcwd(), 'audit_report.json')
-    with open(report_path, 'w') as f:
-        json.dump(report, f, indent=2)
-    logging.info("Report saved: audit_report.json")
+    stage_started = time.perf_counter()
+    config = state.report
+    writer = state.reporter
+    if writer is None:
+        # execute_task ran without a journal (e.g. called directly), so write one in a single pass
+        writer = ReportWriter(config.journal_path, config.raw_dir, compress=config.compress)
+        writer.record_scope(state.scope.allowed_domains, [str(ip) for ip in state.scope.allowed_ips])
+        for index, task in enumerate(state.tasks):
+            if task.status in ('completed', 'failed', 'skipped'):
+                writer.record_task(index, task)
+    if state.history is not None and state.run_id is not None:
+        if state.delta.enabled:
+            baseline = state.history.baseline(state.run_id)
+            previous = state.history.findings(baseline) if baseline else {}
+            writer.record_delta({'baseline_run': baseline, **diff_findings(previous, state.findings)})
+        state.history.finish_run(state.run_id, state.findings, config.report_path)
+    state.metrics.record_stage('report', time.perf_counter() - stage_started)
+    writer.record_metrics(state.metrics.snapshot())
+    writer.close()
+    if config.finalize:
+        finalize_started = time.perf_counter()
+        finalize_report(writer.path, config.report_path, inline_results=config.inline_results, compact=config.compact)
+        state.metrics.record_stage('finalize', time.perf_counter() - finalize_started)
+        logging.info(f"Report saved: {config.report_path}")
+    if config.metrics_path:
+        state.metrics.write_prometheus(config.metrics_path)
     return state
 
 class SecurityPipeline:
-    def __init__(self, scope: ScopeConfig, initial_tasks: List[SecurityTask] = []):
-        self.state = PipelineState(scope=scope, tasks=initial_tasks)
+    def __init__(self, scope: ScopeConfig, initial_tasks: List[SecurityTask] = [],
+                 concurrency: Optional[ConcurrencyConfig] = None,
+                 streaming: Optional[StreamingConfig] = None,
+                 cache: Optional[ResultCache] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 sharding: Optional[ShardingConfig] = None,
+                 report: Optional[ReportConfig] = None,
+                 checkpoint: Optional[str] = None,
+                 append: bool = False,
+                 parsing: Optional[ParserConfig] = None,
+                 staging: Optional[StagingConfig] = None,
+                 intake: Optional[IntakeConfig] = None,
+                 compact: Optional[CompactConfig] = None,
+                 task_queue: Optional[TaskQueue] = None,
+                 rate_limit: Optional[RateLimitConfig] = None,
+                 history: Optional[RunHistory] = None,
+                 delta: Optional[DeltaConfig] = None,
+                 dns: Optional[DNSCache] = None,
+                 sqlmap_api: Optional[SqlmapServerPool] = None,
+                 on_transition: Optional[Callable[[int, SecurityTask], None]] = None):
+        # append=True continues an existing report journal and checkpoint instead of starting fresh
+        if delta is not None and delta.enabled and history is None:
+            raise ValueError("Delta mode needs a run history to compare against")
+        report = report or ReportConfig()
+        reporter = ReportWriter(report.journal_path, report.raw_dir, compress=report.compress, append=append)
+        reporter.record_scope(scope.allowed_domains, [str(ip) for ip in scope.allowed_ips])
+        store = CheckpointStore(checkpoint) if checkpoint else None
+        if store is not None and not append:
+            store.reset()
+        self.state = PipelineState(scope=scope, tasks=initial_tasks,
+                                   concurrency=concurrency or ConcurrencyConfig(),
+                                   streaming=streaming or StreamingConfig(),
+                                   cache=cache,
+                                   retry=retry or RetryPolicy(),
+                                   sharding=sharding or ShardingConfig(),
+                                   report=report,
+                                   reporter=reporter,
+                                   checkpoint=store,
+                                   parsing=parsing or ParserConfig(),
+                                   staging=staging or StagingConfig(),
+                                   intake=intake or IntakeConfig(),
+                                   compact=compact or CompactConfig(),
+                                   task_queue=task_queue,
+                                   rate_limit=rate_limit or RateLimitConfig(),
+                                   history=history,
+                                   delta=delta or DeltaConfig(),
+                                   dns=dns,
+                                   sqlmap_api=sqlmap_api,
+                                   on_transition=on_transition)
+        if store is not None:
+            store.save_meta('scope', {'domains': scope.allowed_domains, 'ips': [str(ip) for ip in scope.allowed_ips],
+                                      'check_resolved_ips': scope.check_resolved_ips})
+            store.save_meta('config', self._config_snapshot())
+            store.save_tasks([_checkpoint_payload(task) for task in self.state.tasks])
         self.graph = StateGraph(PipelineState)
         self.graph.add_node("execute_task", execute_task)
         self.graph.add_node("save_report", save_report)
@@ -294,8 +1413,68 @@ class SecurityPipeline:
         self.graph.set_entry_point("execute_task")
         self.compiled = self.graph.compile()
 
+    def _config_snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        cache = state.cache
+        return {
+            'concurrency': state.concurrency.model_dump(),
+            'streaming': state.streaming.model_dump(exclude={'on_finding'}),
+            'retry': state.retry.model_dump(),
+            'sharding': state.sharding.model_dump(),
+            'report': state.report.model_dump(),
+            'parsing': state.parsing.model_dump(),
+            'staging': state.staging.model_dump(),
+            'intake': state.intake.model_dump(),
+            'compact': state.compact.model_dump(),
+            'rate_limit': state.rate_limit.model_dump(),
+            'delta': state.delta.model_dump(exclude={'resolver', 'http_probe'}),
+            'history': state.history.path if state.history else None,
+            'cache': {'path': cache.path, 'ttl': cache.ttl, 'max_entries': cache.max_entries} if cache else None,
+        }
+
+    @classmethod
+    def resume(cls, path: str, **overrides) -> 'SecurityPipeline':
+        # Rebuild a pipeline from its checkpoint; completed and failed tasks are kept, interrupted ones rerun
+        store = CheckpointStore(path)
+        snapshot = store.load()
+        store.close()
+        if snapshot is None:
+            raise FileNotFoundError(f"No checkpoint found at {path}")
+        meta = snapshot['meta']
+        config = meta['config']
+        tasks = [SecurityTask(**task) for task in snapshot['tasks']]
+        for task in tasks:
+            _requeue_interrupted(task)
+        options = {
+            'concurrency': ConcurrencyConfig(**config['concurrency']),
+            'streaming': StreamingConfig(**config['streaming']),
+            'retry': RetryPolicy(**config['retry']),
+            'sharding': ShardingConfig(**config['sharding']),
+            'report': ReportConfig(**config['report']),
+            'parsing': ParserConfig(**config.get('parsing', {})),
+            'staging': StagingConfig(**config.get('staging', {})),
+            'intake': IntakeConfig(**config.get('intake', {})),
+            'compact': CompactConfig(**config.get('compact', {})),
+            'rate_limit': RateLimitConfig(**config.get('rate_limit', {})),
+            'delta': DeltaConfig(**config.get('delta', {})),
+            'history': RunHistory(config['history']) if config.get('history') else None,
+            'cache': ResultCache(**config['cache']) if config['cache'] else None,
+        }
+        options.update(overrides)
+        scope = ScopeConfig(allowed_domains=meta['scope']['domains'], allowed_ips=meta['scope']['ips'],
+                            check_resolved_ips=meta['scope'].get('check_resolved_ips', True))
+        pipeline = cls(scope, tasks, checkpoint=path, append=True, **options)
+        pipeline.state.findings = meta.get('findings', {})
+        kept = sum(task.status in ('completed', 'failed', 'skipped') for task in tasks)
+        logging.info(f"Resumed from {path}: {kept} finished tasks kept, {len(tasks) - kept} to run")
+        return pipeline
+
     def run(self) -> PipelineState:
-        # Ensure all retries are processed by running the graph until completion
-        while any(task.status == 'pending' and task.retries < 3 for task in self.state.tasks):
-            self.compiled.invoke(self.state)
-        return self.state
\ No newline at end of file
+        # execute_task works through retries itself; loop only for tasks added while the graph ran
+        while any(task.status == 'pending' and task.retries < self.state.retry.max_attempts for task in self.state.tasks):
+            final_state = self.compiled.invoke(self.state)
+            # LangGraph hands back a plain dict of channel values, so rebuild the model from it
+            if isinstance(final_state, dict):
+                final_state = PipelineState(**final_state)
+            self.state = final_state
+        return self.state
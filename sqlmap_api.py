@@ -0,0 +1,207 @@
+import json
+import logging
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+# sqlmap's PAYLOAD.TECHNIQUE ids, as used for the keys of an injection's "data"
+TECHNIQUES = {1: 'boolean-based blind', 2: 'error-based', 3: 'inline query', 4: 'stacked queries',
+              5: 'time-based blind', 6: 'UNION query'}
+CONTENT_TECHNIQUES = 1  # CONTENT_TYPE.TECHNIQUES in sqlmap's API data
+
+class SqlmapAPIError(RuntimeError):
+    # The API server itself is unusable (not running, not answering); callers fall back to the subprocess path
+    pass
+
+class SqlmapServerUnreachable(SqlmapAPIError):
+    # No answer at all (connection refused, reset, garbage); the pool stops sending scans to that server
+    pass
+
+class SqlmapAPIClient:
+    def __init__(self, base_url: str, timeout: float = 10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = json.loads(response.read().decode())
+        except (OSError, ValueError) as e:
+            raise SqlmapServerUnreachable(f"sqlmap API at {self.base_url} failed on {path}: {e}") from e
+        if not body.get('success', False):
+            raise SqlmapAPIError(f"sqlmap API at {self.base_url} refused {path}: {body.get('message', body)}")
+        return body
+
+    def new_task(self) -> str:
+        return self._request('/task/new')['taskid']
+
+    def start(self, taskid: str, options: Dict[str, Any]):
+        self._request(f'/scan/{taskid}/start', options)
+
+    def status(self, taskid: str) -> Tuple[str, Optional[int]]:
+        body = self._request(f'/scan/{taskid}/status')
+        return body['status'], body.get('returncode')
+
+    def data(self, taskid: str) -> Dict[str, Any]:
+        body = self._request(f'/scan/{taskid}/data')
+        return {'data': body.get('data', []), 'error': body.get('error', [])}
+
+    def log(self, taskid: str) -> List[Dict[str, Any]]:
+        return self._request(f'/scan/{taskid}/log').get('log', [])
+
+    def kill(self, taskid: str):
+        self._request(f'/scan/{taskid}/kill')
+
+    def delete(self, taskid: str):
+        self._request(f'/task/{taskid}/delete')
+
+def _free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+class SqlmapServer:
+    # One `sqlmapapi.py -s` process on a loopback port
+    def __init__(self, sqlmapapi_path: str, host: str = '127.0.0.1', port: Optional[int] = None,
+                 python: str = sys.executable, startup_timeout: float = 15):
+        self.host = host
+        self.port = port or _free_port(host)
+        self.process = subprocess.Popen([python, sqlmapapi_path, '-s', '-H', host, '-p', str(self.port)],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.url = f"http://{host}:{self.port}"
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if self.process.poll() is not None:
+                raise SqlmapAPIError(f"sqlmapapi exited with status {self.process.returncode} during startup")
+            try:
+                socket.create_connection((host, self.port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise SqlmapAPIError(f"sqlmapapi did not start listening on {self.url}")
+                time.sleep(0.1)
+        logging.info(f"Started sqlmap API server on {self.url}")
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+def api_findings(data: List[Dict[str, Any]], structured: bool = False) -> Dict[str, Any]:
+    # The sqlmap parser's shapes, read from the API's TECHNIQUES entries instead of grepped from console output
+    injections, dbms = [], None
+    for entry in data:
+        if entry.get('type') != CONTENT_TECHNIQUES:
+            continue
+        for injection in entry.get('value') or []:
+            dbms = dbms or injection.get('dbms')
+            for technique, details in sorted((injection.get('data') or {}).items()):
+                injections.append({'parameter': injection.get('parameter'), 'place': injection.get('place'),
+                                   'type': TECHNIQUES.get(int(technique), str(technique)), 'title': details.get('title')})
+    if not structured:
+        return {'vulnerable': bool(injections)}
+    if isinstance(dbms, list):
+        dbms = dbms[0] if dbms else None
+    return {'vulnerable': bool(injections), 'dbms': dbms, 'injections': injections}
+
+class SqlmapServerPool:
+    # Long-lived sqlmap API servers shared by every sqlmap task; scans go to the least busy server
+    def __init__(self, sqlmapapi_path: str = r"C:\Tools\sqlmap\sqlmapapi.py", size: int = 2,
+                 servers: Optional[List[str]] = None, python: str = sys.executable, poll_interval: float = 1.0):
+        self.sqlmapapi_path = sqlmapapi_path
+        self.size = size
+        self.python = python
+        self.poll_interval = poll_interval
+        self._urls = list(servers or [])
+        self._processes: List[SqlmapServer] = []
+        self._busy: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._started = bool(self._urls)
+        # Stops the servers this pool started when it is garbage collected or the interpreter exits, for callers
+        # (like the dashboard) that never get to call close()
+        self._finalizer = weakref.finalize(self, _stop_servers, self._processes)
+
+    def _acquire(self) -> str:
+        with self._lock:
+            if not self._started:
+                # Start lazily so pipelines that never run sqlmap never spawn a server
+                self._started = True
+                for _ in range(self.size):
+                    server = SqlmapServer(self.sqlmapapi_path, python=self.python)
+                    self._processes.append(server)
+                    self._urls.append(server.url)
+            if not self._urls:
+                raise SqlmapAPIError("No sqlmap API servers available")
+            url = min(self._urls, key=lambda url: self._busy.get(url, 0))
+            self._busy[url] = self._busy.get(url, 0) + 1
+            return url
+
+    def _release(self, url: str):
+        with self._lock:
+            self._busy[url] -= 1
+
+    def _drop(self, url: str):
+        # A server that stopped answering gets no more scans; if this pool started it, it is stopped too
+        with self._lock:
+            if url in self._urls:
+                self._urls.remove(url)
+            for server in [server for server in self._processes if server.url == url]:
+                server.stop()
+                self._processes.remove(server)
+        logging.warning(f"Dropped unreachable sqlmap API server {url}")
+
+    def scan(self, options: Dict[str, Any], timeout: float = 300) -> Tuple[Dict[str, Any], List[str]]:
+        # Returns (data, log lines); raises TimeoutExpired, or RuntimeError if sqlmap reports a failure
+        url = self._acquire()
+        client = SqlmapAPIClient(url)
+        try:
+            taskid = client.new_task()
+            try:
+                client.start(taskid, options)
+                deadline = time.monotonic() + timeout
+                delay = min(0.1, self.poll_interval)
+                while True:
+                    status, returncode = client.status(taskid)
+                    if status == 'terminated':
+                        break
+                    if time.monotonic() > deadline:
+                        client.kill(taskid)
+                        raise subprocess.TimeoutExpired(['sqlmapapi', options.get('url', '')], timeout)
+                    time.sleep(delay)
+                    delay = min(delay * 2, self.poll_interval)
+                data = client.data(taskid)
+                log = [f"[{entry.get('level', 'INFO')}] {entry.get('message', '')}" for entry in client.log(taskid)]
+            finally:
+                try:
+                    client.delete(taskid)
+                except SqlmapAPIError:
+                    pass
+        except SqlmapServerUnreachable:
+            self._drop(url)
+            raise
+        finally:
+            self._release(url)
+        if returncode not in (0, None) and not data['data']:
+            raise RuntimeError(f"sqlmap exited with status {returncode}: {'; '.join(map(str, data['error']))}")
+        return data, log
+
+    def close(self):
+        with self._lock:
+            _stop_servers(self._processes)
+
+def _stop_servers(processes: List[SqlmapServer]):
+    for server in processes:
+        server.stop()
+    processes.clear()
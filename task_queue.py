@@ -0,0 +1,264 @@
+import hmac
+import json
+import os
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+Job = Dict[str, Any]
+
+class TaskQueue(ABC):
+    # Durable job queue shared by a coordinator and its workers. A lease that isn't renewed before it
+    # expires goes back to pending for another worker, up to max_leases times
+    max_leases = 3
+
+    @abstractmethod
+    def put(self, payload: Job, job_id: Optional[str] = None) -> str:
+        # Putting a job_id that already exists is a no-op, so clients can safely retry a put
+        ...
+
+    @abstractmethod
+    def lease(self, worker: str, lease_seconds: float = 60) -> Optional[Tuple[str, Job]]:
+        ...
+
+    @abstractmethod
+    def renew(self, job_id: str, worker: str, lease_seconds: float = 60) -> bool:
+        ...
+
+    @abstractmethod
+    def complete(self, job_id: str, worker: str, result: Job) -> bool:
+        # False if the lease was lost; the job has been (or will be) handed to someone else
+        ...
+
+    @abstractmethod
+    def result(self, job_id: str) -> Optional[Job]:
+        # {'status': 'done' | 'failed', 'result': ..., 'worker': ..., 'wait': seconds spent queued}, or None
+        ...
+
+    @abstractmethod
+    def status(self, job_id: str) -> Optional[str]:
+        # 'pending' | 'leased' | 'done' | 'failed' | 'cancelled', or None for an unknown job
+        ...
+
+    @abstractmethod
+    def cancel(self, job_id: str) -> bool:
+        # Withdraws a pending or leased job: it is never leased again and a running worker's complete() fails
+        ...
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        ...
+
+    def close(self):
+        pass
+
+class SQLiteTaskQueue(TaskQueue):
+    # Safe for several processes on one host; put the file on local disk, not a network share
+    def __init__(self, path: str = os.path.join('cache', 'queue.sqlite'), max_leases: int = 3):
+        self.path = path
+        self.max_leases = max_leases
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_until REAL,
+                leases INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                created_at REAL NOT NULL,
+                leased_at REAL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def put(self, payload: Job, job_id: Optional[str] = None) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO jobs (id, payload, status, created_at) VALUES (?, ?, 'pending', ?)",
+                             (job_id, json.dumps(payload), time.time()))
+        return job_id
+
+    def lease(self, worker: str, lease_seconds: float = 60) -> Optional[Tuple[str, Job]]:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', result = ? WHERE status = 'leased' AND lease_until < ? AND leases >= ?",
+                    (json.dumps({'error': f"Lease expired {self.max_leases} times", 'kind': 'lease'}), now, self.max_leases))
+                self._db.execute("UPDATE jobs SET status = 'pending' WHERE status = 'leased' AND lease_until < ?", (now,))
+                row = self._db.execute(
+                    "SELECT id, payload FROM jobs WHERE status = 'pending' ORDER BY created_at, rowid LIMIT 1").fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?, leases = leases + 1, leased_at = ? WHERE id = ?",
+                        (worker, now + lease_seconds, now, row[0]))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return (row[0], json.loads(row[1])) if row else None
+
+    def renew(self, job_id: str, worker: str, lease_seconds: float = 60) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + lease_seconds, job_id, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker: str, result: Job) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'done', result = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(result), job_id, worker))
+        return cursor.rowcount == 1
+
+    def result(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, result, worker, created_at, leased_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row[0] not in ('done', 'failed'):
+            return None
+        status, result, worker, created_at, leased_at = row
+        return {'status': status, 'result': json.loads(result), 'worker': worker,
+                'wait': max(0.0, leased_at - created_at) if leased_at else 0.0}
+
+    def status(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'cancelled' WHERE id = ? AND status IN ('pending', 'leased')", (job_id,))
+        return cursor.rowcount == 1
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+_OPERATIONS = ('put', 'lease', 'renew', 'complete', 'result', 'status', 'cancel', 'counts')
+_REPEATABLE = ('put', 'renew', 'result', 'status', 'cancel', 'counts')  # same outcome if the server already ran them once
+
+class QueueServer(socketserver.ThreadingTCPServer):
+    # Serves a TaskQueue to RemoteTaskQueue clients as newline-delimited JSON requests over TCP
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, queue: TaskQueue, host: str = '127.0.0.1', port: int = 0, token: Optional[str] = None):
+        self.queue = queue
+        self.token = token
+        super().__init__((host, port), _QueueHandler)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server_address[:2]
+
+    def serve_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name='queue-server', daemon=True)
+        thread.start()
+        return thread
+
+class _QueueHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if self.server.token and not hmac.compare_digest(str(request.get('token', '')), self.server.token):
+                    raise PermissionError("Invalid queue token")
+                if request.get('op') not in _OPERATIONS:
+                    raise ValueError(f"Unknown queue operation: {request.get('op')}")
+                response = {'ok': True, 'value': getattr(self.server.queue, request['op'])(*request.get('args', []))}
+            except Exception as e:
+                response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(response) + '\n').encode())
+            self.wfile.flush()
+
+class RemoteTaskQueue(TaskQueue):
+    # Client side of QueueServer; one persistent connection, reopened once if it drops.
+    # max_leases should match the server's queue; it bounds how long the coordinator waits for a result
+    def __init__(self, host: str, port: int, token: Optional[str] = None, timeout: float = 30, max_leases: int = 3):
+        self.address = (host, port)
+        self.max_leases = max_leases
+        self.token = token
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _call(self, op: str, *args) -> Any:
+        request = (json.dumps({'op': op, 'args': list(args), 'token': self.token}) + '\n').encode()
+        with self._lock:
+            for attempt in range(2):
+                sent = False
+                try:
+                    if self._conn is None:
+                        sock = socket.create_connection(self.address, timeout=self.timeout)
+                        self._conn = (sock, sock.makefile('rb'))
+                    sock, reader = self._conn
+                    sock.sendall(request)
+                    sent = True
+                    line = reader.readline()
+                    if not line:
+                        raise ConnectionError("Queue server closed the connection")
+                    break
+                except OSError:
+                    self._disconnect()
+                    # Once sent, the server may have run the request; only re-send what is safe to run twice
+                    if attempt or (sent and op not in _REPEATABLE):
+                        raise
+        response = json.loads(line)
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+        return response['value']
+
+    def _disconnect(self):
+        if self._conn is not None:
+            sock, reader = self._conn
+            reader.close()
+            sock.close()
+            self._conn = None
+
+    def put(self, payload: Job, job_id: Optional[str] = None) -> str:
+        # The id is chosen here so a put re-sent after a dropped connection can't queue the job twice
+        return self._call('put', payload, job_id or uuid.uuid4().hex)
+
+    def lease(self, worker: str, lease_seconds: float = 60) -> Optional[Tuple[str, Job]]:
+        leased = self._call('lease', worker, lease_seconds)
+        return tuple(leased) if leased else None
+
+    def renew(self, job_id: str, worker: str, lease_seconds: float = 60) -> bool:
+        return self._call('renew', job_id, worker, lease_seconds)
+
+    def complete(self, job_id: str, worker: str, result: Job) -> bool:
+        return self._call('complete', job_id, worker, result)
+
+    def result(self, job_id: str) -> Optional[Job]:
+        return self._call('result', job_id)
+
+    def status(self, job_id: str) -> Optional[str]:
+        return self._call('status', job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        return self._call('cancel', job_id)
+
+    def counts(self) -> Dict[str, int]:
+        return self._call('counts')
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
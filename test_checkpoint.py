@@ -0,0 +1,19 @@
+from checkpoint import CheckpointStore
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "run.sqlite")
+    store = CheckpointStore(path)
+    store.save_meta("scope", {"domains": ["example.com"], "ips": []})
+    store.save_tasks([{"target": "a", "status": "pending"}, {"target": "b", "status": "pending"}])
+    store.save_task(1, {"target": "b", "status": "completed"})
+    store.close()
+    snapshot = CheckpointStore(path).load()
+    assert snapshot["meta"]["scope"]["domains"] == ["example.com"]
+    assert [task["status"] for task in snapshot["tasks"]] == ["pending", "completed"]
+
+def test_reset_and_empty_load(tmp_path):
+    store = CheckpointStore(str(tmp_path / "run.sqlite"))
+    assert store.load() is None
+    store.save_task(0, {"target": "a"})
+    store.reset()
+    assert store.load() is None
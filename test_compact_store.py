@@ -0,0 +1,36 @@
+import json
+from compact_store import TaskCompactor, expand_value
+from report_writer import BlobStore
+from security_pipeline import SecurityTask, PipelineState, ScopeConfig
+
+def test_records_share_values_and_read_output_from_the_blob_store(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    compactor = TaskCompactor()
+    records = []
+    for i in range(2):
+        task = SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "1-1000"}, status="completed",
+                            result=f"run {i}\n8080/tcp open http", parsed=[8080, 8443])
+        task.metrics.wall_time = 1.5
+        records.append(compactor.record(task, blobs.put(task.result)))
+    first, second = records
+    assert first.parameters is second.parameters, "Identical parameter dicts are stored once"
+    assert first.parsed == (8080, 8443) and first.parsed[0] is second.parsed[0], "Ports are shared, not copied"
+    assert first.result == "run 0\n8080/tcp open http" and second.result.startswith("run 1")
+    assert first.metrics.wall_time == 1.5
+    restored = SecurityTask(**first.to_dict(include_result=True))
+    assert restored.parsed == [8080, 8443] and restored.result == first.result and restored.status == "completed"
+
+def test_structured_findings_stay_json_compatible():
+    compactor = TaskCompactor()
+    parsed = [{"port": 443, "proto": "tcp", "state": "open", "service": "https"}]
+    value = compactor.value(parsed)
+    assert isinstance(value, tuple) and value[0] == parsed[0]
+    assert json.loads(json.dumps(value)) == parsed and expand_value(value) == parsed
+
+def test_pipeline_state_accepts_and_dumps_records():
+    record = TaskCompactor().record(SecurityTask(task_type="gobuster", target="example.com", parameters={},
+                                                 status="completed", parsed=["/admin"]), None)
+    state = PipelineState(scope=ScopeConfig(allowed_domains=["example.com"]), tasks=[record])
+    assert state.tasks[0] is record and record.result is None
+    dumped = state.model_dump()['tasks'][0]
+    assert dumped['parsed'] == ["/admin"] and dumped['status'] == "completed"
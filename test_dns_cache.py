@@ -0,0 +1,55 @@
+import threading
+import time
+from dns_cache import DNSCache
+
+class StubResolver:
+    def __init__(self, answers, ttl=None, delay=0.0):
+        self.answers = answers
+        self.ttl = ttl
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, host):
+        with self.lock:
+            self.calls.append(host)
+        time.sleep(self.delay)
+        return self.answers.get(host, []), self.ttl
+
+def test_answers_are_cached_until_their_ttl_expires():
+    resolver = StubResolver({"example.com": ["10.0.0.1", "2001:db8::1"]}, ttl=0.05)
+    cache = DNSCache(resolver, min_ttl=0)
+    assert cache.resolve("Example.COM.") == ["10.0.0.1", "2001:db8::1"]
+    assert cache.resolve("example.com") == ["10.0.0.1", "2001:db8::1"]
+    assert resolver.calls == ["example.com"]
+    time.sleep(0.06)
+    cache.resolve("example.com")
+    assert resolver.calls == ["example.com", "example.com"], "Expired answers are looked up again"
+    assert cache.resolve("192.0.2.7") == ["192.0.2.7"] and len(resolver.calls) == 2, "IP literals never hit the resolver"
+
+def test_failures_are_cached_for_the_negative_ttl():
+    resolver = StubResolver({})
+    cache = DNSCache(resolver, negative_ttl=60)
+    assert cache.resolve("missing.example.com") == []
+    assert cache.resolve("missing.example.com") == []
+    assert resolver.calls == ["missing.example.com"]
+
+def test_resolve_all_is_concurrent_and_deduplicated():
+    hosts = [f"host{i}.example.com" for i in range(10)]
+    resolver = StubResolver({host: [f"10.0.0.{i}"] for i, host in enumerate(hosts)}, delay=0.1)
+    cache = DNSCache(resolver)
+    started = time.perf_counter()
+    resolved = cache.resolve_all(hosts + [host.upper() for host in hosts])
+    assert time.perf_counter() - started < 0.5, "Lookups should overlap"
+    assert sorted(resolver.calls) == sorted(hosts)
+    assert resolved["host3.example.com"] == ["10.0.0.3"]
+
+def test_concurrent_lookups_of_one_host_share_a_query():
+    resolver = StubResolver({"example.com": ["10.0.0.1"]}, delay=0.1)
+    cache = DNSCache(resolver)
+    threads = [threading.Thread(target=cache.resolve, args=("example.com",)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert resolver.calls == ["example.com"]
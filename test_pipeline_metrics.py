@@ -0,0 +1,52 @@
+import urllib.request
+from pipeline_metrics import Histogram, MetricsRegistry, TaskMetrics, serve_metrics
+
+def test_histogram_buckets_and_snapshot():
+    histogram = Histogram([1, 5])
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"1": 2, "5": 1, "+Inf": 1}
+    assert snapshot["count"] == 4 and snapshot["sum"] == 14.5 and snapshot["max"] == 10
+
+def test_task_metrics_absorb_shards():
+    parent = TaskMetrics()
+    parent.absorb(TaskMetrics(wall_time=1.0, output_bytes=10, max_rss=100, cpu_user=0.5, attempts=1))
+    parent.absorb(TaskMetrics(wall_time=2.0, output_bytes=5, max_rss=300, attempts=2))
+    assert (parent.wall_time, parent.output_bytes, parent.max_rss, parent.cpu_user, parent.attempts) == (3.0, 15, 300, 0.5, 3)
+
+def test_registry_snapshot_and_prometheus_text():
+    registry = MetricsRegistry(slowest=2)
+    registry.record_task("nmap", "a.example.com", "completed", 0, TaskMetrics(wall_time=12.0, cpu_user=1.0, cpu_system=0.5))
+    registry.record_task("nmap", "b.example.com", "failed", 2, TaskMetrics(wall_time=0.2))
+    registry.record_task("ffuf", "a.example.com", "completed", 0, TaskMetrics(wall_time=3.0))
+    registry.record_task("ffuf", "c.example.com", "completed", 0, TaskMetrics(queue_wait=0.1), cache_hit=True)
+    registry.record_stage("execute", 15.0)
+    snapshot = registry.snapshot()
+    nmap = snapshot["tools"]["nmap"]
+    assert nmap["tasks_total"] == {"completed": 1, "failed": 1} and nmap["task_retries_total"] == 2
+    assert nmap["task_wall_seconds"]["count"] == 2 and nmap["task_cpu_seconds"]["sum"] == 1.5
+    assert snapshot["tools"]["ffuf"]["cache_hits_total"] == 1
+    assert snapshot["tools"]["ffuf"]["task_wall_seconds"]["count"] == 1, "Cache hits don't count as tool runs"
+    assert [task["target"] for task in snapshot["slowest_tasks"]] == ["a.example.com", "a.example.com"]
+    assert snapshot["stages"]["execute"]["sum"] == 15.0
+
+    text = registry.to_prometheus()
+    assert '# TYPE security_pipeline_task_wall_seconds histogram' in text
+    assert 'security_pipeline_task_wall_seconds_bucket{tool="nmap",le="10"} 1' in text
+    assert 'security_pipeline_task_wall_seconds_bucket{tool="nmap",le="+Inf"} 2' in text
+    assert 'security_pipeline_tasks_total{status="failed",tool="nmap"} 1' in text
+    assert 'security_pipeline_stage_seconds_count{stage="execute"} 1' in text
+
+def test_metrics_endpoint_and_file(tmp_path):
+    registry = MetricsRegistry()
+    registry.record_task("nmap", "example.com", "completed", 0, TaskMetrics(wall_time=1.0))
+    path = registry.write_prometheus(str(tmp_path / "metrics" / "pipeline.prom"))
+    assert open(path).read() == registry.to_prometheus()
+    server = serve_metrics(registry, port=0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert 'security_pipeline_tasks_total{status="completed",tool="nmap"} 1' in response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
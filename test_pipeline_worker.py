@@ -0,0 +1,45 @@
+import threading
+import time
+from unittest.mock import patch, Mock
+from pipeline_worker import PipelineWorker, tail_file
+from security_pipeline import ScopeConfig, SecurityTask, ReportConfig
+
+def wait_idle(worker, timeout=5):
+    deadline = time.monotonic() + timeout
+    while worker.busy and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not worker.busy
+
+def test_worker_runs_in_background_and_accepts_tasks_mid_run(tmp_path):
+    release = threading.Event()
+    def slow_run(cmd, **kwargs):
+        if cmd[2] == "slow.example.com":
+            release.wait(5)
+        return Mock(stdout=f"{cmd[4]}/tcp   open  http", returncode=0)
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    report = ReportConfig(journal_path=str(tmp_path / "audit.jsonl"), report_path=str(tmp_path / "audit.json"),
+                          raw_dir=str(tmp_path / "raw"))
+    with patch('security_pipeline.run_command', side_effect=slow_run):
+        worker = PipelineWorker(scope, report=report)
+        worker.submit([SecurityTask(task_type="nmap", target="slow.example.com", parameters={"-p": "80"})])
+        time.sleep(0.1)
+        assert worker.busy, "submit() should return while the scan is still running"
+        worker.submit([SecurityTask(task_type="nmap", target="fast.example.com", parameters={"-p": "443"})])
+        release.set()
+        wait_idle(worker)
+        worker.stop(timeout=1)
+
+    events = worker.events()
+    statuses = [(e["target"], e["status"]) for e in events if e["kind"] == "task"]
+    assert ("slow.example.com", "running") in statuses and ("slow.example.com", "completed") in statuses
+    assert ("fast.example.com", "completed") in statuses
+    findings = {e["target"]: e["findings"] for e in events if e["kind"] == "findings"}
+    assert findings == {"slow.example.com": [80], "fast.example.com": [443]}
+    assert [task.status for task in worker.state.tasks] == ["completed", "completed"]
+    assert worker.events() == [], "Events are drained once"
+
+def test_tail_file_reads_only_the_end(tmp_path):
+    log = tmp_path / "pipeline.log"
+    log.write_text("".join(f"line {i}\n" for i in range(10000)))
+    assert tail_file(str(log), 3, block_size=64) == ["line 9997", "line 9998", "line 9999"]
+    assert tail_file(str(tmp_path / "missing.log")) == []
@@ -0,0 +1,32 @@
+from rate_governor import RateLimitConfig, RateGovernor, response_counts, rate_flags
+
+def test_governor_backs_off_and_recovers():
+    governor = RateGovernor(RateLimitConfig(initial_rate=40, increase=10, decrease=0.5, min_rate=5, max_rate=60))
+    assert governor.allocate("Example.com", "ffuf", slots=4) == 10, "Budget is split across the target's slots"
+    assert governor.allocate("example.com", "nmap", slots=1) == 800, "nmap rates are scaled to packets"
+    governor.observe("example.com", responses=100, throttled=20)
+    assert governor.rate("example.com") == 20
+    governor.observe("example.com", timed_out=True)
+    governor.observe("example.com", timed_out=True)
+    assert governor.rate("EXAMPLE.com") == 5, "Never drops below min_rate"
+    governor.observe("example.com", responses=100, throttled=2)
+    assert governor.rate("example.com") == 15, "A few stray 429s don't count as throttling"
+    for _ in range(10):
+        governor.observe("example.com", responses=100)
+    assert governor.rate("example.com") == 60, "Never exceeds max_rate"
+    assert governor.rate("other.com") == 40, "Targets are governed independently"
+
+def test_response_counts_from_tool_output():
+    gobuster = ["/admin (Status: 200) [Size: 10]\n", "/a (Status: 429) [Size: 0]\n", "/b (Status: 503)\n"]
+    assert response_counts(gobuster) == (3, 2)
+    ffuf = ['{"input":{"FUZZ":"a"},"status":429,"length":0}\n', "admin [Status: 200, Size: 5, Words: 1, Lines: 1]\n"]
+    assert response_counts(ffuf) == (2, 1)
+    sqlmap = ["[WARNING] HTTP error codes detected during run:\n", "429 (Too Many Requests) - 37 times, 500 (Internal Server Error) - 2 times\n"]
+    assert response_counts(sqlmap) == (37, 37)
+
+def test_rate_flags_per_tool():
+    assert rate_flags("ffuf", 12.7) == ["-rate", "12", "-mc", "200-299,301,302,307,401,403,405,500,429,503"]
+    assert rate_flags("gobuster", 50) == ["-t", "10", "--delay", "200ms"]
+    assert rate_flags("gobuster", 2) == ["-t", "1", "--delay", "500ms"]
+    assert rate_flags("nmap", 1000) == ["--max-rate", "1000"]
+    assert rate_flags("sqlmap", 4) == ["--delay", "0.250"]
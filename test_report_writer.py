@@ -0,0 +1,60 @@
+import json
+from security_pipeline import SecurityTask
+from report_writer import ReportWriter, BlobStore, build_report, finalize_report, read_blob, read_journal
+
+def make_writer(tmp_path, **kwargs):
+    return ReportWriter(str(tmp_path / "audit_report.jsonl"), str(tmp_path / "raw"), **kwargs)
+
+def test_journal_replay_keeps_last_record_per_task(tmp_path):
+    writer = make_writer(tmp_path)
+    writer.record_scope(["example.com"], ["10.0.0.0/8"])
+    first = SecurityTask(task_type="nmap", target="example.com", parameters={}, status="failed", error="timeout")
+    writer.record_task(0, first)
+    writer.record_task(1, SecurityTask(task_type="gobuster", target="example.com", parameters={}, status="completed",
+                                       result="/admin (Status: 200)", parsed=["/admin"]))
+    writer.record_task(0, SecurityTask(task_type="nmap", target="example.com", parameters={}, status="completed",
+                                       result="80/tcp open http", parsed=[80]))
+    writer.close()
+
+    report = build_report(writer.path)
+    assert [task["task_type"] for task in report["tasks"]] == ["nmap", "gobuster"]
+    assert report["findings"] == {"example.com": {"nmap": [80], "gobuster": ["/admin"]}}
+    assert report["scope"] == {"domains": ["example.com"], "ips": ["10.0.0.0/8"]}
+    assert "result" not in report["tasks"][0], "Raw output should be stored by reference"
+    assert read_blob(report["tasks"][0]["result_ref"]) == "80/tcp open http"
+
+def test_finalize_inlines_results_on_demand(tmp_path):
+    writer = make_writer(tmp_path, compress=True)
+    writer.record_task(0, SecurityTask(task_type="nmap", target="example.com", parameters={}, status="completed",
+                                       result="22/tcp open ssh", parsed=[22]))
+    writer.close()
+    assert writer.path.endswith(".jsonl.gz")
+    report_path = finalize_report(writer.path, str(tmp_path / "audit_report.json"), inline_results=True, compact=True)
+    with open(report_path) as f:
+        report = json.load(f)
+    assert report["tasks"][0]["result"] == "22/tcp open ssh"
+
+def test_blob_store_deduplicates(tmp_path):
+    store = BlobStore(str(tmp_path))
+    assert store.put("same output") == store.put("same output")
+    assert store.put("same output") != store.put("other output")
+
+def test_append_mode_keeps_existing_records(tmp_path):
+    writer = make_writer(tmp_path)
+    writer.record_scope(["example.com"], [])
+    writer.close()
+    resumed = make_writer(tmp_path, append=True)
+    resumed.record_scope(["example.org"], [])
+    resumed.close()
+    assert len(list(read_journal(writer.path))) == 2
+
+def test_previous_journal_survives_until_the_first_record(tmp_path):
+    writer = make_writer(tmp_path)
+    writer.record_scope(["old.com"], [])
+    writer.close()
+    make_writer(tmp_path).close()
+    assert build_report(writer.path)["scope"]["domains"] == ["old.com"], "A writer that never writes keeps the journal"
+    writer = make_writer(tmp_path)
+    writer.record_scope(["new.com"], [])
+    writer.close()
+    assert [record["domains"] for record in read_journal(writer.path)] == [["new.com"]]
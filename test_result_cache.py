@@ -0,0 +1,31 @@
+from unittest.mock import patch
+from result_cache import ResultCache, cache_key
+
+def test_cache_key_normalises_target_and_parameter_order():
+    a = cache_key("nmap", "Example.com ", {"-p": "80", "x": "1"}, "Nmap 7.95")
+    b = cache_key("nmap", "example.com", {"x": "1", "-p": "80"}, "Nmap 7.95")
+    assert a == b
+    assert a != cache_key("nmap", "example.com", {"-p": "80", "x": "1"}, "Nmap 7.96"), "Tool upgrades should miss"
+
+def test_round_trip_and_ttl(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), ttl=60)
+    cache.put("k", "nmap", "example.com", "80/tcp open http", None, [80])
+    assert cache.get("k")["findings"] == [80]
+    with patch("result_cache.time.time", return_value=cache.get("k")["created_at"] + 61):
+        assert cache.get("k") is None, "Expired entries should miss"
+    assert len(cache) == 0
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), ttl=1e12, max_entries=2)
+    with patch("result_cache.time.time", side_effect=[1, 2, 3, 4, 5]):
+        cache.put("a", "nmap", "a.com", "", None, [])
+        cache.put("b", "nmap", "b.com", "", None, [])
+        cache.get("a")
+        cache.put("c", "nmap", "c.com", "", None, [])
+    assert cache.get("b") is None, "Least recently used entry should be evicted"
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    ResultCache(path).put("k", "gobuster", "example.com", "/admin", None, ["/admin"])
+    assert ResultCache(path).get("k")["output"] == "/admin"
@@ -0,0 +1,61 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from run_history import RunHistory, diff_findings, fingerprint, http_probe, scan_key
+
+def test_history_keeps_fingerprints_and_findings_per_run(tmp_path):
+    history = RunHistory(str(tmp_path / "history.sqlite"))
+    first = history.start_run()
+    key = scan_key("Example.com", {"-p": "80,443"})
+    history.record_fingerprint(first, key, "abc")
+    history.finish_run(first, {"example.com": {"nmap": [80], "gobuster": ["/admin"]}})
+    second = history.start_run()
+    assert history.last_fingerprint(key, before=second) == "abc"
+    assert history.last_fingerprint(key, before=first) is None
+    assert history.baseline(second) == first and history.baseline(first) is None
+    assert history.findings(first) == {"example.com": {"nmap": [80], "gobuster": ["/admin"]}}
+    assert history.baseline(history.start_run()) == first, "Unfinished runs are never a baseline"
+
+def test_fingerprint_ignores_ordering():
+    assert fingerprint(["10.0.0.2", "10.0.0.1"], [443, 80]) == fingerprint(["10.0.0.1", "10.0.0.2"], [80, 443])
+    assert fingerprint(["10.0.0.1"], [80]) != fingerprint(["10.0.0.9"], [80]), "A new address is a change"
+    http = {"http://a.com": {"status": 200, "server": "nginx", "title": "t"}}
+    assert fingerprint(["10.0.0.1"], [80], http) != fingerprint(["10.0.0.1"], [80], {"http://a.com": dict(http["http://a.com"], status=302)})
+
+def test_http_probe_reads_status_server_and_title():
+    class Handler(BaseHTTPRequestHandler):
+        def version_string(self):
+            return "TestServer"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.server.hosts.append(self.headers["Host"])
+            self.send_response(404 if self.server.missing else 200)
+            self.end_headers()
+            self.wfile.write(b"<html><TITLE> Login </TITLE></html>")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.missing = False
+    server.hosts = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        first = http_probe(url)
+        assert first["status"] == 200 and first["server"] == "TestServer" and len(first["title"]) == 64
+        server.missing = True
+        assert http_probe(url) == dict(first, status=404), "Error statuses are fingerprinted, not raised"
+        pinned = http_probe(f"http://app.invalid:{server.server_address[1]}/", address="127.0.0.1")
+        assert pinned["status"] == 404 and server.hosts[-1] == f"app.invalid:{server.server_address[1]}", \
+            "Pinned probes connect to the address and send the hostname"
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert http_probe("http://127.0.0.1:9") == {"status": None, "server": None, "title": None}
+
+def test_diff_findings_lists_new_and_removed_items():
+    previous = {"a.com": {"nmap": [80, 22], "sqlmap": {"vulnerable": False}}, "gone.com": {"nmap": [80]}}
+    current = {"a.com": {"nmap": [80, 443], "sqlmap": {"vulnerable": True}}, "new.com": {"gobuster": ["/x"]}}
+    delta = diff_findings(previous, current)
+    assert delta["new"] == {"a.com": {"nmap": [443], "sqlmap": [{"vulnerable": True}]}, "new.com": {"gobuster": ["/x"]}}
+    assert delta["removed"] == {"a.com": {"nmap": [22], "sqlmap": [{"vulnerable": False}]}, "gone.com": {"nmap": [80]}}
@@ -0,0 +1,51 @@
+import ipaddress
+import random
+from scope_index import ScopeIndex, IntervalIndex, DomainTrie
+from security_pipeline import ScopeConfig
+
+def naive_in_scope(domains, networks, target):
+    try:
+        ip = ipaddress.ip_address(target)
+        return any(ip in net for net in networks)
+    except ValueError:
+        target = target.lower()
+        return any(target == d or target.endswith('.' + d) for d in domains)
+
+def test_interval_index_merges_overlapping_ranges():
+    nets = [ipaddress.ip_network(n) for n in ["10.0.0.0/24", "10.0.0.128/25", "10.0.1.0/24", "192.168.0.0/16"]]
+    index = IntervalIndex(nets)
+    assert len(index) == 2, "Adjacent and overlapping ranges should collapse"
+    assert int(ipaddress.ip_address("10.0.1.255")) in index
+    assert int(ipaddress.ip_address("10.0.2.0")) not in index
+    assert int(ipaddress.ip_address("9.255.255.255")) not in index
+
+def test_domain_trie_matches_suffixes_only_on_label_boundaries():
+    trie = DomainTrie(["example.com", "corp.internal"])
+    assert trie.matches("example.com")
+    assert trie.matches("a.b.example.com")
+    assert not trie.matches("badexample.com"), "Suffix must align with a label"
+    assert not trie.matches("com")
+    assert trie.matches("vpn.corp.internal")
+
+def test_ipv6_scope():
+    scope = ScopeConfig(allowed_domains=[], allowed_ips=["2001:db8::/32", "10.0.0.0/8"])
+    assert scope.is_in_scope("2001:db8::1")
+    assert not scope.is_in_scope("2001:db9::1")
+    assert scope.is_in_scope("10.1.2.3")
+    assert not scope.is_in_scope("::ffff:10.1.2.3"), "IPv4-mapped IPv6 is not matched against IPv4 ranges"
+
+def test_filter_in_scope():
+    scope = ScopeConfig(allowed_domains=["Example.com"], allowed_ips=["192.168.1.0/24"])
+    targets = ["example.com", "WWW.EXAMPLE.COM", "other.com", "192.168.1.5", "192.168.2.5"]
+    assert scope.filter_in_scope(targets) == ["example.com", "WWW.EXAMPLE.COM", "192.168.1.5"]
+
+def test_index_agrees_with_linear_scan():
+    rng = random.Random(7)
+    networks = [ipaddress.ip_network(f"10.{rng.randrange(256)}.{rng.randrange(256)}.0/{rng.choice([22, 24, 28])}", strict=False)
+                for _ in range(300)]
+    domains = [f"d{rng.randrange(500)}.example{rng.randrange(5)}.com" for _ in range(300)]
+    index = ScopeIndex(domains, networks)
+    targets = [f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}" for _ in range(2000)]
+    targets += [f"h.d{rng.randrange(500)}.example{rng.randrange(6)}.com" for _ in range(2000)]
+    for target in targets:
+        assert index.contains(target) == naive_in_scope(domains, networks, target), target
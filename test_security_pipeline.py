@@ -1,7 +1,22 @@
 import pytest
-from security_pipeline import ScopeConfig, SecurityTask, SecurityPipeline, run_security_tool, parse_tool_output
+from security_pipeline import (ScopeConfig, SecurityTask, SecurityPipeline, ConcurrencyConfig, StreamingConfig, RetryPolicy,
+                               ShardingConfig, run_security_tool, run_command, stream_security_tool, parse_tool_output,
+                               parse_port_spec, split_port_ranges, shard_task, ReportConfig, save_report, ParserConfig,
+                               StagingConfig, http_endpoints, DeltaConfig, IntakeConfig, normalize_task, plan_intake, CompactConfig)
+from result_cache import ResultCache
+from pipeline_metrics import TaskMetrics
+from task_queue import SQLiteTaskQueue
+from rate_governor import RateLimitConfig
+from run_history import RunHistory
+from dns_cache import DNSCache
+from compact_store import TaskRecord
 from unittest.mock import patch, Mock
+import json
+import os
 import subprocess
+import sys
+import threading
+import time
 
 def test_scope_config():
     scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=["192.168.1.0/24"])
@@ -11,7 +26,7 @@ def test_scope_config():
     assert scope.is_in_scope("192.168.1.10") == True, "IP in range should be in scope"
     assert scope.is_in_scope("10.0.0.1") == False, "IP out of range should be out of scope"
 
-@patch('subprocess.run')
+@patch('security_pipeline.run_command')
 def test_run_security_tool_nmap(mock_run):
     mock_run.return_value = Mock(stdout="PORT     STATE SERVICE\n80/tcp   open  http", returncode=0)
     task = SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "80"})
@@ -19,13 +34,11 @@ def test_run_security_tool_nmap(mock_run):
     assert "80/tcp   open  http" in result, "Nmap output should contain expected port info"
     mock_run.assert_called_once_with(
         ['nmap', '-Pn', 'example.com', '-p', '80'],
-        capture_output=True,
-        text=True,
-        check=True,
-        timeout=300
+        timeout=300,
+        metrics=None
     )
 
-@patch('subprocess.run')
+@patch('security_pipeline.run_command')
 def test_run_security_tool_gobuster(mock_run):
     mock_run.return_value = Mock(stdout="/test (Status: 200)", returncode=0)
     task = SecurityTask(task_type="gobuster", target="example.com", parameters={"wordlist": r"C:\wordlists\common.txt"})
@@ -33,13 +46,11 @@ def test_run_security_tool_gobuster(mock_run):
     assert "/test" in result, "Gobuster output should contain discovered path"
     mock_run.assert_called_once_with(
         ['gobuster', 'dir', '-u', 'http://example.com', '-w', r"C:\wordlists\common.txt", '-b', '400'],
-        capture_output=True,
-        text=True,
-        check=True,
-        timeout=300
+        timeout=300,
+        metrics=None
     )
 
-@patch('subprocess.run')
+@patch('security_pipeline.run_command')
 def test_failure_retry(mock_run):
     mock_run.side_effect = subprocess.CalledProcessError(1, "cmd", stderr="Execution failed")
     scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
@@ -87,7 +98,7 @@ def test_parse_sqlmap_output():
     result = parse_tool_output("sqlmap", sample_output)
     assert result == {'vulnerable': True}, "Should detect SQL injection vulnerability"
 
-@patch('subprocess.run')
+@patch('security_pipeline.run_command')
 def test_pipeline_execution(mock_run):
     mock_run.return_value = Mock(stdout="PORT     STATE SERVICE\n80/tcp   open  http", returncode=0)
     scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
@@ -98,7 +109,7 @@ def test_pipeline_execution(mock_run):
     assert state.findings["example.com"]["nmap"] == [80], "Findings should contain parsed nmap output"
     assert mock_run.called, "Subprocess should be called"
 
-@patch('subprocess.run')
+@patch('security_pipeline.run_command')
 def test_pipeline_out_of_scope(mock_run):
     mock_run.return_value = Mock(stdout="PORT     STATE SERVICE\n80/tcp   open  http", returncode=0)
     scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
@@ -107,4 +118,601 @@ def test_pipeline_out_of_scope(mock_run):
     state = pipeline.run()
     assert state.tasks[0].status == "failed", "Out-of-scope task should fail"
     assert state.tasks[0].error == "Target out of scope", "Error should indicate scope violation"
-    assert not mock_run.called, "Subprocess should not be called for out-of-scope target"
\ No newline at end of file
+    assert not mock_run.called, "Subprocess should not be called for out-of-scope target"
+
+def _tracking_run(active, peaks, lock, delay=0.05):
+    def fake_run(cmd, **kwargs):
+        target = cmd[2]
+        with lock:
+            active[target] = active.get(target, 0) + 1
+            active['*'] = active.get('*', 0) + 1
+            peaks[target] = max(peaks.get(target, 0), active[target])
+            peaks['*'] = max(peaks.get('*', 0), active['*'])
+        time.sleep(delay)
+        with lock:
+            active[target] -= 1
+            active['*'] -= 1
+        return Mock(stdout=f"{cmd[4]}/tcp   open  http", returncode=0)
+    return fake_run
+
+def test_concurrent_execution_respects_limits():
+    active, peaks, lock = {}, {}, threading.Lock()
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    tasks = [SecurityTask(task_type="nmap", target=f"h{i % 2}.example.com", parameters={"-p": str(80 + i)})
+             for i in range(8)]
+    concurrency = ConcurrencyConfig(max_workers=4, per_target_limit=1)
+    with patch('security_pipeline.run_command', side_effect=_tracking_run(active, peaks, lock)):
+        state = SecurityPipeline(scope, tasks, concurrency=concurrency).run()
+    assert all(task.status == "completed" for task in state.tasks)
+    assert peaks["h0.example.com"] == 1 and peaks["h1.example.com"] == 1, "Per-target cap should hold"
+    assert peaks['*'] == 2, "Both targets should run in parallel"
+
+def test_concurrent_findings_merge_in_task_order():
+    active, peaks, lock = {}, {}, threading.Lock()
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    tasks = [SecurityTask(task_type="nmap", target="example.com", parameters={"-p": str(port)}) for port in (22, 80, 443)]
+    with patch('security_pipeline.run_command', side_effect=_tracking_run(active, peaks, lock)):
+        state = SecurityPipeline(scope, tasks, concurrency=ConcurrencyConfig(max_workers=3)).run()
+    assert peaks['*'] == 3, "Tasks should run concurrently"
+    assert state.findings["example.com"]["nmap"] == [443], "Last submitted task should win, as in sequential mode"
+
+def _python_tool(script):
+    return patch('security_pipeline.build_command', return_value=[sys.executable, '-c', script])
+
+def test_streaming_spools_output_and_reports_findings(tmp_path):
+    script = "print('PORT STATE SERVICE'); print('22/tcp open ssh', flush=True); print('80/tcp open http')"
+    seen = []
+    streaming = StreamingConfig(enabled=True, spool_dir=str(tmp_path), on_finding=lambda task, item: seen.append(item))
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    task = SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "1-1000"})
+    with _python_tool(script):
+        state = SecurityPipeline(scope, [task], streaming=streaming).run()
+    assert state.tasks[0].status == "completed"
+    assert seen == [22, 80], "Findings should be reported line by line"
+    assert state.findings["example.com"]["nmap"] == [22, 80]
+    assert state.tasks[0].result is None, "Spooled output should not be kept in memory"
+    with open(state.tasks[0].output_path) as f:
+        assert "80/tcp open http" in f.read()
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_task_metrics_reach_report_and_prometheus_file(tmp_path, streaming):
+    script = "x = bytearray(8 * 1024 * 1024); print('22/tcp open ssh'); print('80/tcp open http')"
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    task = SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "1-1000"})
+    report = ReportConfig(journal_path=str(tmp_path / "audit.jsonl"), report_path=str(tmp_path / "audit.json"),
+                          raw_dir=str(tmp_path / "raw"), metrics_path=str(tmp_path / "pipeline.prom"))
+    with _python_tool(script):
+        state = SecurityPipeline(scope, [task], streaming=StreamingConfig(enabled=streaming), report=report).run()
+    metrics = state.tasks[0].metrics
+    assert metrics.attempts == 1 and metrics.wall_time > 0 and metrics.output_bytes == 33
+    assert metrics.report_time > 0
+    if hasattr(__import__('os'), 'wait4'):
+        assert metrics.cpu_user is not None and metrics.max_rss >= 8 * 1024 * 1024
+    with open(report.report_path) as f:
+        final = json.load(f)
+    assert final["tasks"][0]["metrics"]["output_bytes"] == 33
+    assert final["metrics"]["tools"]["nmap"]["tasks_total"] == {"completed": 1}
+    assert set(final["metrics"]["stages"]) == {"execute", "report"}
+    assert 'security_pipeline_stage_seconds_count{stage="finalize"} 1' in open(report.metrics_path).read()
+
+def test_streaming_keeps_output_without_spool_dir():
+    task = SecurityTask(task_type="gobuster", target="example.com", parameters={})
+    with _python_tool("print('/admin (Status: 200)')"):
+        output, spool_path, findings = stream_security_tool(task, StreamingConfig(enabled=True))
+    assert output == "/admin (Status: 200)\n"
+    assert spool_path is None
+    assert findings == ["/admin"]
+
+def test_streaming_failure_and_timeout():
+    task = SecurityTask(task_type="nmap", target="example.com", parameters={})
+    with _python_tool("import sys; sys.stderr.write('boom'); sys.exit(2)"):
+        with pytest.raises(RuntimeError, match="boom"):
+            stream_security_tool(task, StreamingConfig(enabled=True))
+    with _python_tool("import time; print('22/tcp open ssh', flush=True); time.sleep(30)"):
+        with pytest.raises(subprocess.TimeoutExpired):
+            stream_security_tool(task, StreamingConfig(enabled=True, timeout=1))
+
+def test_run_command_matches_subprocess_run_and_measures_the_child():
+    metrics = TaskMetrics()
+    result = run_command([sys.executable, "-c", "x = bytearray(8 * 1024 * 1024); print('ok')"], metrics=metrics)
+    assert result.stdout == "ok\n" and result.returncode == 0
+    if hasattr(os, 'wait4'):
+        assert metrics.cpu_user is not None and metrics.max_rss >= 8 * 1024 * 1024
+    with pytest.raises(subprocess.CalledProcessError) as failed:
+        run_command([sys.executable, "-c", "import sys; sys.stderr.write('boom'); sys.exit(2)"])
+    assert failed.value.returncode == 2 and failed.value.stderr == "boom"
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_command([sys.executable, "-c", "import time; time.sleep(30)"], timeout=1)
+
+@patch('security_pipeline.tool_version', return_value="Nmap 7.95")
+@patch('security_pipeline.run_command')
+def test_result_cache_hits_and_force_refresh(mock_run, mock_version, tmp_path):
+    mock_run.return_value = Mock(stdout="80/tcp   open  http", returncode=0)
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    make_task = lambda **kw: SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "80"}, **kw)
+
+    first = SecurityPipeline(scope, [make_task()], cache=cache).run()
+    second = SecurityPipeline(scope, [make_task()], cache=cache).run()
+    assert not first.tasks[0].cache_hit and second.tasks[0].cache_hit
+    assert second.findings["example.com"]["nmap"] == [80], "Cached findings should be merged"
+    assert mock_run.call_count == 1, "Second run should be served from cache"
+
+    refreshed = SecurityPipeline(scope, [make_task(force_refresh=True)], cache=cache).run()
+    assert not refreshed.tasks[0].cache_hit
+    assert mock_run.call_count == 2, "force_refresh should bypass the cache"
+
+@patch('security_pipeline.run_command')
+def test_fatal_errors_are_not_retried(mock_run):
+    mock_run.side_effect = FileNotFoundError()
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    tasks = [SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "80"}),
+             SecurityTask(task_type="nikto", target="example.com", parameters={})]
+    state = SecurityPipeline(scope, tasks).run()
+    assert [task.status for task in state.tasks] == ["failed", "failed"]
+    assert [task.retries for task in state.tasks] == [1, 1], "Fatal errors should fail on the first attempt"
+    assert "not found" in state.tasks[0].error
+    assert "Unknown task type" in state.tasks[1].error
+    assert mock_run.call_count == 1
+
+def test_retry_backoff_does_not_block_other_tasks():
+    calls = []
+    def fake_run(cmd, **kwargs):
+        calls.append((cmd[2], time.monotonic()))
+        if cmd[2] == "flaky.example.com" and sum(1 for target, _ in calls if target == cmd[2]) < 3:
+            raise subprocess.TimeoutExpired(cmd, 300)
+        return Mock(stdout="80/tcp   open  http", returncode=0)
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    tasks = [SecurityTask(task_type="nmap", target="flaky.example.com", parameters={"-p": "80"}),
+             SecurityTask(task_type="nmap", target="ok.example.com", parameters={"-p": "80"})]
+    retry = RetryPolicy(base_delay=0.2, max_delay=0.2)
+    with patch('security_pipeline.run_command', side_effect=fake_run), \
+         patch('security_pipeline.save_report', side_effect=lambda state: state) as mock_report, \
+         patch('security_pipeline.random.uniform', side_effect=lambda low, high: high):
+        state = SecurityPipeline(scope, tasks, retry=retry).run()
+    assert [task.status for task in state.tasks] == ["completed", "completed"]
+    assert state.tasks[0].retries == 2 and state.tasks[0].error is None
+    assert [target for target, _ in calls[:2]] == ["flaky.example.com", "ok.example.com"], "Healthy task runs during backoff"
+    flaky_times = [at for target, at in calls if target == "flaky.example.com"]
+    assert all(later - earlier >= 0.19 for earlier, later in zip(flaky_times, flaky_times[1:])), "Retries should back off"
+    assert mock_report.call_count == 1, "All retries should finish within a single graph invocation"
+
+def test_port_spec_sharding():
+    assert parse_port_spec("443, 80-90,22,85-100") == [(22, 22), (80, 100), (443, 443)]
+    assert parse_port_spec("T:80,U:53") is None
+    assert split_port_ranges([(1, 10), (20, 25)], 4) == ["1-4", "5-8", "9-10,20-21", "22-25"]
+    task = SecurityTask(task_type="nmap", target="example.com", parameters={})
+    shards = shard_task(task, ShardingConfig(enabled=True))
+    assert len(shards) == 16 and shards[0].parameters["-p"] == "1-4096" and shards[-1].parameters["-p"] == "61441-65535"
+
+def test_wordlist_sharding(tmp_path):
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("".join(f"word{i}\n" for i in range(25)))
+    config = ShardingConfig(enabled=True, wordlist_chunk_lines=10, shard_dir=str(tmp_path / "shards"))
+    task = SecurityTask(task_type="ffuf", target="example.com", parameters={"wordlist": str(wordlist)})
+    shards = shard_task(task, config)
+    assert len(shards) == 3
+    assert open(shards[2].parameters["wordlist"]).read() == "word20\nword21\nword22\nword23\nword24\n"
+    assert [s.parameters["wordlist"] for s in shard_task(task, config)] == [s.parameters["wordlist"] for s in shards]
+
+def test_sharded_scan_merges_results_and_keeps_partial_progress():
+    def fake_run(cmd, **kwargs):
+        low = int(cmd[4].split('-')[0])
+        if low == 201:
+            raise subprocess.TimeoutExpired(cmd, 300)
+        return Mock(stdout=f"{low}/tcp   open  http", returncode=0)
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    task = SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "1-300"})
+    sharding = ShardingConfig(enabled=True, port_chunk_size=100)
+    with patch('security_pipeline.run_command', side_effect=fake_run) as mock_run:
+        state = SecurityPipeline(scope, [task], concurrency=ConcurrencyConfig(max_workers=3), sharding=sharding,
+                                 retry=RetryPolicy(base_delay=0)).run()
+    parent = state.tasks[0]
+    assert [shard.status for shard in parent.shards] == ["completed", "completed", "failed"]
+    assert parent.status == "failed" and "1 of 3 shards failed" in parent.error
+    assert state.findings["example.com"]["nmap"] == [1, 101], "Completed shards should still be merged"
+    assert mock_run.call_count == 5, "Only the failing shard should be retried"
+
+@patch('security_pipeline.run_command')
+def test_report_journal_written_as_tasks_finish(mock_run, tmp_path):
+    mock_run.return_value = Mock(stdout="PORT     STATE SERVICE\n80/tcp   open  http", returncode=0)
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    tasks = [SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "80"}),
+             SecurityTask(task_type="nmap", target="other.com", parameters={"-p": "80"})]
+    report = ReportConfig(journal_path=str(tmp_path / "audit.jsonl"), report_path=str(tmp_path / "audit.json"),
+                          raw_dir=str(tmp_path / "raw"))
+    with patch('security_pipeline.save_report', side_effect=lambda state: state):
+        pipeline = SecurityPipeline(scope, tasks, report=report)
+        pipeline.run()
+    records = [json.loads(line) for line in open(report.journal_path)]
+    assert [record["event"] for record in records] == ["scope", "task", "task"], "Tasks are journaled before save_report"
+
+    save_report(pipeline.state)
+    with open(report.report_path) as f:
+        final = json.load(f)
+    assert final["findings"] == {"example.com": {"nmap": [80]}}
+    assert [task["status"] for task in final["tasks"]] == ["completed", "failed"]
+
+def test_checkpoint_resume_skips_completed_tasks(tmp_path):
+    calls = []
+    def crashing_run(cmd, **kwargs):
+        calls.append(cmd[2])
+        if cmd[2] == "b.example.com" and calls.count(cmd[2]) == 1:
+            raise KeyboardInterrupt  # simulates the process dying mid-scan
+        return Mock(stdout=f"{cmd[4]}/tcp   open  http", returncode=0)
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    tasks = [SecurityTask(task_type="nmap", target=f"{name}.example.com", parameters={"-p": "80"}) for name in "abc"]
+    report = ReportConfig(journal_path=str(tmp_path / "audit.jsonl"), report_path=str(tmp_path / "audit.json"),
+                          raw_dir=str(tmp_path / "raw"))
+    checkpoint = str(tmp_path / "run.sqlite")
+    with patch('security_pipeline.run_command', side_effect=crashing_run):
+        with pytest.raises(KeyboardInterrupt):
+            SecurityPipeline(scope, tasks, report=report, checkpoint=checkpoint).run()
+        pipeline = SecurityPipeline.resume(checkpoint)
+        assert [task.status for task in pipeline.state.tasks] == ["completed", "pending", "pending"]
+        state = pipeline.run()
+    assert calls == ["a.example.com", "b.example.com", "b.example.com", "c.example.com"], "Completed work is not redone"
+    assert [task.status for task in state.tasks] == ["completed"] * 3
+    assert state.tasks[1].retries == 0, "An interrupted task should not lose a retry"
+    assert set(state.findings) == {"a.example.com", "b.example.com", "c.example.com"}
+    with open(report.report_path) as f:
+        assert len(json.load(f)["tasks"]) == 3, "Resumed runs extend the original journal"
+
+def test_resume_reuses_finished_shards_of_a_coalesced_scan(tmp_path):
+    calls = []
+    def crashing_run(cmd, **kwargs):
+        calls.append(cmd[4])
+        if cmd[4] == "9-12" and calls.count(cmd[4]) == 1:
+            raise KeyboardInterrupt
+        return Mock(stdout=f"{cmd[4].split('-')[0]}/tcp   open  http", returncode=0)
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    tasks = [SecurityTask(task_type="nmap", target="example.com", parameters={"-p": ports}) for ports in ("1-8", "5-12")]
+    report = ReportConfig(journal_path=str(tmp_path / "audit.jsonl"), report_path=str(tmp_path / "audit.json"),
+                          raw_dir=str(tmp_path / "raw"))
+    checkpoint = str(tmp_path / "run.sqlite")
+    sharding = ShardingConfig(enabled=True, port_chunk_size=4)
+    with patch('security_pipeline.run_command', side_effect=crashing_run):
+        with pytest.raises(KeyboardInterrupt):
+            SecurityPipeline(scope, tasks, report=report, checkpoint=checkpoint, sharding=sharding,
+                             intake=IntakeConfig(enabled=True)).run()
+        assert calls == ["1-4", "5-8", "9-12"]
+        state = SecurityPipeline.resume(checkpoint).run()
+    assert calls[3:] == ["9-12"], "Only the interrupted shard of the coalesced scan runs again"
+    assert [task.status for task in state.tasks] == ["completed", "completed"]
+    assert [task.parsed for task in state.tasks] == [[1, 5], [5, 9]]
+
+def test_resume_without_checkpoint(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        SecurityPipeline.resume(str(tmp_path / "missing.sqlite"))
+
+@patch('security_pipeline.run_command')
+def test_structured_machine_readable_findings(mock_run):
+    mock_run.return_value = Mock(stdout='<port protocol="tcp" portid="443"><state state="open"/><service name="https"/></port>\n',
+                                 returncode=0)
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    task = SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "443"})
+    state = SecurityPipeline(scope, [task], parsing=ParserConfig(structured=True, machine_readable=True)).run()
+    assert mock_run.call_args[0][0] == ['nmap', '-Pn', 'example.com', '-p', '443', '-oX', '-']
+    assert state.findings["example.com"]["nmap"] == [{"port": 443, "proto": "tcp", "state": "open", "service": "https"}]
+
+def test_http_endpoints_from_nmap_findings():
+    assert http_endpoints([22, 80, 443, 8443]) == [("http", 80), ("https", 443), ("https", 8443)]
+    records = [{"port": 22, "proto": "tcp", "state": "open", "service": "ssh"},
+               {"port": 8080, "proto": "tcp", "state": "closed", "service": "http-proxy"},
+               {"port": 9000, "proto": "tcp", "state": "open", "service": "http", "tunnel": "ssl"},
+               {"port": 3000, "proto": "tcp", "state": "open", "service": "http"}]
+    assert http_endpoints(records) == [("https", 9000), ("http", 3000)]
+
+def test_staged_follow_ups_run_per_open_web_port():
+    started = {}
+    def fake_run(cmd, **kwargs):
+        key = (cmd[0], cmd[cmd.index('-u') + 1] if '-u' in cmd else cmd[2])
+        started[key] = time.monotonic()
+        if cmd[0] == 'nmap' and cmd[2] == 'slow.example.com':
+            time.sleep(0.3)
+            return Mock(stdout="22/tcp   open  ssh", returncode=0)
+        if cmd[0] == 'nmap':
+            return Mock(stdout="80/tcp   open  http\n8443/tcp open  https-alt", returncode=0)
+        return Mock(stdout="/admin (Status: 200)", returncode=0)
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    tasks = [SecurityTask(task_type="nmap", target="slow.example.com", parameters={"-p": "1-1000"}),
+             SecurityTask(task_type="nmap", target="web.example.com", parameters={"-p": "1-10000"}),
+             SecurityTask(task_type="gobuster", target="slow.example.com", parameters={}),
+             SecurityTask(task_type="gobuster", target="web.example.com", parameters={})]
+    staging = StagingConfig(follow_ups={"gobuster": {}, "ffuf": {"wordlist": "small.txt"}}, enabled=True)
+    with patch('security_pipeline.run_command', side_effect=fake_run) as mock_run:
+        state = SecurityPipeline(scope, tasks, concurrency=ConcurrencyConfig(max_workers=4), staging=staging).run()
+    slow_gobuster = state.tasks[2]
+    assert slow_gobuster.status == "skipped" and "no open http port 80" in slow_gobuster.error
+    assert ('gobuster', 'http://slow.example.com') not in started, "Targets without web ports are never hit"
+    follow_ups = [(task.task_type, task.parameters.get("url"), task.depends_on) for task in state.tasks[4:]]
+    assert follow_ups == [("ffuf", None, 1), ("gobuster", "https://web.example.com:8443", 1),
+                          ("ffuf", "https://web.example.com:8443", 1)]
+    assert all(task.status == "completed" for task in state.tasks[3:])
+    assert started[('ffuf', 'https://web.example.com:8443/FUZZ')] < started[('nmap', 'slow.example.com')] + 0.3, \
+        "Follow-ups start as soon as their own scan finishes"
+    assert mock_run.call_count == 6
+    findings = state.findings["web.example.com"]
+    assert set(findings) == {"nmap", "gobuster", "ffuf", "gobuster https://web.example.com:8443",
+                             "ffuf https://web.example.com:8443"}
+
+@pytest.mark.skipif(os.name == "nt", reason="stub tools are shell scripts")
+def test_distributed_workers_run_queued_tasks(tmp_path):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    stub = bin_dir / "nmap"
+    stub.write_text('#!/bin/sh\nif [ "$4" = "9" ]; then echo boom >&2; exit 1; fi\necho "$4/tcp   open  http"\n')
+    stub.chmod(0o755)
+    queue_path = str(tmp_path / "queue.sqlite")
+    worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scan_worker.py")
+    env = {**os.environ, "PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}"}
+    workers = [subprocess.Popen([sys.executable, worker_script, "--sqlite", queue_path, "--poll", "0.05",
+                                 "--worker-id", f"w{i}"], cwd=tmp_path, env=env) for i in range(2)]
+    try:
+        scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+        tasks = [SecurityTask(task_type="nmap", target=f"host{port}.example.com", parameters={"-p": str(port)})
+                 for port in (22, 80, 443, 9)]
+        queue = SQLiteTaskQueue(queue_path)
+        state = SecurityPipeline(scope, tasks, concurrency=ConcurrencyConfig(max_workers=4), task_queue=queue,
+                                 retry=RetryPolicy(max_attempts=2, base_delay=0)).run()
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait(timeout=10)
+    assert [task.status for task in state.tasks] == ["completed"] * 3 + ["failed"]
+    assert state.findings["host443.example.com"]["nmap"] == [443]
+    assert "boom" in state.tasks[3].error and state.tasks[3].retries == 2, "Remote failures keep their retry semantics"
+    assert all(task.metrics.wall_time > 0 for task in state.tasks), "Worker-side metrics are merged into the task"
+    assert queue.counts() == {"done": 5}
+
+def test_queued_task_times_out_when_its_worker_dies(tmp_path):
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"), max_leases=1)
+    def dead_worker():
+        # Leases the job and then never renews or completes it
+        while queue.lease("dead", lease_seconds=60) is None:
+            time.sleep(0.05)
+    threading.Thread(target=dead_worker, daemon=True).start()
+    tasks = [SecurityTask(task_type="nmap", target="example.com", parameters={})]
+    started = time.monotonic()
+    state = SecurityPipeline(scope, tasks, task_queue=queue, streaming=StreamingConfig(timeout=1),
+                             retry=RetryPolicy(max_attempts=1)).run()
+    assert state.tasks[0].status == "failed" and "timed out" in state.tasks[0].error
+    assert time.monotonic() - started < 10, "The wait is bounded by timeout x max_leases"
+    assert queue.counts() == {"cancelled": 1}, "The timed-out job is withdrawn so no worker runs it later"
+
+def test_queue_backlog_longer_than_the_timeout_does_not_time_out(tmp_path):
+    from scan_worker import run_worker
+    def slow_tool(task, machine=False, metrics=None):
+        time.sleep(0.4)
+        return "80/tcp   open  http"
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"), max_leases=1)
+    stop = threading.Event()
+    tasks = [SecurityTask(task_type="nmap", target=f"host{i}.example.com", parameters={}) for i in range(5)]
+    with patch('scan_worker.run_security_tool', side_effect=slow_tool):
+        worker = threading.Thread(target=run_worker, args=(queue, "w1"), kwargs={"poll_interval": 0.05, "stop": stop})
+        worker.start()
+        try:
+            state = SecurityPipeline(scope, tasks, concurrency=ConcurrencyConfig(max_workers=5), task_queue=queue,
+                                     streaming=StreamingConfig(timeout=1), retry=RetryPolicy(max_attempts=1)).run()
+        finally:
+            stop.set()
+            worker.join(timeout=10)
+    assert [task.status for task in state.tasks] == ["completed"] * 5, "Jobs waiting for the one worker never time out"
+    assert queue.counts() == {"done": 5}, "Each task ran exactly once"
+
+def test_rate_governor_slows_down_throttled_targets():
+    commands = []
+    def fake_run(cmd, **kwargs):
+        commands.append(cmd)
+        if len(commands) == 1:
+            return Mock(stdout="".join(f"w{i} [Status: 429, Size: 0, Words: 0, Lines: 0]\n" for i in range(20)), returncode=0)
+        return Mock(stdout="admin [Status: 200, Size: 5, Words: 1, Lines: 1]\n", returncode=0)
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+    tasks = [SecurityTask(task_type="ffuf", target="example.com", parameters={"wordlist": f"list{i}.txt"}) for i in range(3)]
+    rate_limit = RateLimitConfig(enabled=True, initial_rate=40, increase=10)
+    with patch('security_pipeline.run_command', side_effect=fake_run):
+        state = SecurityPipeline(scope, tasks, rate_limit=rate_limit).run()
+    assert [cmd[cmd.index("-rate") + 1] for cmd in commands] == ["40", "20", "30"]
+    assert all("429,503" in cmd[cmd.index("-mc") + 1] for cmd in commands), "Governed ffuf must show throttled responses"
+    assert [task.rate for task in state.tasks] == [40, 20, 30]
+    assert [task.parsed for task in state.tasks] == [[], ["200"], ["200"]], "429s are never findings"
+    assert state.governor.rate("example.com") == 40
+
+def test_delta_mode_skips_stable_targets_and_reports_changes(tmp_path):
+    nmap_output = {"stable.example.com": "80/tcp   open  http", "moving.example.com": "80/tcp   open  http",
+                   "redeployed.example.com": "80/tcp   open  http"}
+    pages = {"http://stable.example.com": {"status": 200, "server": "nginx", "title": "a"},
+             "http://moving.example.com": {"status": 200, "server": "nginx", "title": "a"},
+             "http://redeployed.example.com": {"status": 200, "server": "nginx", "title": "a"}}
+    commands = []
+    def fake_run(cmd, **kwargs):
+        commands.append(cmd)
+        if cmd[0] == "nmap":
+            return Mock(stdout=nmap_output[cmd[2]], returncode=0)
+        return Mock(stdout=f"/{len(commands)} (Status: 200)", returncode=0)
+    def run_once():
+        commands.clear()
+        scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+        tasks = [SecurityTask(task_type="nmap", target=host, parameters={"-p": "1-1000"}) for host in sorted(nmap_output)]
+        tasks.append(SecurityTask(task_type="sqlmap", target="stable.example.com", parameters={}))
+        report = ReportConfig(journal_path=str(tmp_path / "audit.jsonl"), report_path=str(tmp_path / "audit.json"),
+                              raw_dir=str(tmp_path / "raw"))
+        with patch('security_pipeline.run_command', side_effect=fake_run):
+            state = SecurityPipeline(scope, tasks, report=report, history=RunHistory(str(tmp_path / "history.sqlite")),
+                                     staging=StagingConfig(enabled=True, follow_ups={"gobuster": {}}),
+                                     delta=DeltaConfig(enabled=True, resolver=lambda host: ["10.0.0.1"],
+                                                       http_probe=lambda url, address: pages.get(url))).run()
+        with open(report.report_path) as f:
+            return state, json.load(f)
+
+    state, report = run_once()
+    assert sorted(cmd[0] for cmd in commands) == ["gobuster"] * 3 + ["nmap"] * 3 + ["python"]
+    first_paths = state.findings["stable.example.com"]["gobuster"]
+    assert report["delta"]["baseline_run"] is None and report["delta"]["removed"] == {}
+    assert "findings" not in report and all("parsed" not in task for task in report["tasks"]), "Delta reports list only changes"
+
+    nmap_output["moving.example.com"] = "80/tcp   open  http\n443/tcp  open  https"
+    pages["http://redeployed.example.com"] = {"status": 200, "server": "nginx", "title": "b"}
+    state, report = run_once()
+    assert sorted(cmd[0] if cmd[0] != "gobuster" else cmd[3] for cmd in commands) == \
+        ["http://moving.example.com", "http://redeployed.example.com", "https://moving.example.com", "nmap", "nmap", "nmap"], \
+        "Stable targets skip gobuster and sqlmap; a changed page title is a change"
+    stable = [task for task in state.tasks if task.target == "stable.example.com" and task.task_type != "nmap"]
+    assert [task.status for task in stable] == ["skipped", "skipped"]
+    assert state.findings["stable.example.com"]["gobuster"] == first_paths, "Skipped tools keep the previous findings"
+    assert report["delta"]["baseline_run"] == 1
+    assert report["delta"]["new"]["moving.example.com"]["nmap"] == [443]
+    assert "stable.example.com" not in report["delta"]["new"] and "stable.example.com" not in report["delta"]["removed"]
+
+def test_delta_mode_runs_new_and_changed_expensive_tasks_on_stable_targets(tmp_path):
+    commands = []
+    def fake_run(cmd, **kwargs):
+        commands.append(cmd)
+        if cmd[0] == "nmap":
+            return Mock(stdout="80/tcp   open  http", returncode=0)
+        return Mock(stdout=f"/{len(commands)} (Status: 200)", returncode=0)
+    def run_once(extra):
+        commands.clear()
+        scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=[])
+        tasks = [SecurityTask(task_type="nmap", target="stable.example.com", parameters={"-p": "1-1000"})] + extra
+        report = ReportConfig(journal_path=str(tmp_path / "audit.jsonl"), report_path=str(tmp_path / "audit.json"),
+                              raw_dir=str(tmp_path / "raw"))
+        with patch('security_pipeline.run_command', side_effect=fake_run):
+            return SecurityPipeline(scope, tasks, report=report, history=RunHistory(str(tmp_path / "history.sqlite")),
+                                    delta=DeltaConfig(enabled=True, resolver=lambda host: ["10.0.0.1"], probe_http=False)).run()
+
+    run_once([])
+    state = run_once([SecurityTask(task_type="gobuster", target="stable.example.com", parameters={})])
+    assert [task.status for task in state.tasks] == ["completed", "completed"], "No baseline findings for gobuster yet"
+    state = run_once([SecurityTask(task_type="gobuster", target="stable.example.com", parameters={}),
+                      SecurityTask(task_type="gobuster", target="stable.example.com", parameters={"wordlist": "new.txt"})])
+    assert [task.status for task in state.tasks] == ["completed", "skipped", "completed"]
+    assert [cmd[cmd.index("-w") + 1] for cmd in commands if cmd[0] == "gobuster"] == ["new.txt"]
+
+def test_delta_fingerprints_probe_on_the_pool_at_the_pinned_address(tmp_path):
+    b_scanned = threading.Event()
+    probes = []
+    def fake_run(cmd, **kwargs):
+        if cmd[2] == "10.0.0.6":
+            b_scanned.set()
+        return Mock(stdout="80/tcp   open  http", returncode=0)
+    def probe(url, address):
+        # Blocks until b's scan has run: fine on the pool, a deadlock-until-timeout on the scheduler thread
+        probes.append((url, address, b_scanned.wait(5)))
+        return {"status": 200, "server": None, "title": None}
+    def run_once(delta):
+        scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=["10.0.0.0/24"])
+        tasks = [SecurityTask(task_type="nmap", target=host, parameters={"-p": "80"}) for host in ("a.example.com", "b.example.com")]
+        answers = {"a.example.com": ["10.0.0.5"], "b.example.com": ["10.0.0.6"]}
+        report = ReportConfig(journal_path=str(tmp_path / "audit.jsonl"), report_path=str(tmp_path / "audit.json"),
+                              raw_dir=str(tmp_path / "raw"))
+        with patch('security_pipeline.run_command', side_effect=fake_run):
+            return SecurityPipeline(scope, tasks, report=report, history=RunHistory(str(tmp_path / "history.sqlite")),
+                                    concurrency=ConcurrencyConfig(max_workers=2, per_tool_limits={"nmap": 1}),
+                                    dns=DNSCache(lambda host: (answers[host], 60)), delta=delta).run()
+
+    run_once(DeltaConfig(enabled=False, http_probe=probe))
+    assert probes == [], "Without delta mode nothing is probed"
+    state = run_once(DeltaConfig(enabled=True, http_probe=probe))
+    assert [task.status for task in state.tasks] == ["completed", "completed"]
+    assert probes[0] == ("http://a.example.com", "10.0.0.5", True), "Probes use the pinned address and don't block scheduling"
+    assert sorted(probe[:2] for probe in probes) == [("http://a.example.com", "10.0.0.5"), ("http://b.example.com", "10.0.0.6")]
+
+def test_dns_pre_resolution_enforces_ip_scope_and_pins_addresses():
+    answers = {"good.example.com": ["10.0.0.5", "198.51.100.1"], "cdn.example.com": ["203.0.113.9"], "dead.example.com": []}
+    lookups = []
+    def resolver(host):
+        lookups.append(host)
+        return answers[host], 60
+    scope = ScopeConfig(allowed_domains=["example.com"], allowed_ips=["10.0.0.0/24"])
+    tasks = [SecurityTask(task_type="nmap", target=host, parameters={"-p": "80"}) for host in answers]
+    tasks += [SecurityTask(task_type="gobuster", target="good.example.com", parameters={}),
+              SecurityTask(task_type="ffuf", target="good.example.com", parameters={"url": "https://good.example.com"}),
+              SecurityTask(task_type="sqlmap", target="good.example.com", parameters={"url": "http://good.example.com/?id=1"}),
+              SecurityTask(task_type="ffuf", target="safe.example.com", parameters={"url": "https://safe.example.com"})]
+    answers["safe.example.com"] = ["10.0.0.7", "10.0.0.8"]
+    with patch('security_pipeline.run_command', return_value=Mock(stdout="80/tcp   open  http", returncode=0)) as mock_run:
+        state = SecurityPipeline(scope, tasks, dns=DNSCache(resolver)).run()
+    assert sorted(lookups) == sorted(answers), "Each host is resolved once"
+    assert [task.status for task in state.tasks] == ["completed", "failed", "failed", "completed", "failed", "failed", "completed"]
+    assert "outside the allowed IP ranges" in state.tasks[1].error and "Could not resolve" in state.tasks[2].error
+    assert all("198.51.100.1" in task.error and "can't be pinned" in task.error for task in state.tasks[4:6]), \
+        "Unpinned tools on a partly out-of-scope host could reach the out-of-scope address"
+    commands = [call[0][0] for call in mock_run.call_args_list]
+    assert commands[0][:3] == ["nmap", "-Pn", "10.0.0.5"], "Tools get the in-scope address, not the hostname"
+    assert commands[1][3] == "http://10.0.0.5" and commands[1][-2:] == ["-H", "Host: good.example.com"]
+    assert commands[2][2] == "https://safe.example.com/FUZZ", "HTTPS keeps the hostname for SNI when every answer is in scope"
+    assert len(commands) == 3
+    assert state.tasks[0].addresses == ["10.0.0.5"]
+
+def test_normalize_task_canonicalizes_targets_urls_and_ports():
+    task = SecurityTask(task_type="gobuster", target="HTTP://Example.COM./", parameters={})
+    normalize_task(task)
+    assert (task.target, task.parameters) == ("example.com", {}), "Default URL collapses to the plain host"
+    task = SecurityTask(task_type="ffuf", target="https://Example.com:8443/app/", parameters={})
+    normalize_task(task)
+    assert (task.target, task.parameters) == ("example.com", {"url": "https://example.com:8443/app"})
+    task = SecurityTask(task_type="nmap", target="Example.com.", parameters={"-p": "443, 80,81-90,85"})
+    normalize_task(task)
+    assert (task.target, task.parameters) == ("example.com", {"-p": "80-90,443"})
+
+def test_plan_intake_deduplicates_and_merges_overlapping_ports():
+    tasks = [SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "80,443"}),
+             SecurityTask(task_type="nmap", target="EXAMPLE.com", parameters={"-p": "1-1000"}),
+             SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "8080"}),
+             SecurityTask(task_type="nmap", target="other.example.com", parameters={"-p": "80"}),
+             SecurityTask(task_type="sqlmap", target="example.com", parameters={"level": "1"}),
+             SecurityTask(task_type="sqlmap", target="example.com", parameters={"level": "1"}, force_refresh=True)]
+    for task in tasks:
+        normalize_task(task)
+    plan = plan_intake(tasks, IntakeConfig(enabled=True))
+    assert [(carrier.task_type, carrier.parameters, members) for carrier, members in plan] == [
+        ("nmap", {"-p": "1-1000"}, tasks[:2]), ("sqlmap", {"level": "1"}, tasks[4:])]
+    assert plan[1][0].force_refresh, "A forced refresh of any member refreshes the shared run"
+    assert len(plan_intake(tasks[:3], IntakeConfig(enabled=True, merge_ports=False))) == 0
+
+def test_intake_runs_each_group_once_and_splits_results():
+    scope = ScopeConfig(allowed_domains=["example.com"])
+    tasks = [SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "80,443"}),
+             SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "1-1000"}),
+             SecurityTask(task_type="gobuster", target="example.com", parameters={}),
+             SecurityTask(task_type="gobuster", target="example.com", parameters={}),
+             SecurityTask(task_type="gobuster", target="http://Example.com/", parameters={})]
+    outputs = {"nmap": "22/tcp   open  ssh\n80/tcp   open  http\n443/tcp  open  https", "gobuster": "/admin (Status: 200)"}
+    def fake_run(cmd, **kwargs):
+        return Mock(stdout=outputs[cmd[0]], returncode=0)
+    with patch('security_pipeline.run_command', side_effect=fake_run) as mock_run:
+        pipeline = SecurityPipeline(scope, tasks, intake=IntakeConfig(enabled=True))
+        state = pipeline.run()
+    commands = [call[0][0] for call in mock_run.call_args_list]
+    assert sorted(command[0] for command in commands) == ["gobuster", "nmap"], "Five requests, two tool runs"
+    assert next(command for command in commands if command[0] == "nmap")[-1] == "1-1000"
+    assert all(task.status == "completed" for task in state.tasks)
+    assert state.tasks[0].parsed == [80, 443] and state.tasks[1].parsed == [22, 80, 443], "Each task sees only its ports"
+    assert state.tasks[2].parsed == state.tasks[4].parsed == ["/admin"] and state.tasks[4].target == "example.com"
+    tools = pipeline.state.metrics.snapshot()['tools']
+    assert tools['nmap']['invocations_saved_total'] == 1 and tools['gobuster']['invocations_saved_total'] == 2
+    assert tools['gobuster']['tasks_total'] == {'completed': 1}, "Tool metrics count real invocations"
+    with open("audit_report.json") as f:
+        report = json.load(f)
+    assert [task['status'] for task in report['tasks']] == ["completed"] * 5
+
+def test_compact_mode_swaps_settled_tasks_for_records():
+    scope = ScopeConfig(allowed_domains=["example.com"])
+    tasks = [SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "80"}),
+             SecurityTask(task_type="sqlmap", target="other.com", parameters={})]
+    outputs = {"nmap": "80/tcp   open  http", "gobuster": "/admin (Status: 200)", "ffuf": ""}
+    with patch('security_pipeline.run_command', side_effect=lambda cmd, **kwargs: Mock(stdout=outputs[cmd[0]], returncode=0)):
+        pipeline = SecurityPipeline(scope, tasks, staging=StagingConfig(enabled=True), compact=CompactConfig(enabled=True))
+        state = pipeline.run()
+    assert all(isinstance(task, TaskRecord) for task in state.tasks), "Follow-ups are compacted too"
+    assert [(task.task_type, task.status) for task in state.tasks] == [
+        ("nmap", "completed"), ("sqlmap", "failed"), ("gobuster", "completed"), ("ffuf", "completed")]
+    assert state.tasks[0].result == "80/tcp   open  http", "Raw output is read back from the blob store"
+    assert state.findings["example.com"] == {"nmap": (80,), "gobuster": ("/admin",), "ffuf": ()}
+    with open("audit_report.json") as f:
+        report = json.load(f)
+    assert report["findings"]["example.com"]["nmap"] == [80]
+    assert state.model_dump(mode="json", include={"tasks"})["tasks"][2]["parsed"] == ["/admin"]
@@ -0,0 +1,142 @@
+import gc
+import subprocess
+import pytest
+from unittest.mock import Mock, patch
+from sqlmap_api import SqlmapAPIError, SqlmapServerPool, api_findings
+from security_pipeline import ScopeConfig, SecurityTask, SecurityPipeline, ParserConfig
+
+# Minimal stand-in for sqlmapapi.py: same CLI flags and REST routes, canned scan results keyed off the URL
+FAKE_API = r'''
+import json, sys, uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+tasks = {}
+INJECTION = {"place": "GET", "parameter": "id", "dbms": "MySQL",
+             "data": {"1": {"title": "AND boolean-based blind - WHERE or HAVING clause"},
+                      "6": {"title": "Generic UNION query (NULL) - 3 columns"}}}
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def reply(self, body):
+        data = json.dumps(dict(body, success=body.get("success", True))).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts == ["task", "new"]:
+            taskid = uuid.uuid4().hex[:16]
+            tasks[taskid] = {"polls": 0}
+            return self.reply({"taskid": taskid})
+        task = tasks.get(parts[1])
+        if task is None:
+            return self.reply({"success": False, "message": "Invalid task ID"})
+        url = task.get("options", {}).get("url", "")
+        if parts[0] == "task" and parts[2] == "delete":
+            del tasks[parts[1]]
+            return self.reply({})
+        if parts[2] == "status":
+            task["polls"] += 1
+            done = task["polls"] > 1 and "hang" not in url and not task.get("killed")
+            return self.reply({"status": "terminated" if done else "running", "returncode": 1 if "broken" in url else 0})
+        if parts[2] == "kill":
+            task["killed"] = True
+            return self.reply({})
+        if parts[2] == "data":
+            data = [{"status": 1, "type": 0, "value": {"url": url}}]
+            if "vuln" in url:
+                data.append({"status": 1, "type": 1, "value": [INJECTION]})
+            if "broken" in url:
+                return self.reply({"data": [], "error": ["connection refused"]})
+            return self.reply({"data": data, "error": []})
+        if parts[2] == "log":
+            return self.reply({"log": [{"level": "INFO", "message": f"testing {url} at level {task['options'].get('level')}"}]})
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        options = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        tasks[parts[1]]["options"] = options
+        self.reply({"engineid": 1})
+
+args = sys.argv
+ThreadingHTTPServer((args[args.index("-H") + 1], int(args[args.index("-p") + 1])), Handler).serve_forever()
+'''
+
+@pytest.fixture
+def fake_api(tmp_path):
+    path = tmp_path / "sqlmapapi.py"
+    path.write_text(FAKE_API)
+    return str(path)
+
+def test_pool_starts_servers_lazily_and_parses_json_data(fake_api):
+    pool = SqlmapServerPool(fake_api, size=2, poll_interval=0.05)
+    assert pool._processes == [], "Nothing is spawned until the first scan"
+    try:
+        data, log = pool.scan({'url': 'http://vuln.example.com/?id=1', 'level': 2, 'batch': True})
+        assert len(pool._processes) == 2
+        assert log == ["[INFO] testing http://vuln.example.com/?id=1 at level 2"]
+        assert api_findings(data['data']) == {'vulnerable': True}
+        assert api_findings(data['data'], structured=True) == {'vulnerable': True, 'dbms': 'MySQL', 'injections': [
+            {'parameter': 'id', 'place': 'GET', 'type': 'boolean-based blind',
+             'title': 'AND boolean-based blind - WHERE or HAVING clause'},
+            {'parameter': 'id', 'place': 'GET', 'type': 'UNION query', 'title': 'Generic UNION query (NULL) - 3 columns'}]}
+        data, _ = pool.scan({'url': 'http://clean.example.com/?id=1'})
+        assert api_findings(data['data'], structured=True) == {'vulnerable': False, 'dbms': None, 'injections': []}
+        with pytest.raises(subprocess.TimeoutExpired):
+            pool.scan({'url': 'http://hang.example.com/'}, timeout=0.2)
+        with pytest.raises(RuntimeError, match="connection refused"):
+            pool.scan({'url': 'http://broken.example.com/'})
+        assert set(pool._busy.values()) == {0}, "Every scan releases its server"
+    finally:
+        processes = [server.process for server in pool._processes]
+        pool.close()
+    assert all(process.poll() is not None for process in processes)
+
+def test_server_that_fails_to_start_raises_api_error(tmp_path):
+    script = tmp_path / "sqlmapapi.py"
+    script.write_text("import sys; sys.exit(3)")
+    pool = SqlmapServerPool(str(script), size=1)
+    with pytest.raises(SqlmapAPIError, match="status 3"):
+        pool.scan({'url': 'http://example.com/'})
+    with pytest.raises(SqlmapAPIError):
+        pool.scan({'url': 'http://example.com/'})
+
+def test_unreachable_server_raises_api_error_and_is_dropped():
+    pool = SqlmapServerPool(servers=['http://127.0.0.1:9'])
+    with pytest.raises(SqlmapAPIError):
+        pool.scan({'url': 'http://example.com/'})
+    with pytest.raises(SqlmapAPIError, match="No sqlmap API servers"):
+        pool.scan({'url': 'http://example.com/'})
+
+def test_started_servers_are_stopped_when_the_pool_is_dropped(fake_api):
+    pool = SqlmapServerPool(fake_api, size=1, poll_interval=0.05)
+    pool.scan({'url': 'http://clean.example.com/?id=1'})
+    process = pool._processes[0].process
+    del pool
+    gc.collect()
+    assert process.wait(timeout=10) is not None, "Servers must not outlive an abandoned pool"
+
+def test_pipeline_uses_the_api_pool_and_falls_back_to_the_subprocess(fake_api):
+    scope = ScopeConfig(allowed_domains=["example.com"])
+    pool = SqlmapServerPool(fake_api, size=1, poll_interval=0.05)
+    tasks = [SecurityTask(task_type="sqlmap", target="vuln.example.com", parameters={"url": "http://vuln.example.com/?id=1"}),
+             SecurityTask(task_type="nmap", target="example.com", parameters={"-p": "80"})]
+    try:
+        with patch('security_pipeline.run_command', return_value=Mock(stdout="80/tcp open http", returncode=0)) as mock_run:
+            state = SecurityPipeline(scope, tasks, parsing=ParserConfig(structured=True), sqlmap_api=pool).run()
+    finally:
+        pool.close()
+    assert [task.status for task in state.tasks] == ["completed", "completed"]
+    assert [call[0][0][0] for call in mock_run.call_args_list] == ["nmap"], "sqlmap never runs as a subprocess"
+    assert state.tasks[0].parsed['vulnerable'] and state.tasks[0].parsed['dbms'] == 'MySQL'
+    assert "testing http://vuln.example.com/?id=1" in state.tasks[0].result
+
+    tasks = [SecurityTask(task_type="sqlmap", target="example.com", parameters={})]
+    dead = SqlmapServerPool(servers=['http://127.0.0.1:9'])
+    with patch('security_pipeline.run_command', return_value=Mock(stdout="Parameter: id (GET) is vulnerable", returncode=0)) as mock_run:
+        state = SecurityPipeline(scope, tasks, sqlmap_api=dead).run()
+    assert mock_run.call_count == 1 and state.tasks[0].parsed == {'vulnerable': True}
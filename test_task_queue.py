@@ -0,0 +1,107 @@
+import json
+import time
+import pytest
+from task_queue import TaskQueue, SQLiteTaskQueue, QueueServer, RemoteTaskQueue, _QueueHandler
+
+def test_queue_backends_must_implement_every_operation():
+    class Partial(TaskQueue):
+        def put(self, payload, job_id=None):
+            return "x"
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_lease_complete_and_result(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"))
+    first, second = queue.put({"n": 1}), queue.put({"n": 2})
+    assert queue.lease("w1") == (first, {"n": 1}), "Jobs are leased in submission order"
+    assert queue.lease("w2") == (second, {"n": 2})
+    assert queue.lease("w3") is None
+    assert queue.result(first) is None
+    assert not queue.complete(first, "w2", {"output": "x"}), "Only the lease holder can complete a job"
+    assert queue.complete(first, "w1", {"output": "x"})
+    done = queue.result(first)
+    assert done["status"] == "done" and done["result"] == {"output": "x"} and done["worker"] == "w1"
+    assert queue.counts() == {"done": 1, "leased": 1}
+
+def test_cancelled_jobs_are_never_leased_or_completed(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"))
+    pending, leased = queue.put({"n": 1}), queue.put({"n": 2})
+    assert queue.status(pending) == "pending" and queue.status("missing") is None
+    queue.lease("w1")
+    assert queue.status(pending) == "leased"
+    assert queue.cancel(pending) and queue.cancel(leased) and not queue.cancel(leased)
+    assert queue.lease("w2") is None
+    assert not queue.complete(pending, "w1", {"output": "x"}), "A worker still running a cancelled job can't complete it"
+    assert queue.status(leased) == "cancelled" and queue.result(leased) is None
+
+def test_expired_leases_are_reassigned_then_failed(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"), max_leases=2)
+    job_id = queue.put({"n": 1})
+    queue.lease("dead", lease_seconds=0.05)
+    assert queue.lease("live", lease_seconds=0.05) is None, "A live lease is not handed out twice"
+    time.sleep(0.1)
+    assert queue.lease("live", lease_seconds=0.05)[0] == job_id, "Expired lease goes to the next worker"
+    assert not queue.complete(job_id, "dead", {"output": "late"}), "The dead worker's late result is ignored"
+    time.sleep(0.1)
+    assert queue.lease("other") is None
+    failed = queue.result(job_id)
+    assert failed["status"] == "failed" and failed["result"]["kind"] == "lease"
+
+def test_renew_keeps_lease(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"))
+    job_id = queue.put({})
+    queue.lease("w1", lease_seconds=0.1)
+    time.sleep(0.06)
+    assert queue.renew(job_id, "w1", 0.1)
+    time.sleep(0.06)
+    assert queue.lease("w2") is None, "A renewed lease has not expired"
+
+def test_remote_queue_over_tcp(tmp_path):
+    server = QueueServer(SQLiteTaskQueue(str(tmp_path / "queue.sqlite")), token="secret")
+    server.serve_in_background()
+    host, port = server.address
+    try:
+        coordinator = RemoteTaskQueue(host, port, token="secret")
+        worker = RemoteTaskQueue(host, port, token="secret")
+        job_id = coordinator.put({"task": {"task_type": "nmap"}})
+        assert worker.lease("w1") == (job_id, {"task": {"task_type": "nmap"}})
+        assert worker.renew(job_id, "w1", 30)
+        assert worker.complete(job_id, "w1", {"parsed": [80]})
+        assert coordinator.result(job_id)["result"] == {"parsed": [80]}
+        with pytest.raises(RuntimeError, match="Invalid queue token"):
+            RemoteTaskQueue(host, port, token="wrong").counts()
+        coordinator.close()
+        worker.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+class _DroppingHandler(_QueueHandler):
+    # Runs the first request of each connection in `drops`, then hangs up before replying
+    def handle(self):
+        if not self.server.drops:
+            return super().handle()
+        self.server.drops.pop()
+        request = json.loads(self.rfile.readline())
+        getattr(self.server.queue, request["op"])(*request["args"])
+
+def test_remote_queue_never_runs_a_request_twice(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"))
+    server = QueueServer(queue)
+    server.RequestHandlerClass = _DroppingHandler
+    server.drops = [True]
+    server.serve_in_background()
+    client = RemoteTaskQueue(*server.address)
+    try:
+        job_id = client.put({"task": {"task_type": "nmap"}})
+        assert queue.counts() == {"pending": 1}, "A re-sent put must not queue the job twice"
+        assert client.result(job_id) is None
+        client.close()
+        server.drops = [True]
+        with pytest.raises(ConnectionError):
+            client.lease("w1")
+        assert queue.counts() == {"leased": 1}, "A lease that may have run is not re-sent"
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,76 @@
+import os
+import pytest
+from tool_parsers import ToolParser, PARSERS, get_parser, parse_output, parse_records, merge_results
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'fixtures')
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return f.read()
+
+def test_registry_covers_every_tool():
+    assert set(PARSERS) == {"nmap", "gobuster", "ffuf", "sqlmap"}
+    assert parse_output("nikto", "raw text") == "raw text", "Unknown tools pass output through"
+
+def test_parsers_must_implement_feed_and_legacy_item():
+    class FeedOnly(ToolParser):
+        def feed(self, line):
+            return []
+    with pytest.raises(TypeError):
+        FeedOnly()
+
+def test_nmap_structured_keeps_state_and_service():
+    records = parse_records("nmap", fixture("nmap_normal.txt"))
+    assert records[1] == {"port": 25, "proto": "tcp", "state": "filtered", "service": "smtp"}
+    assert parse_output("nmap", fixture("nmap_normal.txt"))[:3] == [22, 80, 443], "Legacy shape keeps open ports only"
+
+def test_nmap_xml_matches_text_ports():
+    records = parse_records("nmap", fixture("nmap.xml"), machine=True)
+    assert records[0] == {"port": 22, "proto": "tcp", "state": "open", "service": "ssh",
+                          "product": "OpenSSH", "version": "6.6.1p1 Ubuntu 2ubuntu2.13"}
+    assert parse_output("nmap", fixture("nmap.xml"), machine=True) == [22, 80, 443, 3306, 8080, 9929, 31337]
+
+def test_gobuster_and_ffuf_records():
+    gobuster = parse_records("gobuster", fixture("gobuster.txt"))
+    assert gobuster[2] == {"path": "/admin", "status": 301, "size": 319, "redirect": "http://scanme.example.com/admin/"}
+    ffuf_text = parse_records("ffuf", fixture("ffuf.txt"))
+    assert ffuf_text[5] == {"input": "index.html", "status": 200, "size": 7245, "words": 1310, "lines": 179}
+    ffuf_json = parse_records("ffuf", fixture("ffuf.jsonl"), machine=True)
+    assert ffuf_json[1]["input"] == "admin" and ffuf_json[1]["status"] == 301
+    assert parse_output("ffuf", fixture("ffuf.jsonl"), machine=True) == ["403", "301", "301", "200", "403"]
+
+def test_ffuf_json_document_with_results():
+    document = '{"commandline":"ffuf -of json","results":[{"input":{"FUZZ":"a"},"status":200,"length":5}]}'
+    assert parse_records("ffuf", document, machine=True) == [{"input": "a", "status": 200, "size": 5}]
+
+def test_nmap_xml_skips_ports_without_a_portid():
+    xml = '<port protocol="tcp"><state state="open"/></port>\n<port protocol="tcp" portid="22"><state state="open"/></port>\n'
+    assert parse_output("nmap", xml, machine=True) == [22]
+
+def test_ffuf_skips_lines_without_a_status():
+    assert parse_output("ffuf", "/admin [Status:]") == []
+    assert parse_output("ffuf", "/admin [Status:]\nindex [Status: 200, Size: 1]\n") == ["200"]
+
+def test_ffuf_drops_throttled_responses():
+    assert parse_output("ffuf", "a [Status: 429, Size: 0]\nb [Status: 503, Size: 0]\nc [Status: 200, Size: 1]\n") == ["200"]
+    assert parse_records("ffuf", '{"input":{"FUZZ":"a"},"status":429}\n', machine=True) == []
+
+def test_sqlmap_structured_injections():
+    result = parse_output("sqlmap", fixture("sqlmap.txt"), structured=True)
+    assert result["vulnerable"] and result["dbms"] == "MySQL"
+    assert [i["type"] for i in result["injections"]] == ["boolean-based blind", "time-based blind", "UNION query"]
+    assert result["injections"][0]["parameter"] == "id" and result["injections"][0]["place"] == "GET"
+
+def test_incremental_feed_matches_batch():
+    parser = get_parser("sqlmap")
+    records = []
+    for line in fixture("sqlmap.txt").splitlines(keepends=True):
+        records.extend(parser.feed(line))
+    assert records == parse_records("sqlmap", fixture("sqlmap.txt"))
+
+def test_merge_structured_deduplicates():
+    part = [{"port": 22, "proto": "tcp", "state": "open"}]
+    assert merge_results("nmap", [part, part], structured=True) == part
+    merged = merge_results("sqlmap", [{"vulnerable": False, "dbms": None, "injections": []},
+                                      {"vulnerable": True, "dbms": "MySQL", "injections": [{"parameter": "id"}]}], structured=True)
+    assert merged == {"vulnerable": True, "dbms": "MySQL", "injections": [{"parameter": "id"}]}
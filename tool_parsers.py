@@ -0,0 +1,265 @@
+import io
+import json
+import re
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+Record = Dict[str, Any]
+
+class ToolParser(ABC):
+    # One instance per tool run: feed() takes output lines in order and returns the records they complete
+    task_type = ''
+    machine_args: List[str] = []  # extra command-line flags that switch the tool to machine-readable output
+
+    def __init__(self, machine: bool = False):
+        self.machine = machine and bool(self.machine_args)
+
+    @abstractmethod
+    def feed(self, line: str) -> List[Record]:
+        ...
+
+    def close(self) -> List[Record]:
+        return []
+
+    @classmethod
+    @abstractmethod
+    def legacy_item(cls, record: Record) -> Any:
+        # The value the original string parsers produced for this record, or None if they skipped it
+        ...
+
+    @classmethod
+    def summarize(cls, records: Iterable[Record]) -> Any:
+        return [item for item in map(cls.legacy_item, records) if item is not None]
+
+    @classmethod
+    def structure(cls, records: Iterable[Record]) -> Any:
+        return list(records)
+
+    @classmethod
+    def merge(cls, parts: List[Any], structured: bool = False) -> Any:
+        merged: Dict[str, Any] = {}
+        for part in parts:
+            for item in part:
+                merged.setdefault(json.dumps(item, sort_keys=True) if structured else item, item)
+        return list(merged.values())
+
+PARSERS: Dict[str, Type[ToolParser]] = {}
+
+def register_parser(cls: Type[ToolParser]) -> Type[ToolParser]:
+    PARSERS[cls.task_type] = cls
+    return cls
+
+_NMAP_PORT = re.compile(r'\s*(\d+)/(tcp|udp|sctp)\s+(\S+)(?:\s+(\S+))?')
+
+@register_parser
+class NmapParser(ToolParser):
+    task_type = 'nmap'
+    machine_args = ['-oX', '-']
+
+    def feed(self, line: str) -> List[Record]:
+        if self.machine:
+            return self._feed_xml(line.strip())
+        if '/' not in line:
+            return []
+        match = _NMAP_PORT.match(line)
+        if not match:
+            return []
+        port, proto, state, service = match.groups()
+        record = {'port': int(port), 'proto': proto, 'state': state}
+        if service:
+            record['service'] = service
+        return [record]
+
+    def _feed_xml(self, line: str) -> List[Record]:
+        # nmap -oX writes each <port> element, with its state and service children, on one line
+        if not line.startswith('<port '):
+            return []
+        try:
+            element = ET.fromstring(line)
+        except ET.ParseError:
+            return []
+        portid = element.get('portid', '')
+        if not portid.isdigit():
+            # Truncated or malformed element; skip it rather than fail the whole parse
+            return []
+        state = element.find('state')
+        record = {'port': int(portid), 'proto': element.get('protocol'),
+                  'state': state.get('state') if state is not None else 'unknown'}
+        service = element.find('service')
+        if service is not None:
+            for key in ('name', 'product', 'version', 'tunnel'):
+                if service.get(key):
+                    record['service' if key == 'name' else key] = service.get(key)
+        return [record]
+
+    @classmethod
+    def legacy_item(cls, record: Record) -> Any:
+        return record['port'] if record['proto'] == 'tcp' and 'open' in record['state'] else None
+
+_GOBUSTER_ENTRY = re.compile(r'\s*(/\S*)(?:\s+\(Status:\s*(\d+)\))?(?:\s+\[Size:\s*(\d+)\])?(?:\s+\[--> (\S+)\])?')
+
+@register_parser
+class GobusterParser(ToolParser):
+    task_type = 'gobuster'
+
+    def feed(self, line: str) -> List[Record]:
+        match = _GOBUSTER_ENTRY.match(line)
+        if not match:
+            return []
+        path, status, size, redirect = match.groups()
+        record: Record = {'path': path}
+        if status:
+            record['status'] = int(status)
+        if size:
+            record['size'] = int(size)
+        if redirect:
+            record['redirect'] = redirect
+        return [record]
+
+    @classmethod
+    def legacy_item(cls, record: Record) -> Any:
+        return record['path']
+
+_FFUF_FIELD = re.compile(r'(\w+):\s*([^,\]]+)')
+_FFUF_KEYS = {'Status': 'status', 'Size': 'size', 'Words': 'words', 'Lines': 'lines'}
+
+_FFUF_THROTTLED = (429, 503)
+
+@register_parser
+class FfufParser(ToolParser):
+    task_type = 'ffuf'
+    machine_args = ['-json']
+
+    def feed(self, line: str) -> List[Record]:
+        # Throttled responses are only matched so the rate governor can count them; they are never findings
+        return [record for record in self._feed(line) if record.get('status') not in _FFUF_THROTTLED]
+
+    def _feed(self, line: str) -> List[Record]:
+        if self.machine:
+            return self._feed_json(line)
+        if '[Status:' not in line:
+            return []
+        before, _, rest = line.partition('[Status:')
+        fields, _, after = ('Status:' + rest).partition(']')
+        record: Record = {'input': before.strip() or after.strip()}
+        for key, value in _FFUF_FIELD.findall(fields):
+            if key in _FFUF_KEYS:
+                value = value.strip()
+                record[_FFUF_KEYS[key]] = int(value) if value.isdigit() else value
+        return [record]
+
+    def _feed_json(self, line: str) -> List[Record]:
+        # -json prints one result per line; a full -of json document carries them under "results"
+        line = line.strip()
+        if not line.startswith('{'):
+            return []
+        try:
+            data = json.loads(line)
+        except ValueError:
+            return []
+        results = data.get('results') if isinstance(data.get('results'), list) else [data]
+        records = []
+        for result in results:
+            if 'status' not in result:
+                continue
+            inputs = result.get('input') or {}
+            if isinstance(inputs, dict):
+                inputs = ','.join(str(value) for key, value in inputs.items() if key != 'FFUFHASH')
+            record = {'input': str(inputs), 'status': result['status']}
+            for source, key in (('length', 'size'), ('words', 'words'), ('lines', 'lines'), ('url', 'url')):
+                if result.get(source) is not None:
+                    record[key] = result[source]
+            records.append(record)
+        return records
+
+    @classmethod
+    def legacy_item(cls, record: Record) -> Any:
+        # Truncated lines like "/admin [Status:]" carry no status; skip them rather than fail the whole parse
+        status = record.get('status')
+        return str(status) if status is not None else None
+
+_SQLMAP_PARAMETER = re.compile(r'\s*Parameter:\s*(.+?)\s*\((.+?)\)\s*$')
+_SQLMAP_TYPE = re.compile(r'\s*Type:\s*(.+?)\s*$')
+_SQLMAP_TITLE = re.compile(r'\s*Title:\s*(.+?)\s*$')
+_SQLMAP_DBMS = re.compile(r'back-end DBMS(?: is|:)\s*(.+?)\s*$', re.IGNORECASE)
+
+@register_parser
+class SqlmapParser(ToolParser):
+    task_type = 'sqlmap'
+
+    def __init__(self, machine: bool = False):
+        super().__init__(machine)
+        self.parameter = None
+        self.place = None
+        self.technique = None
+
+    def feed(self, line: str) -> List[Record]:
+        lowered = line.lower()
+        if 'is vulnerable' in lowered:
+            return [{'kind': 'vulnerable', 'line': line.strip()}]
+        if 'back-end dbms' in lowered:
+            match = _SQLMAP_DBMS.search(line)
+            return [{'kind': 'dbms', 'dbms': match.group(1)}] if match else []
+        match = _SQLMAP_PARAMETER.match(line)
+        if match:
+            self.parameter, self.place = match.groups()
+            return []
+        match = _SQLMAP_TYPE.match(line)
+        if match:
+            self.technique = match.group(1)
+            return []
+        match = _SQLMAP_TITLE.match(line)
+        if match and self.parameter:
+            return [{'kind': 'injection', 'parameter': self.parameter, 'place': self.place,
+                     'type': self.technique, 'title': match.group(1)}]
+        return []
+
+    @classmethod
+    def legacy_item(cls, record: Record) -> Any:
+        return True if record['kind'] == 'vulnerable' else None
+
+    @classmethod
+    def summarize(cls, records: Iterable[Record]) -> Any:
+        return {'vulnerable': any(record['kind'] == 'vulnerable' for record in records)}
+
+    @classmethod
+    def structure(cls, records: Iterable[Record]) -> Any:
+        records = list(records)
+        injections = [{k: v for k, v in record.items() if k != 'kind'} for record in records if record['kind'] == 'injection']
+        dbms = next((record['dbms'] for record in records if record['kind'] == 'dbms'), None)
+        vulnerable = bool(injections) or any(record['kind'] == 'vulnerable' for record in records)
+        return {'vulnerable': vulnerable, 'dbms': dbms, 'injections': injections}
+
+    @classmethod
+    def merge(cls, parts: List[Any], structured: bool = False) -> Any:
+        merged: Dict[str, Any] = {'vulnerable': any(part.get('vulnerable') for part in parts)}
+        if structured:
+            merged['dbms'] = next((part['dbms'] for part in parts if part.get('dbms')), None)
+            merged['injections'] = ToolParser.merge([part.get('injections', []) for part in parts], structured=True)
+        return merged
+
+def get_parser(task_type: str, machine: bool = False) -> Optional[ToolParser]:
+    cls = PARSERS.get(task_type)
+    return cls(machine) if cls else None
+
+def parse_records(task_type: str, output: str, machine: bool = False) -> List[Record]:
+    # Single pass over the output without materialising a list of lines
+    parser = get_parser(task_type, machine)
+    if parser is None:
+        return []
+    records: List[Record] = []
+    for line in io.StringIO(output):
+        records.extend(parser.feed(line))
+    records.extend(parser.close())
+    return records
+
+def parse_output(task_type: str, output: str, structured: bool = False, machine: bool = False) -> Any:
+    cls = PARSERS.get(task_type)
+    if cls is None:
+        return output
+    records = parse_records(task_type, output, machine)
+    return cls.structure(records) if structured else cls.summarize(records)
+
+def merge_results(task_type: str, parts: List[Any], structured: bool = False) -> Any:
+    return PARSERS[task_type].merge(parts, structured)